@@ -16,9 +16,107 @@ SILVER_PATH = "/app/data/silver"
 GOLD_PATH = "/app/data/gold"
 LOGS_PATH = "/app/logs"
 
+# Incremental bronze (job1 --incremental): stable per-table datasets partitioned
+# by businessDate, plus the per-table high-watermarks they were extracted up to.
+BRONZE_INCREMENTAL_PATH = os.path.join(BRONZE_PATH, "_incremental")
+BRONZE_WATERMARKS_FILE = os.path.join(BRONZE_INCREMENTAL_PATH, "_watermarks.json")
+# A watermark trails the run's cutoff by this much: a row stamped before the
+# cutoff by a transaction that commits after the read is picked up next run.
+BRONZE_WATERMARK_LAG_SECONDS = int(os.getenv("BRONZE_WATERMARK_LAG_SECONDS", "300"))
+
+# Incremental silver (job2 --incremental): stable silver datasets merged from
+# incremental bronze, plus the bronze partition fingerprints they were built from.
+SILVER_INCREMENTAL_PATH = os.path.join(SILVER_PATH, "_incremental")
+SILVER_MANIFEST_FILE = os.path.join(SILVER_INCREMENTAL_PATH, "_manifest.json")
+
+# Rolling demand statistics (job4): per (restaurant, category, dayOfWeek) count,
+# mean and sum of squared deviations of daily units, folded in one day at a time.
+DEMAND_STATS_PATH = os.path.join(GOLD_PATH, "_demand_stats")
+
+# Service-time sketches (job3): per (restaurant, station, day) histogram of prep
+# times in whole seconds; histograms of any date range merge by adding counts.
+SERVICE_TIME_SKETCH_PATH = os.path.join(GOLD_PATH, "_service_time_sketches")
+
 JDBC_URL = os.getenv("SUPABASE_JDBC_URL", "jdbc:postgresql://localhost:5432/postgres")
 JDBC_PROPS = {
     "user": os.getenv("SUPABASE_DB_USER", "postgres"),
     "password": os.getenv("SUPABASE_DB_PASSWORD", ""),
     "driver": "org.postgresql.Driver"
 }
+
+# JDBC extraction tuning (job1): parallel reads per table and rows per round-trip.
+# JDBC_PARTITION_STRATEGY is "date" (createdAt ranges) or "hash" (hash of id).
+JDBC_NUM_PARTITIONS = int(os.getenv("JDBC_NUM_PARTITIONS", str(os.cpu_count() or 4)))
+JDBC_FETCHSIZE = int(os.getenv("JDBC_FETCHSIZE", "10000"))
+JDBC_PARTITION_STRATEGY = os.getenv("JDBC_PARTITION_STRATEGY", "date")
+
+# Concurrent table extraction (job1): tables in flight and the total number of
+# JDBC connections they may hold open against the database at once.
+EXTRACT_MAX_CONCURRENT_TABLES = int(os.getenv("EXTRACT_MAX_CONCURRENT_TABLES", "4"))
+JDBC_MAX_CONNECTIONS = int(os.getenv("JDBC_MAX_CONNECTIONS", str(2 * JDBC_NUM_PARTITIONS)))
+
+# Write-back (job5): gold tables published concurrently, each over one connection
+# of a bounded Postgres pool; transient errors are retried with exponential
+# backoff starting at WRITE_BACK_BACKOFF_SECONDS.
+WRITE_BACK_MAX_CONNECTIONS = int(os.getenv("WRITE_BACK_MAX_CONNECTIONS", "4"))
+WRITE_BACK_RETRIES = int(os.getenv("WRITE_BACK_RETRIES", "3"))
+WRITE_BACK_BACKOFF_SECONDS = float(os.getenv("WRITE_BACK_BACKOFF_SECONDS", "2"))
+
+# Change-data-capture bronze ingestion (job1_cdc_bronze): logical replication
+# slot (wal2json), captured tables and micro-batch flush thresholds.
+CDC_SLOT_NAME = os.getenv("CDC_SLOT_NAME", "bouquet_bronze_cdc")
+CDC_TABLES = os.getenv("CDC_TABLES", "RestaurantOrder,OrderItem,OrderItemStatusEvent").split(",")
+CDC_BATCH_MAX_ROWS = int(os.getenv("CDC_BATCH_MAX_ROWS", "5000"))
+CDC_BATCH_SECONDS = float(os.getenv("CDC_BATCH_SECONDS", "30"))
+
+# Orchestrator execution mode: "submit" launches one spark-submit per job,
+# "warm" runs the job modules inside a long-lived SparkSession owned by the
+# orchestrator (no JVM/Spark startup per request).
+SPARK_EXECUTION_MODE = os.getenv("SPARK_EXECUTION_MODE", "submit")
+WARM_SPARK_MAX_CONCURRENT_JOBS = int(os.getenv("WARM_SPARK_MAX_CONCURRENT_JOBS", "2"))
+
+# Orchestrator job queue: jobs are QUEUED rows in AnalyticsJobRun claimed by a
+# fixed pool of workers. 0 workers = sized to the machine (cores and memory per
+# SPARK_DRIVER_MEMORY); workers also poll every JOB_QUEUE_POLL_SECONDS for jobs
+# queued by other instances or left behind by a restart.
+JOB_QUEUE_WORKERS = int(os.getenv("JOB_QUEUE_WORKERS", "0"))
+JOB_QUEUE_POLL_SECONDS = float(os.getenv("JOB_QUEUE_POLL_SECONDS", "5"))
+# A worker refreshes the heartbeat of its RUNNING rows every
+# JOB_QUEUE_HEARTBEAT_SECONDS; rows not refreshed for JOB_QUEUE_STALE_SECONDS
+# (their instance died) are requeued. On shutdown running jobs get
+# JOB_QUEUE_SHUTDOWN_SECONDS to end after their processes are terminated.
+JOB_QUEUE_HEARTBEAT_SECONDS = float(os.getenv("JOB_QUEUE_HEARTBEAT_SECONDS", "15"))
+JOB_QUEUE_STALE_SECONDS = float(os.getenv("JOB_QUEUE_STALE_SECONDS", "90"))
+JOB_QUEUE_SHUTDOWN_SECONDS = float(os.getenv("JOB_QUEUE_SHUTDOWN_SECONDS", "30"))
+
+# Orchestrator database pool: connections shared by the API and the queue
+# workers; one idle for longer than ORCHESTRATOR_DB_HEALTHCHECK_SECONDS is
+# pinged before reuse.
+ORCHESTRATOR_DB_POOL_MIN = int(os.getenv("ORCHESTRATOR_DB_POOL_MIN", "1"))
+ORCHESTRATOR_DB_POOL_MAX = int(os.getenv("ORCHESTRATOR_DB_POOL_MAX", "10"))
+ORCHESTRATOR_DB_HEALTHCHECK_SECONDS = float(os.getenv("ORCHESTRATOR_DB_HEALTHCHECK_SECONDS", "30"))
+
+# Job output captured by the orchestrator: lines kept in memory per job (served
+# by GET /jobs/{jobId}/logs) and the rotating per-job log file under LOGS_PATH/jobs.
+JOB_LOG_BUFFER_LINES = int(os.getenv("JOB_LOG_BUFFER_LINES", "2000"))
+JOB_LOG_MAX_BYTES = int(os.getenv("JOB_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+JOB_LOG_BACKUPS = int(os.getenv("JOB_LOG_BACKUPS", "2"))
+
+# Orchestrator result cache for HOURLY_VELOCITY: a request whose silver
+# orders_enriched partition is unchanged since the last successful run is
+# answered with that run's gold output. Entries are evicted least recently
+# used beyond HOURLY_VELOCITY_CACHE_SIZE and expire after the TTL (0 = off).
+HOURLY_VELOCITY_CACHE_SIZE = int(os.getenv("HOURLY_VELOCITY_CACHE_SIZE", "1024"))
+HOURLY_VELOCITY_CACHE_TTL_SECONDS = float(os.getenv("HOURLY_VELOCITY_CACHE_TTL_SECONDS", "3600"))
+
+# Execution engine for the silver/gold jobs (SILVER, GOLD, DEMAND_FORECAST,
+# HOURLY_VELOCITY): "spark", "duckdb" (jobs/duckdb_engine.py) or "auto", which
+# uses DuckDB when the job's input Parquet is at most LITE_ENGINE_MAX_INPUT_BYTES.
+ANALYTICS_ENGINE = os.getenv("ANALYTICS_ENGINE", "auto")
+LITE_ENGINE_MAX_INPUT_BYTES = int(os.getenv("LITE_ENGINE_MAX_INPUT_BYTES", str(256 * 1024 * 1024)))
+LITE_ENGINE_MEMORY_LIMIT = os.getenv("LITE_ENGINE_MEMORY_LIMIT", "1GB")
+
+# Broadcast joins for catalog dimensions (job2): a dimension is broadcast when
+# its bronze Parquet is at most this many bytes on disk. Decoded rows take
+# several times the compressed size, so keep this far below driver memory.
+BROADCAST_DIMENSION_MAX_BYTES = int(os.getenv("BROADCAST_DIMENSION_MAX_BYTES", str(32 * 1024 * 1024)))
@@ -0,0 +1,376 @@
+"""
+Shared helpers for the Spark jobs.
+
+Import from a job script after the project root has been added to sys.path:
+
+    from jobs.common import write_parquet
+"""
+
+import contextvars
+import csv
+import io
+import os
+import re
+import shutil
+from collections import Counter
+from urllib.parse import parse_qsl
+
+# ---------------------------------------------------------------------------
+# Direct PostgreSQL access
+# ---------------------------------------------------------------------------
+
+_JDBC_RE = re.compile(
+    r"^jdbc:postgresql://(?P<host>[^:/]+)(?::(?P<port>\d+))?/(?P<dbname>[^?]+)(?:\?(?P<query>.*))?$"
+)
+
+
+def parse_jdbc_url(jdbc_url):
+    """
+    Parse a ``jdbc:postgresql://host:port/dbname[?k=v&...]`` URL into psycopg2
+    connection kwargs. Query parameters (e.g. ``sslmode``) are passed through.
+    """
+    m = _JDBC_RE.match(jdbc_url)
+    if not m:
+        raise ValueError(
+            f"Cannot parse JDBC_URL. Expected format "
+            f"jdbc:postgresql://host:port/dbname, got: {jdbc_url}"
+        )
+    params = {
+        "host": m.group("host"),
+        "port": m.group("port") or "5432",
+        "dbname": m.group("dbname"),
+    }
+    params.update(parse_qsl(m.group("query") or ""))
+    return params
+
+
+# Bulk loads stream rows as CSV through COPY; this marks NULL (an empty field
+# would be ambiguous with an empty string).
+PG_COPY_NULL = "\\N"
+
+
+class CsvRowStream:
+    """
+    Read-only file object rendering ``rows`` (tuples) as CSV on demand, so
+    ``cursor.copy_expert`` streams them without building the whole file.
+    """
+
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, lineterminator="\n")
+        self._pending = ""
+
+    def read(self, size=-1):
+        while size < 0 or len(self._pending) < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            self._writer.writerow([PG_COPY_NULL if v is None else v for v in row])
+            self._pending += self._buffer.getvalue()
+            self._buffer.seek(0)
+            self._buffer.truncate()
+        if size < 0:
+            size = len(self._pending)
+        chunk, self._pending = self._pending[:size], self._pending[size:]
+        return chunk
+
+
+def copy_replace(conn, table, columns, rows, key_cols):
+    """
+    Load ``rows`` (tuples in ``columns`` order) into ``table``, replacing the
+    rows whose ``key_cols`` values occur in the load. Returns the rows loaded.
+
+    The rows are streamed with COPY into a temporary staging table, then one
+    set-based DELETE and one INSERT … SELECT move them into place in a single
+    transaction, so loading the same data twice leaves the table unchanged.
+
+    Keys are matched with ``=`` so the DELETE can use an index on (or a hash
+    join over) the key columns. Key slices with a NULL key (never matched by
+    ``=``) are rare and deleted by a second, ``IS NOT DISTINCT FROM`` pass
+    limited to those slices.
+    """
+    from psycopg2 import sql
+
+    target = sql.Identifier(table)
+    cols = sql.SQL(", ").join(map(sql.Identifier, columns))
+    keys = sql.SQL(", ").join(map(sql.Identifier, key_cols))
+    match = sql.SQL(" AND ").join(
+        sql.SQL("t.{c} = s.{c}").format(c=sql.Identifier(c)) for c in key_cols
+    )
+    null_match = sql.SQL(" AND ").join(
+        sql.SQL("t.{c} IS NOT DISTINCT FROM s.{c}").format(c=sql.Identifier(c))
+        for c in key_cols
+    )
+    any_null = sql.SQL(" OR ").join(
+        sql.SQL("{c} IS NULL").format(c=sql.Identifier(c)) for c in key_cols
+    )
+
+    with conn, conn.cursor() as cur:
+        cur.execute(sql.SQL(
+            "CREATE TEMP TABLE _stage ON COMMIT DROP AS "
+            "SELECT {cols} FROM {target} WITH NO DATA"
+        ).format(cols=cols, target=target))
+        cur.copy_expert(
+            sql.SQL("COPY _stage ({cols}) FROM STDIN WITH (FORMAT csv, NULL {null})")
+               .format(cols=cols, null=sql.Literal(PG_COPY_NULL)).as_string(cur),
+            CsvRowStream(rows),
+        )
+        # Temp tables are never auto-analyzed; without stats the planner
+        # assumes a tiny stage and picks a nested loop over the target
+        cur.execute("ANALYZE _stage")
+        cur.execute(sql.SQL(
+            "DELETE FROM {target} t USING (SELECT DISTINCT {keys} FROM _stage) s WHERE {match}"
+        ).format(target=target, keys=keys, match=match))
+        cur.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM _stage WHERE {any_null})")
+                    .format(any_null=any_null))
+        if cur.fetchone()[0]:
+            cur.execute(sql.SQL(
+                "DELETE FROM {target} t "
+                "USING (SELECT DISTINCT {keys} FROM _stage WHERE {any_null}) s WHERE {match}"
+            ).format(target=target, keys=keys, any_null=any_null, match=null_match))
+        cur.execute(sql.SQL(
+            "INSERT INTO {target} ({cols}) SELECT {cols} FROM _stage"
+        ).format(target=target, cols=cols))
+        return cur.rowcount
+
+
+# ---------------------------------------------------------------------------
+# Single-scan writes
+# ---------------------------------------------------------------------------
+#
+# Logging "N records" used to run df.count() before or after the write, which
+# executes the whole plan a second time (a second JDBC query in job1, a second
+# silver scan + aggregation in jobs 2-6). These helpers attach a count metric
+# with DataFrame.observe(), so the number of rows is collected by the write
+# action itself.
+
+def observe_count(df, name="rows"):
+    """
+    Attach a row-count metric to ``df``.
+
+    Returns ``(observed_df, observation)``; after an action has run on
+    ``observed_df``, ``observation.get[name]`` holds the number of rows that
+    flowed through it.
+    """
+    from pyspark.sql import Observation
+    from pyspark.sql import functions as F
+
+    observation = Observation()
+    return df.observe(observation, F.count(F.lit(1)).alias(name)), observation
+
+
+def write_parquet(df, path, mode="overwrite", partition_by=None, **options):
+    """
+    Write ``df`` to Parquet and return the number of rows written.
+    Extra keyword arguments are passed to the writer as options.
+    """
+    df, observation = observe_count(df)
+    writer = df.write.mode(mode).options(**options)
+    if partition_by:
+        writer = writer.partitionBy(*partition_by)
+    writer.parquet(path)
+    return observation.get["rows"]
+
+
+# ---------------------------------------------------------------------------
+# Partitioned layouts
+# ---------------------------------------------------------------------------
+
+# Silver facts are laid out as restaurantId=<id>/createdDate=<date>/ and
+# restaurant-level gold tables as restaurantId=<id>/, so filters on those
+# columns (job6, on-demand queries) only list and read the matching files.
+SILVER_PARTITION_COLS = ["restaurantId", "createdDate"]
+GOLD_PARTITION_COLS = ["restaurantId"]
+
+
+def write_partitioned(df, path, partition_by, mode="overwrite", dynamic=False):
+    """
+    Write ``df`` partitioned by ``partition_by`` and return the rows written.
+
+    Rows are clustered by the partition columns first so each partition
+    directory gets one file instead of one per upstream task. With
+    ``dynamic=True`` an overwrite only replaces the partitions present in
+    ``df`` and leaves the others in place.
+    """
+    options = {"partitionOverwriteMode": "dynamic"} if dynamic else {}
+    return write_parquet(df.repartition(*partition_by), path, mode=mode,
+                         partition_by=partition_by, **options)
+
+
+def swap_directory(new_path, path):
+    """
+    Replace the dataset at ``path`` with the one written to ``new_path``.
+    Spark cannot overwrite a path it is reading from, so state that is
+    rebuilt from itself is written next to it and renamed into place.
+    """
+    old_path = f"{path}.old"
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(path):
+        os.replace(path, old_path)
+    os.replace(new_path, path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+
+def write_jdbc(df, url, table, properties, mode="append"):
+    """Write ``df`` to a JDBC table and return the number of rows written."""
+    df, observation = observe_count(df)
+    df.write.mode(mode).jdbc(url=url, table=table, properties=properties)
+    return observation.get["rows"]
+
+
+# ---------------------------------------------------------------------------
+# Join planning
+# ---------------------------------------------------------------------------
+
+def parquet_size(path):
+    """On-disk size in bytes of the Parquet dataset at ``path`` (0 if missing)."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, f))
+                     for f in files if f.endswith(".parquet"))
+    return total
+
+
+def broadcast_if_small(df, path, max_bytes):
+    """
+    Return ``(df, size)`` where ``df`` carries a broadcast hint if the Parquet
+    it was read from (``path``) is at most ``max_bytes``. Larger inputs are
+    returned unchanged and left to Spark's own join selection.
+    """
+    from pyspark.sql import functions as F
+
+    size = parquet_size(path)
+    return (F.broadcast(df) if size <= max_bytes else df), size
+
+
+# ---------------------------------------------------------------------------
+# Datasets handed over between stages
+# ---------------------------------------------------------------------------
+
+def read_dataset(spark, base_dir, name, datasets=None, business_date=None):
+    """
+    Return dataset ``name``: the DataFrame in ``datasets`` if an earlier stage
+    of the same application handed it over (see jobs/pipeline.py), otherwise
+    the Parquet under ``base_dir/name``.
+
+    With ``business_date`` only that ``createdDate`` partition is kept: the
+    incremental silver holds every business date in one dataset.
+    """
+    if datasets and name in datasets:
+        df = datasets[name]
+    else:
+        df = spark.read.parquet(os.path.join(base_dir, name))
+    if business_date is not None:
+        from pyspark.sql import functions as F
+        df = df.filter(F.col("createdDate") == F.lit(business_date))
+    return df
+
+
+# ---------------------------------------------------------------------------
+# Concurrent stages
+# ---------------------------------------------------------------------------
+#
+# Spark local properties (scheduler pool, job group, job description) belong
+# to the Python thread that sets them. Jobs submitted from a plain
+# ThreadPoolExecutor worker carry none of them, so under the orchestrator's
+# warm SparkSession they escape the job's FAIR pool and its job group. The
+# same goes for context variables (the orchestrator tags a warm job's log
+# records with one).
+#
+# With spark.scheduler.mode=FAIR, jobs share the cluster fairly only across
+# scheduler pools; inside a pool (including the default one) they run FIFO.
+# So a standalone spark-submit gives each worker its own pool.
+
+def thread_target(fn, pool=None):
+    """
+    Wrap ``fn`` to run in a worker thread with the calling thread's Spark
+    local properties and context variables, captured now. Wrap on the thread
+    that submits the work.
+
+    ``pool(*args, **kwargs)`` names the FAIR scheduler pool of a call when the
+    caller has none; under the warm orchestrator the job's own pool is kept.
+    """
+    from pyspark import SparkContext, inheritable_thread_target
+
+    def run_in_pool(*args, **kwargs):
+        sc = SparkContext._active_spark_context
+        if pool is not None and sc.getLocalProperty("spark.scheduler.pool") is None:
+            sc.setLocalProperty("spark.scheduler.pool", pool(*args, **kwargs))
+        return fn(*args, **kwargs)
+
+    target = inheritable_thread_target(run_in_pool)
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # A Context can only be entered by one thread at a time
+        return context.copy().run(target, *args, **kwargs)
+
+    return run
+
+
+# ---------------------------------------------------------------------------
+# Service-time sketches
+# ---------------------------------------------------------------------------
+#
+# job3 keeps one histogram of prep times ({whole seconds: count}) per
+# restaurant, station and day under SERVICE_TIME_SKETCH_PATH. Prep times are
+# whole seconds in a bounded range, so the histogram is an exact quantile
+# sketch of a few KB: the sketches of any set of days merge by adding their
+# counts, and percentiles over weeks or months are read from the merged
+# histogram instead of re-scanning process_events.
+
+SKETCH_QUANTILES = (0.5, 0.9, 0.99)
+
+
+def merge_sketches(sketches):
+    """Merge ``{seconds: count}`` histograms into one ``Counter``."""
+    merged = Counter()
+    for sketch in sketches:
+        merged.update(sketch)
+    return merged
+
+
+def sketch_quantiles(sketch, quantiles=SKETCH_QUANTILES):
+    """
+    Return ``{q: seconds}`` for a histogram: the smallest value whose
+    cumulative count reaches ``q`` of the total (nearest rank, as
+    percentile_disc). Quantiles of an empty histogram are None.
+    """
+    total = sum(sketch.values())
+    result = dict.fromkeys(quantiles)
+    if not total:
+        return result
+    pending = sorted(quantiles)
+    cumulative = 0
+    for value in sorted(sketch):
+        cumulative += sketch[value]
+        while pending and cumulative >= pending[0] * total:
+            result[pending.pop(0)] = value
+    return result
+
+
+def merge_sketches_df(sketches, by=("restaurantId", "stationId"), quantiles=SKETCH_QUANTILES):
+    """
+    Spark version of ``merge_sketches`` + ``sketch_quantiles``: merge the
+    ``durationHistogram`` rows of ``sketches`` (typically the sketch store
+    filtered to a date range) per ``by`` and return ``by`` columns,
+    ``sampleCount`` and one ``p<NN>PrepSeconds`` column per quantile.
+    """
+    from pyspark.sql import Window
+    from pyspark.sql import functions as F
+
+    by = list(by)
+    counts = sketches \
+        .select(*by, F.explode("durationHistogram").alias("seconds", "n")) \
+        .groupBy(*by, "seconds") \
+        .agg(F.sum("n").alias("n"))
+    group = Window.partitionBy(*by)
+    counts = counts \
+        .withColumn("cumulative", F.sum("n").over(group.orderBy("seconds"))) \
+        .withColumn("total", F.sum("n").over(group))
+    return counts.groupBy(*by).agg(
+        F.first("total").alias("sampleCount"),
+        *[F.min(F.when(F.col("cumulative") >= F.col("total") * q, F.col("seconds")))
+           .alias(f"p{round(q * 100)}PrepSeconds") for q in quantiles]
+    )
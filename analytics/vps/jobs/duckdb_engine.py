@@ -0,0 +1,687 @@
+"""
+DuckDB engine: Jobs 2, 3, 4 and 6 for small tenants, without Spark.
+
+Most restaurants produce a few thousand orders a day, so a ``local[*]`` Spark
+application spends more time starting the JVM than transforming data. This
+module runs the same silver and gold transformations in-process on DuckDB,
+reading and writing the same Parquet layout (Hive-style ``restaurantId=`` /
+``createdDate=`` partitions), so Spark and DuckDB runs can be mixed freely:
+a silver built here is read by the Spark job3 and vice versa.
+
+Jobs take the same arguments as their Spark counterparts (parsed by the
+job module's own ``parse_args``). The orchestrator picks this engine
+automatically when the job's input is below ``LITE_ENGINE_MAX_INPUT_BYTES``
+(see ``ANALYTICS_ENGINE`` in config/settings.py).
+
+Usage:
+    python jobs/duckdb_engine.py SILVER [--date YYYY-MM-DD]
+    python jobs/duckdb_engine.py GOLD [--date YYYY-MM-DD]
+    python jobs/duckdb_engine.py DEMAND_FORECAST [--date YYYY-MM-DD]
+    python jobs/duckdb_engine.py HOURLY_VELOCITY --restaurant-id UUID [--date YYYY-MM-DD]
+"""
+
+import sys
+import os
+import shutil
+import itertools
+import logging
+import argparse
+import importlib
+from datetime import date, timedelta
+
+# Add project root to path so config.settings can be imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import (
+    BRONZE_PATH, SILVER_PATH, SILVER_INCREMENTAL_PATH, GOLD_PATH, LOGS_PATH,
+    JDBC_URL, JDBC_PROPS,
+    LITE_ENGINE_MEMORY_LIMIT, DEMAND_STATS_PATH, SERVICE_TIME_SKETCH_PATH,
+)
+from jobs.common import GOLD_PARTITION_COLS, SILVER_PARTITION_COLS, parse_jdbc_url, swap_directory
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+os.makedirs(LOGS_PATH, exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s — %(message)s",
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(os.path.join(LOGS_PATH, "duckdb_engine.log")),
+    ],
+)
+logger = logging.getLogger(__name__)
+
+# Imported after logging is configured: job modules set up their own handlers
+from jobs.job4_demand_estimate import (  # noqa: E402
+    ITEM_FORECAST_HISTORY_DAYS, item_forecaster,
+)
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+BUSINESS_TIMEZONE = "America/Mexico_City"
+
+# Local business time of a UTC timestamp column (same as Spark's
+# convert_timezone("UTC", "America/Mexico_City", col))
+LOCAL_TS = "timezone('" + BUSINESS_TIMEZONE + "', CAST({col} AS TIMESTAMPTZ))"
+
+# Directory Spark writes NULL partition values to
+HIVE_DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+# Spark's order status labels (job2)
+ORDER_STATUS_LABELS = {
+    "OPEN": "Abierta", "SENT": "Enviada",
+    "PARTIALLY_READY": "Parcialmente Lista",
+    "READY": "Lista", "CLOSED": "Cerrada",
+    "CANCELLED": "Cancelada",
+}
+
+
+def connect():
+    """In-memory DuckDB connection with UTC session time, like the Spark jobs."""
+    import duckdb
+
+    con = duckdb.connect()
+    con.execute("SET TimeZone = 'UTC'")
+    con.execute(f"SET memory_limit = '{LITE_ENGINE_MEMORY_LIMIT}'")
+    return con
+
+
+def _sql_str(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def register_parquet(con, name, path, business_date=None):
+    """
+    Expose the Parquet dataset at ``path`` (plain or Hive-partitioned) as view
+    ``name``. With ``business_date`` only that ``createdDate`` partition is
+    read (see ``jobs.common.read_dataset``).
+    """
+    pattern = os.path.join(path, "**", "*.parquet")
+    where = (f" WHERE createdDate = CAST({_sql_str(business_date)} AS DATE)"
+             if business_date is not None else "")
+    con.execute(
+        f"CREATE OR REPLACE VIEW {name} AS "
+        f"SELECT * FROM read_parquet({_sql_str(pattern)}, "
+        f"hive_partitioning = true, union_by_name = true){where}"
+    )
+
+
+def copy_parquet(con, query, path, partition_by=None, dynamic=False):
+    """
+    Write the result of ``query`` to ``path`` and return the rows written.
+
+    Mirrors ``write_parquet``/``write_partitioned``: the dataset is replaced,
+    or with ``dynamic=True`` only the partitions present in the result are.
+    """
+    con.execute(f"CREATE OR REPLACE TEMP TABLE _out AS {query}")
+    try:
+        if not partition_by:
+            shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path, exist_ok=True)
+            target = os.path.join(path, "part-00000.parquet")
+            options = "FORMAT PARQUET"
+        else:
+            if dynamic:
+                # Directory names as written: DuckDB's VARCHAR rendering of the
+                # value, and for NULL "NULL" (DuckDB) or Spark's default partition
+                cols = ", ".join(f"CAST({c} AS VARCHAR)" for c in partition_by)
+                for values in con.execute(f"SELECT DISTINCT {cols} FROM _out").fetchall():
+                    names = [[f"{c}={v}"] if v is not None
+                             else [f"{c}=NULL", f"{c}={HIVE_DEFAULT_PARTITION}"]
+                             for c, v in zip(partition_by, values)]
+                    for parts in itertools.product(*names):
+                        shutil.rmtree(os.path.join(path, *parts), ignore_errors=True)
+            else:
+                shutil.rmtree(path, ignore_errors=True)
+            os.makedirs(path, exist_ok=True)
+            target = path
+            options = (f"FORMAT PARQUET, PARTITION_BY ({', '.join(partition_by)}), "
+                       f"OVERWRITE_OR_IGNORE true")
+        return con.execute(f"COPY _out TO {_sql_str(target)} ({options})").fetchone()[0]
+    finally:
+        con.execute("DROP TABLE IF EXISTS _out")
+
+
+# ---------------------------------------------------------------------------
+# Job 2: Build Silver
+# ---------------------------------------------------------------------------
+
+def build_silver(con, args):
+    """Build the silver layer for ``args.date`` (job2)."""
+    if args.incremental:
+        raise ValueError("Incremental silver builds run on Spark (job2 --incremental)")
+    business_date = args.date
+
+    bronze_dir = os.path.join(BRONZE_PATH, business_date)
+    silver_dir = os.path.join(SILVER_PATH, business_date)
+
+    logger.info("=" * 60)
+    logger.info("Job 2 (DuckDB): Build Silver — starting")
+    logger.info("  Date: %s", business_date)
+    logger.info("  Bronze dir: %s", bronze_dir)
+    logger.info("  Silver dir: %s", silver_dir)
+    logger.info("=" * 60)
+
+    logger.info("Reading Bronze datasets...")
+    for view, table in [("orders", "RestaurantOrder"), ("items", "OrderItem"),
+                        ("events", "OrderItemStatusEvent"), ("menu", "RestaurantMenuItem"),
+                        ("categories", "RestaurantCategory"), ("restaurants", "Restaurant"),
+                        ("chains", "Chain"), ("stations", "Station")]:
+        register_parquet(con, view, os.path.join(bronze_dir, table))
+
+    status_cases = " ".join(
+        f"WHEN {_sql_str(k)} THEN {_sql_str(v)}" for k, v in ORDER_STATUS_LABELS.items()
+    )
+
+    logger.info("Building silver_orders_enriched...")
+    count = copy_parquet(con, f"""
+        SELECT o.*,
+               r.chainId,
+               r.zoneId,
+               r.name AS restaurantName,
+               c.name AS chainName,
+               CASE o.status {status_cases} END AS statusLabel,
+               CAST({LOCAL_TS.format(col="o.createdAt")} AS DATE) AS createdDate,
+               hour({LOCAL_TS.format(col="o.createdAt")}) AS createdHour
+        FROM orders o
+        LEFT JOIN restaurants r ON o.restaurantId = r.id
+        LEFT JOIN chains c ON r.chainId = c.id
+    """, f"{silver_dir}/orders_enriched", SILVER_PARTITION_COLS)
+    logger.info("  ✓ silver_orders_enriched — %d records", count)
+
+    logger.info("Building silver_order_items_enriched...")
+    count = copy_parquet(con, f"""
+        SELECT i.*,
+               m.priceCents,
+               m.categoryId,
+               m.restaurantId,
+               cat.name AS categoryName,
+               s.name AS stationName,
+               round(i.unitPriceCents / 100, 2) AS unitPriceMXN,
+               round(i.totalCents / 100, 2) AS totalMXN,
+               CAST({LOCAL_TS.format(col="i.createdAt")} AS DATE) AS createdDate
+        FROM items i
+        LEFT JOIN menu m ON i.menuItemId = m.id
+        LEFT JOIN categories cat ON m.categoryId = cat.id
+        LEFT JOIN stations s ON m.stationId = s.id
+    """, f"{silver_dir}/order_items_enriched", SILVER_PARTITION_COLS)
+    logger.info("  ✓ silver_order_items_enriched — %d records", count)
+
+    logger.info("Building silver_process_events...")
+    # Items carry no restaurantId; take it from the menu item (as job2 does).
+    # Stage durations come from each item's ordered event stream.
+    count = copy_parquet(con, f"""
+        SELECT e.*,
+               epoch(e.createdAt) - epoch(lag(e.createdAt) OVER item_stream) AS durationSeconds,
+               epoch(e.createdAt) - epoch(first(e.createdAt) OVER item_stream) AS itemElapsedSeconds,
+               i.menuItemId,
+               i.stationId,
+               i.itemNameSnapshot,
+               m.restaurantId,
+               s.name AS stationName,
+               CAST({LOCAL_TS.format(col="e.createdAt")} AS DATE) AS createdDate
+        FROM events e
+        LEFT JOIN items i ON e.orderItemId = i.id
+        LEFT JOIN menu m ON i.menuItemId = m.id
+        LEFT JOIN stations s ON i.stationId = s.id
+        WINDOW item_stream AS (PARTITION BY e.orderItemId ORDER BY e.createdAt, e.id)
+    """, f"{silver_dir}/process_events", SILVER_PARTITION_COLS)
+    logger.info("  ✓ silver_process_events — %d records", count)
+
+    logger.info("Job 2 (DuckDB): Build Silver — completed successfully")
+
+
+# ---------------------------------------------------------------------------
+# Job 3: Aggregate Gold
+# ---------------------------------------------------------------------------
+
+def aggregate_gold(con, args):
+    """Aggregate the gold metrics for ``args.date`` (job3)."""
+    business_date = args.date
+
+    silver_dir = (SILVER_INCREMENTAL_PATH if args.incremental
+                  else os.path.join(SILVER_PATH, business_date))
+    gold_dir = os.path.join(GOLD_PATH, business_date)
+
+    logger.info("=" * 60)
+    logger.info("Job 3 (DuckDB): Aggregate Gold — starting")
+    logger.info("  Date: %s", business_date)
+    logger.info("  Silver dir: %s", silver_dir)
+    logger.info("  Gold dir: %s", gold_dir)
+    logger.info("=" * 60)
+
+    logger.info("Reading Silver datasets...")
+    for name in ("orders_enriched", "order_items_enriched", "process_events"):
+        if not os.path.isdir(os.path.join(silver_dir, name)):
+            logger.error("Silver files not found: %s", os.path.join(silver_dir, name))
+            return
+    # The incremental silver holds every date; keep this one's partition
+    day = business_date if args.incremental else None
+    register_parquet(con, "orders", f"{silver_dir}/orders_enriched", day)
+    register_parquet(con, "items", f"{silver_dir}/order_items_enriched", day)
+    register_parquet(con, "events", f"{silver_dir}/process_events", day)
+    has_sessions = os.path.isdir(f"{silver_dir}/sessions_enriched")
+    if has_sessions:
+        register_parquet(con, "sessions", f"{silver_dir}/sessions_enriched", day)
+
+    # Base cube: one scan per silver input at the finest grain the gold
+    # tables need; every table below is a roll-up of it (see job3)
+    con.execute("""
+        CREATE OR REPLACE TEMP TABLE orders_cube AS
+        SELECT chainId, zoneId, restaurantId, createdDate, createdHour,
+               count(id) AS orderCount,
+               count(totalCents) AS ticketCount,
+               sum(totalCents) AS totalCents,
+               sum(pow(CAST(totalCents AS DOUBLE), 2)) AS totalCentsSquared
+        FROM orders
+        GROUP BY chainId, zoneId, restaurantId, createdDate, createdHour
+    """)
+    con.execute(f"""
+        CREATE OR REPLACE TEMP TABLE items_cube AS
+        SELECT i.*, c.chainId
+        FROM (
+            SELECT restaurantId, createdDate,
+                   hour({LOCAL_TS.format(col="createdAt")}) AS createdHour,
+                   menuItemId, itemNameSnapshot,
+                   sum(quantity) AS quantity,
+                   sum(totalCents) AS totalCents
+            FROM items
+            GROUP BY ALL
+        ) i
+        LEFT JOIN (SELECT DISTINCT restaurantId, chainId FROM orders_cube) c
+            USING (restaurantId)
+    """)
+    for cube in ("orders", "items"):
+        table_name = f"analytic_base_cube_{cube}"
+        count = copy_parquet(con, f"SELECT * FROM {cube}_cube", f"{gold_dir}/{table_name}",
+                             GOLD_PARTITION_COLS)
+        logger.info("  ✓ %s — %d records", table_name, count)
+
+    # Columns every gold table ends with
+    stamp = (f"{_sql_str(business_date)} AS businessDate, "
+             f"{_sql_str('job3_batch_' + business_date)} AS jobRunId, "
+             f"current_timestamp AS computedAt")
+
+    gold_tables = [
+        ("analytic_chain_sales_daily", None, f"""
+            SELECT chainId,
+                   CAST(sum(totalCents) AS BIGINT) AS totalRevenueCents,
+                   '[]' AS restaurantRanking,
+                   0.0 AS revenueDeltaPercent, {stamp}
+            FROM orders_cube GROUP BY chainId
+        """),
+        ("analytic_chain_peak_hours", None, f"""
+            SELECT chainId, hour(openedAt) AS peakHourBin,
+                   count(id) AS sessionCount, {stamp}
+            FROM sessions GROUP BY chainId, hour(openedAt)
+        """ if has_sessions else None),
+        ("analytic_chain_top_products", None, f"""
+            SELECT chainId, menuItemId,
+                   CAST(sum(quantity) AS BIGINT) AS chainTotalQuantity,
+                   CAST(sum(totalCents) AS BIGINT) AS itemRevenue,
+                   0.0 AS revenueConcentrationPercent, {stamp}
+            FROM items_cube GROUP BY chainId, menuItemId
+        """),
+        ("analytic_zone_branch_comparison", None, f"""
+            SELECT zoneId,
+                   sum(totalCents) / sum(ticketCount) AS avgZoneTicketCents,
+                   CASE WHEN sum(ticketCount) > 1 THEN sqrt(greatest(
+                       (sum(totalCentsSquared) - pow(sum(totalCents), 2) / sum(ticketCount))
+                       / (sum(ticketCount) - 1), 0)) END AS ticketStdDev,
+                   '[]' AS branchOutliers,
+                   100.0 AS menuOverlapPercent, {stamp}
+            FROM orders_cube GROUP BY zoneId
+        """),
+        ("analytic_sales_daily", GOLD_PARTITION_COLS, f"""
+            SELECT restaurantId,
+                   CAST(sum(orderCount) AS BIGINT) AS orderCount,
+                   CAST(sum(totalCents) AS BIGINT) AS grossConsumptionCents,
+                   0 AS itemCount,
+                   0 AS discountCents,
+                   CAST(sum(totalCents) AS BIGINT) AS netConsumptionCents, {stamp}
+            FROM orders_cube GROUP BY restaurantId
+        """),
+        ("analytic_item_velocity", GOLD_PARTITION_COLS, f"""
+            SELECT restaurantId, menuItemId, itemNameSnapshot,
+                   CAST(sum(quantity) AS BIGINT) AS quantitySold,
+                   CAST(sum(totalCents) AS BIGINT) AS grossConsumptionCents, {stamp}
+            FROM items_cube GROUP BY restaurantId, menuItemId, itemNameSnapshot
+        """),
+        ("analytic_service_times", GOLD_PARTITION_COLS, f"""
+            SELECT restaurantId, stationId,
+                   avg(itemElapsedSeconds) AS avgPrepSeconds,
+                   quantile_disc(itemElapsedSeconds, 0.5) AS p50PrepSeconds,
+                   quantile_disc(itemElapsedSeconds, 0.9) AS p90PrepSeconds,
+                   CAST(sum(CASE WHEN itemElapsedSeconds > 600 THEN 1 ELSE 0 END) AS BIGINT)
+                       AS delayedItemsCount, {stamp}
+            FROM events WHERE toStatus = 'SERVED'
+            GROUP BY restaurantId, stationId
+        """),
+        ("analytic_restaurant_session_depth", GOLD_PARTITION_COLS, f"""
+            SELECT restaurantId,
+                   avg(totalAmount / guestCount) AS avgGuestTicketCents,
+                   max(totalAmount / guestCount) AS maxGuestTicketCents, {stamp}
+            FROM sessions GROUP BY restaurantId
+        """ if has_sessions else None),
+    ]
+
+    for table_name, partition_by, query in gold_tables:
+        if query is None:
+            logger.warning("  ⚠ Skipping %s: sessions_enriched not available", table_name)
+            continue
+        logger.info("Computing %s...", table_name)
+        count = copy_parquet(con, query, f"{gold_dir}/{table_name}", partition_by)
+        logger.info("  ✓ %s — %d records", table_name, count)
+
+    # Per-day service-time sketches, same layout as job3 (only this silver's
+    # days are replaced)
+    logger.info("Updating service-time sketches...")
+    count = copy_parquet(con, f"""
+        SELECT restaurantId, stationId, createdDate,
+               count(*) AS sampleCount,
+               CAST(histogram(CAST(round(itemElapsedSeconds) AS BIGINT)) AS MAP(BIGINT, BIGINT))
+                   AS durationHistogram,
+               {_sql_str('job3_batch_' + business_date)} AS jobRunId,
+               current_timestamp AS computedAt
+        FROM events
+        WHERE toStatus = 'SERVED' AND itemElapsedSeconds IS NOT NULL
+        GROUP BY restaurantId, stationId, createdDate
+    """, SERVICE_TIME_SKETCH_PATH, SILVER_PARTITION_COLS, dynamic=True)
+    logger.info("  ✓ service-time sketches — %d station-days", count)
+
+    logger.info("Job 3 (DuckDB): Aggregate Gold — completed successfully")
+
+
+# ---------------------------------------------------------------------------
+# Job 4: Demand Estimate
+# ---------------------------------------------------------------------------
+
+def demand_estimate(con, args):
+    """Compute the 7-day demand forecast for ``args.date`` (job4)."""
+    reference_date_str = args.date
+    reference_date = date.fromisoformat(reference_date_str)
+
+    silver_dir = (SILVER_INCREMENTAL_PATH if args.incremental
+                  else os.path.join(SILVER_PATH, reference_date_str))
+    gold_dir = os.path.join(GOLD_PATH, reference_date_str)
+
+    logger.info("=" * 60)
+    logger.info("Job 4 (DuckDB): Demand Estimate — starting")
+    logger.info("  Reference date: %s", reference_date_str)
+    logger.info("  Silver dir: %s", silver_dir)
+    logger.info("  Gold dir: %s", gold_dir)
+    logger.info("=" * 60)
+
+    logger.info("Reading Silver datasets...")
+    register_parquet(con, "items", f"{silver_dir}/order_items_enriched")
+    register_parquet(con, "orders", f"{silver_dir}/orders_enriched")
+
+    # Rolling statistics store, shared with the Spark job4 (same layout)
+    if args.reset_stats:
+        logger.info("Resetting rolling statistics store %s", DEMAND_STATS_PATH)
+        shutil.rmtree(DEMAND_STATS_PATH, ignore_errors=True)
+    if os.path.isdir(DEMAND_STATS_PATH):
+        register_parquet(con, "stats", DEMAND_STATS_PATH)
+    else:
+        con.execute("""
+            CREATE OR REPLACE VIEW stats AS
+            SELECT NULL::VARCHAR AS restaurantId, NULL::VARCHAR AS categoryName,
+                   NULL::INTEGER AS dayOfWeek, NULL::BIGINT AS n,
+                   NULL::DOUBLE AS meanUnits, NULL::DOUBLE AS m2Units,
+                   NULL::DOUBLE AS meanRevenueCents, NULL::VARCHAR AS lastDate
+            WHERE false
+        """)
+    last_date = con.execute("SELECT max(lastDate) FROM stats").fetchone()[0]
+    # Only completed days are folded in; today's partial sales are not
+    fold_until = reference_date - timedelta(days=1)
+    logger.info("  Stats store: last folded day %s, folding through %s",
+                last_date or "none", fold_until)
+
+    if last_date is None or date.fromisoformat(last_date) < fold_until:
+        logger.info("Folding new days into the rolling statistics...")
+        since = f"AND CAST(o.createdDate AS DATE) > DATE {_sql_str(last_date)}" if last_date else ""
+        # Chan et al.'s pairwise merge of (n, mean, M2), as merge_stats in job4
+        count = copy_parquet(con, f"""
+            WITH sales AS (
+                SELECT o.restaurantId, i.categoryName, o.createdDate,
+                       CAST(dayofweek(CAST(o.createdDate AS DATE)) + 1 AS INTEGER) AS dayOfWeek,
+                       i.quantity, i.totalCents
+                FROM items i
+                JOIN orders o ON i.orderId = o.id
+                WHERE i.status != 'CANCELLED'
+                  AND CAST(o.createdDate AS DATE) <= DATE {_sql_str(fold_until)} {since}
+            ),
+            daily AS (
+                SELECT restaurantId, categoryName, dayOfWeek, createdDate,
+                       sum(quantity) AS dailyUnits,
+                       sum(totalCents) AS dailyRevenueCents
+                FROM sales
+                GROUP BY restaurantId, categoryName, dayOfWeek, createdDate
+            ),
+            batch AS (
+                SELECT restaurantId, categoryName, dayOfWeek,
+                       count(*) AS batchN,
+                       avg(dailyUnits) AS batchMeanUnits,
+                       var_pop(dailyUnits) * count(*) AS batchM2Units,
+                       avg(dailyRevenueCents) AS batchMeanRevenueCents
+                FROM daily
+                GROUP BY restaurantId, categoryName, dayOfWeek
+            )
+            SELECT coalesce(s.restaurantId, b.restaurantId) AS restaurantId,
+                   coalesce(s.categoryName, b.categoryName) AS categoryName,
+                   coalesce(s.dayOfWeek, b.dayOfWeek) AS dayOfWeek,
+                   coalesce(s.n, 0) + coalesce(b.batchN, 0) AS n,
+                   CASE WHEN b.batchN IS NULL THEN s.meanUnits
+                        WHEN s.n IS NULL THEN b.batchMeanUnits
+                        ELSE s.meanUnits + (b.batchMeanUnits - s.meanUnits) * b.batchN / (s.n + b.batchN)
+                   END AS meanUnits,
+                   coalesce(s.m2Units, 0) + coalesce(b.batchM2Units, 0)
+                       + CASE WHEN s.n IS NOT NULL AND b.batchN IS NOT NULL
+                              THEN pow(b.batchMeanUnits - s.meanUnits, 2) * s.n * b.batchN / (s.n + b.batchN)
+                              ELSE 0 END AS m2Units,
+                   CASE WHEN b.batchN IS NULL THEN s.meanRevenueCents
+                        WHEN s.n IS NULL THEN b.batchMeanRevenueCents
+                        ELSE s.meanRevenueCents
+                             + (b.batchMeanRevenueCents - s.meanRevenueCents) * b.batchN / (s.n + b.batchN)
+                   END AS meanRevenueCents,
+                   {_sql_str(fold_until)} AS lastDate
+            FROM stats s
+            FULL OUTER JOIN batch b
+              ON s.restaurantId = b.restaurantId
+             AND s.categoryName IS NOT DISTINCT FROM b.categoryName
+             AND s.dayOfWeek = b.dayOfWeek
+        """, f"{DEMAND_STATS_PATH}.new")
+        swap_directory(f"{DEMAND_STATS_PATH}.new", DEMAND_STATS_PATH)
+        logger.info("  ✓ rolling statistics — %d keys", count)
+    else:
+        logger.info("  Rolling statistics already include %s", fold_until)
+
+    if not os.path.isdir(DEMAND_STATS_PATH):
+        logger.warning("No sales history before %s — nothing to forecast", reference_date_str)
+        return
+    register_parquet(con, "stats", DEMAND_STATS_PATH)
+
+    # Spark's dayofweek: 1 = Sunday ... 7 = Saturday
+    forecast_dates = ", ".join(
+        f"({_sql_str(reference_date + timedelta(days=delta))}, "
+        f"{(reference_date + timedelta(days=delta)).isoweekday() % 7 + 1})"
+        for delta in range(1, 8)
+    )
+
+    logger.info("Generating 7-day forecast...")
+    count = copy_parquet(con, f"""
+        WITH historical_avg AS (
+            SELECT restaurantId, categoryName, dayOfWeek,
+                   meanUnits AS avgUnits,
+                   meanRevenueCents AS avgRevenueCents,
+                   -- Sample standard deviation of the daily totals
+                   CASE WHEN n > 1 THEN sqrt(m2Units / (n - 1)) END AS stddevUnits
+            FROM stats
+        ),
+        forecast_dates(forecastDate, dayOfWeek) AS (VALUES {forecast_dates})
+        SELECT h.restaurantId, h.categoryName, f.forecastDate,
+               CAST(trunc(h.avgUnits) AS INTEGER) AS projectedOrders,
+               CAST(trunc(h.avgRevenueCents) AS INTEGER) AS projectedRevenueCents,
+               CASE WHEN h.stddevUnits = 0 THEN 1.0
+                    ELSE greatest(0.0, least(1.0, 1.0 - h.stddevUnits / (h.avgUnits + 1)))
+               END AS confidenceScore,
+               'weighted_moving_avg_weekly' AS modelUsed,
+               current_timestamp AS computedAt
+        FROM historical_avg h
+        JOIN forecast_dates f ON h.dayOfWeek = f.dayOfWeek
+    """, f"{gold_dir}/forecast", GOLD_PARTITION_COLS)
+    logger.info("  ✓ forecast — %d records written to gold layer", count)
+
+    # Per-item forecast with the same model function job4 runs in applyInPandas
+    logger.info("Generating per-item forecasts...")
+    import pandas as pd
+
+    history_start = reference_date - timedelta(days=ITEM_FORECAST_HISTORY_DAYS)
+    item_daily = con.execute(f"""
+        SELECT restaurantId, menuItemId, CAST(createdDate AS DATE) AS createdDate,
+               sum(quantity) AS dailyUnits
+        FROM items
+        WHERE status != 'CANCELLED'
+          AND menuItemId IS NOT NULL
+          AND CAST(createdDate AS DATE) BETWEEN DATE {_sql_str(history_start)}
+                                            AND DATE {_sql_str(fold_until)}
+        GROUP BY restaurantId, menuItemId, CAST(createdDate AS DATE)
+    """).fetchdf()
+    if item_daily.empty:
+        logger.warning("  ⚠ No item sales since %s — skipping per-item forecasts", history_start)
+    else:
+        forecast_days = [reference_date + timedelta(days=delta) for delta in range(1, 8)]
+        forecast_item = item_forecaster(fold_until, forecast_days)
+        item_forecast = pd.concat(
+            [forecast_item(group) for _, group in item_daily.groupby(["restaurantId", "menuItemId"])],
+            ignore_index=True,
+        )
+        con.register("item_forecast", item_forecast)
+        count = copy_parquet(con, f"""
+            SELECT restaurantId, menuItemId, CAST(estimateDate AS DATE) AS estimateDate,
+                   CAST(expectedQuantity AS INTEGER) AS expectedQuantity,
+                   CAST(confidenceBps AS INTEGER) AS confidenceBps, method,
+                   {_sql_str('job4_batch_' + reference_date_str)} AS jobRunId,
+                   current_timestamp AS computedAt
+            FROM item_forecast
+        """, f"{gold_dir}/analytic_demand_estimate", GOLD_PARTITION_COLS)
+        con.unregister("item_forecast")
+        logger.info("  ✓ analytic_demand_estimate — %d records written to gold layer", count)
+
+    logger.info("Job 4 (DuckDB): Demand Estimate — completed successfully")
+
+
+# ---------------------------------------------------------------------------
+# Job 6: Hourly Velocity
+# ---------------------------------------------------------------------------
+
+def hourly_velocity(con, args):
+    """Compute one restaurant's hourly velocity (job6)."""
+    restaurant_id = args.restaurant_id
+    business_date = args.date
+
+    silver_dir = (SILVER_INCREMENTAL_PATH if args.incremental
+                  else os.path.join(SILVER_PATH, business_date))
+    gold_dir = os.path.join(GOLD_PATH, business_date)
+
+    logger.info("=" * 60)
+    logger.info("Job 6 (DuckDB): Hourly Velocity — starting")
+    logger.info("  Restaurant: %s", restaurant_id)
+    logger.info("  Date: %s", business_date)
+    logger.info("  Silver dir: %s", silver_dir)
+    logger.info("  Gold dir: %s", gold_dir)
+    logger.info("=" * 60)
+
+    # Only this restaurant's silver partition is read
+    orders_dir = os.path.join(silver_dir, "orders_enriched", f"restaurantId={restaurant_id}")
+    if not os.path.isdir(orders_dir):
+        logger.warning("No orders found for restaurant %s on %s", restaurant_id, business_date)
+        return
+    register_parquet(con, "orders", orders_dir, business_date if args.incremental else None)
+
+    output_path = os.path.join(gold_dir, "analytic_restaurant_hourly_velocity")
+    con.execute(f"""
+        CREATE TEMP TABLE velocity AS
+        SELECT {_sql_str(restaurant_id)} AS restaurantId,
+               hour(CAST(createdAt AS TIMESTAMPTZ)) AS hourBin,
+               CAST(sum(totalCents) AS BIGINT) AS revenueCents,
+               count(id) AS orderCount,
+               {_sql_str(business_date)} AS businessDate,
+               'job_6_ondemand' AS jobRunId,
+               current_timestamp AS computedAt
+        FROM orders
+        GROUP BY hour(CAST(createdAt AS TIMESTAMPTZ))
+    """)
+    count = copy_parquet(con, "SELECT * FROM velocity", output_path, GOLD_PARTITION_COLS,
+                         dynamic=True)
+    logger.info("  ✓ hourly_velocity — %d records written to gold layer", count)
+
+    # Write-back to Supabase (optional best-effort), as job6 does over JDBC
+    try:
+        import psycopg2
+        import psycopg2.extras
+
+        result = con.execute("SELECT * FROM velocity")
+        columns = ", ".join(f'"{c[0]}"' for c in result.description)
+        rows = result.fetchall()
+        params = parse_jdbc_url(JDBC_URL)
+        params["user"] = JDBC_PROPS.get("user", "")
+        params["password"] = JDBC_PROPS.get("password", "")
+        conn = psycopg2.connect(**params)
+        try:
+            with conn, conn.cursor() as cur:
+                psycopg2.extras.execute_values(
+                    cur,
+                    f'INSERT INTO "analytic_restaurant_hourly_velocity" ({columns}) VALUES %s',
+                    rows,
+                )
+        finally:
+            conn.close()
+        logger.info("  ✓ hourly_velocity — written to Supabase")
+    except Exception as e:
+        logger.warning("  ⚠ Supabase write-back skipped: %s", e)
+
+    logger.info("Job 6 (DuckDB): Hourly Velocity — completed successfully")
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+# Orchestrator job type → (Spark job module whose arguments are accepted, function)
+ENGINE_JOBS = {
+    "SILVER": ("job2_build_silver", build_silver),
+    "GOLD": ("job3_aggregate_gold", aggregate_gold),
+    "DEMAND_FORECAST": ("job4_demand_estimate", demand_estimate),
+    "HOURLY_VELOCITY": ("job6_hourly_velocity", hourly_velocity),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a silver/gold job on DuckDB")
+    parser.add_argument("job", choices=sorted(ENGINE_JOBS),
+                        help="Job type, as accepted by the orchestrator")
+    parser.add_argument("job_args", nargs=argparse.REMAINDER,
+                        help="Arguments of the corresponding Spark job")
+    cli = parser.parse_args()
+
+    module_name, job = ENGINE_JOBS[cli.job]
+    args = importlib.import_module(f"jobs.{module_name}").parse_args(cli.job_args)
+
+    con = connect()
+    try:
+        job(con, args)
+    except Exception as exc:
+        logger.exception("%s (DuckDB) — FAILED: %s", cli.job, exc)
+        raise
+    finally:
+        con.close()
+
+
+if __name__ == "__main__":
+    main()
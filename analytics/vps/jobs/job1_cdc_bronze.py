@@ -0,0 +1,328 @@
+"""
+Job 1 (CDC): Bronze ingestion from PostgreSQL logical replication.
+
+Long-running alternative to job1's nightly JDBC polling for the hot
+transactional tables. Consumes a wal2json (format-version 2) logical
+replication slot and appends the changes in micro-batches to the same
+incremental bronze layout job1 ``--incremental`` writes
+(``BRONZE_INCREMENTAL_PATH/<table>``, partitioned by ``businessDate`` and
+``restaurantId``, same ``TABLE_COLUMNS`` pruning).
+
+Every change becomes one row tagged with ``_cdcOp`` (``I``/``U``/``D``),
+``_lsn`` and ``_extractedAt`` (the commit timestamp); readers keep the latest
+row per ``id``. Deletes only carry the replica identity, so the captured
+tables must use ``REPLICA IDENTITY FULL``: with the default (primary key) a
+delete has no ``createdAt``/``restaurantId`` and could not be written to its
+row's partition. The job checks this at startup. The slot position is
+confirmed to PostgreSQL only after a batch has been written, so a crash
+replays the unconfirmed changes instead of losing them.
+
+The slot needs ``wal_level=logical`` and a direct (non-pooled) connection,
+and each captured table ``ALTER TABLE "<table>" REPLICA IDENTITY FULL``.
+For local testing, ``docker-compose -f docker-compose.analytics.yml --profile
+cdc up -d cdc-postgres`` starts a Postgres with wal2json on port 5433.
+
+Usage:
+    spark-submit jobs/job1_cdc_bronze.py \
+        [--tables RestaurantOrder,OrderItem,OrderItemStatusEvent] \
+        [--slot-name NAME] \
+        [--batch-max-rows N] \
+        [--batch-seconds S] \
+        [--max-batches N]
+"""
+
+import sys
+import os
+import json
+import select
+import logging
+import argparse
+from datetime import datetime
+
+# Add project root to path so config.settings can be imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import (
+    BRONZE_INCREMENTAL_PATH, LOGS_PATH,
+    JDBC_URL, JDBC_PROPS,
+    SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS,
+    CDC_SLOT_NAME, CDC_TABLES, CDC_BATCH_MAX_ROWS, CDC_BATCH_SECONDS,
+)
+from jobs.common import parse_jdbc_url
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+os.makedirs(LOGS_PATH, exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s — %(message)s",
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(os.path.join(LOGS_PATH, "job1_cdc_bronze.log")),
+    ],
+)
+logger = logging.getLogger(__name__)
+
+# Imported after logging is configured: job1 sets up its own handlers at import
+from jobs.job1_extract_bronze import (  # noqa: E402
+    TABLE_COLUMNS, DATE_COL, BUSINESS_DATE_COL, BUSINESS_TIMEZONE, save_as_parquet,
+)
+
+# ---------------------------------------------------------------------------
+# wal2json → Spark
+# ---------------------------------------------------------------------------
+
+# wal2json reports PostgreSQL type names; anything not listed stays a string
+# (text, uuid, enums, json).
+PG_TYPE_CASTS = {
+    "smallint": "int",
+    "integer": "int",
+    "bigint": "bigint",
+    "boolean": "boolean",
+    "real": "double",
+    "double precision": "double",
+    "numeric": "double",
+    "date": "date",
+}
+
+CDC_META_COLS = ["_cdcOp", "_lsn", "_extractedAt"]
+
+
+def spark_cast(pg_type):
+    """Spark SQL type for a wal2json column type (``None`` keeps the string)."""
+    if pg_type.startswith("timestamp"):
+        return "timestamp"
+    return PG_TYPE_CASTS.get(pg_type)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stream bronze changes from logical replication")
+    parser.add_argument("--tables", type=str, default=",".join(CDC_TABLES),
+                        help="Comma-separated tables to capture (default: CDC_TABLES)")
+    parser.add_argument("--slot-name", type=str, default=CDC_SLOT_NAME,
+                        help="Logical replication slot, created if missing (default: CDC_SLOT_NAME)")
+    parser.add_argument("--batch-max-rows", type=int, default=CDC_BATCH_MAX_ROWS,
+                        help="Flush a micro-batch after this many changes")
+    parser.add_argument("--batch-seconds", type=float, default=CDC_BATCH_SECONDS,
+                        help="Flush a micro-batch at least this often")
+    parser.add_argument("--max-batches", type=int, default=None,
+                        help="Stop after N flushed batches (default: run forever)")
+    return parser.parse_args()
+
+
+def check_replica_identity(tables):
+    """
+    Raise unless every captured table has ``REPLICA IDENTITY FULL``, so that
+    deletes carry the partition columns (``createdAt``, ``restaurantId``).
+    """
+    import psycopg2
+
+    params = parse_jdbc_url(JDBC_URL)
+    params["user"] = JDBC_PROPS.get("user", "")
+    params["password"] = JDBC_PROPS.get("password", "")
+    conn = psycopg2.connect(**params)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(
+                """
+                SELECT c.relname, c.relreplident
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                WHERE n.nspname = 'public' AND c.relname = ANY(%s)
+                """,
+                (list(tables),),
+            )
+            identity = dict(cur.fetchall())
+    finally:
+        conn.close()
+
+    missing = [t for t in tables if identity.get(t) != "f"]
+    if missing:
+        raise RuntimeError(
+            "Captured tables need REPLICA IDENTITY FULL so deletes can be partitioned: "
+            + "; ".join(f'ALTER TABLE "{t}" REPLICA IDENTITY FULL' for t in missing)
+        )
+
+
+def open_replication_cursor(slot_name, tables):
+    """Connect in replication mode, create the slot if needed and start streaming."""
+    import psycopg2
+    import psycopg2.errors
+    import psycopg2.extras
+
+    params = parse_jdbc_url(JDBC_URL)
+    params["user"] = JDBC_PROPS.get("user", "")
+    params["password"] = JDBC_PROPS.get("password", "")
+    conn = psycopg2.connect(connection_factory=psycopg2.extras.LogicalReplicationConnection,
+                            **params)
+    cur = conn.cursor()
+    try:
+        cur.create_replication_slot(slot_name, output_plugin="wal2json")
+        logger.info("Created replication slot %s", slot_name)
+    except psycopg2.errors.DuplicateObject:
+        logger.info("Resuming replication slot %s", slot_name)
+
+    cur.start_replication(
+        slot_name=slot_name,
+        decode=True,
+        options={
+            "format-version": "2",
+            "include-timestamp": "1",
+            "include-types": "1",
+            "add-tables": ",".join(f"public.{t}" for t in tables),
+        },
+    )
+    return conn, cur
+
+
+def change_to_row(change, lsn, commit_ts):
+    """
+    Flatten one wal2json v2 change into ``(table, row, pg_types)``.
+    Returns None for transaction markers and tables outside the manifest.
+    """
+    action = change.get("action")
+    if action not in ("I", "U", "D"):
+        return None
+    table = change["table"]
+    keep = set(TABLE_COLUMNS.get(table, []))
+    # Deletes only carry the replica identity (every column with FULL)
+    fields = change.get("columns") or change.get("identity") or []
+    if action == "D":
+        present = {field["name"] for field in fields}
+        absent = [c for c in (DATE_COL, "restaurantId") if c not in present and c in keep]
+        if absent:
+            # Would land outside its row's partition (or unpartitioned) and
+            # never match it in silver; fail before the slot is confirmed
+            raise ValueError(
+                f"Delete on {table} lacks {', '.join(absent)}: "
+                f'run ALTER TABLE "{table}" REPLICA IDENTITY FULL'
+            )
+    row, pg_types = {}, {}
+    for field in fields:
+        if keep and field["name"] not in keep:
+            continue
+        value = field.get("value")
+        row[field["name"]] = None if value is None else str(value)
+        pg_types[field["name"]] = field.get("type", "text")
+    row.update({"_cdcOp": action, "_lsn": lsn, "_extractedAt": commit_ts})
+    return table, row, pg_types
+
+
+def flush_batch(spark, batch):
+    """Append the buffered changes of every table to incremental bronze."""
+    from pyspark.sql import functions as F
+    from pyspark.sql.types import StructType, StructField, StringType, LongType
+
+    for table, (rows, pg_types) in batch.items():
+        data_cols = [c for c in TABLE_COLUMNS.get(table, sorted(pg_types)) if c in pg_types]
+        schema = StructType(
+            [StructField(c, StringType()) for c in data_cols]
+            + [StructField("_cdcOp", StringType()), StructField("_lsn", LongType()),
+               StructField("_extractedAt", StringType())]
+        )
+        df = spark.createDataFrame(
+            [tuple(r.get(c) for c in data_cols + CDC_META_COLS) for r in rows], schema
+        )
+        for col in data_cols:
+            cast = spark_cast(pg_types[col])
+            if cast:
+                df = df.withColumn(col, F.col(col).cast(cast))
+        df = df.withColumn("_extractedAt", F.col("_extractedAt").cast("timestamp"))
+        if DATE_COL in df.columns:
+            df = df.withColumn(
+                BUSINESS_DATE_COL,
+                F.to_date(F.convert_timezone(F.lit("UTC"), F.lit(BUSINESS_TIMEZONE),
+                                             F.col(DATE_COL))),
+            )
+        table_path = os.path.join(BRONZE_INCREMENTAL_PATH, table)
+        count = save_as_parquet(df, table_path,
+                                partition_col=[BUSINESS_DATE_COL, "restaurantId"],
+                                mode="append")
+        logger.info("  ✓ %s — %d changes appended to %s", table, count, table_path)
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def main():
+    args = parse_args()
+    tables = [t.strip() for t in args.tables.split(",") if t.strip()]
+
+    logger.info("=" * 60)
+    logger.info("Job 1 (CDC): Bronze ingestion — starting")
+    logger.info("  Slot: %s", args.slot_name)
+    logger.info("  Tables: %s", ", ".join(tables))
+    logger.info("  Output base: %s", BRONZE_INCREMENTAL_PATH)
+    logger.info("  Batches: %d rows / %.0f seconds", args.batch_max_rows, args.batch_seconds)
+    logger.info("=" * 60)
+
+    # Before Spark starts: without FULL identity deletes cannot be partitioned
+    check_replica_identity(tables)
+
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .appName("bouquet-cdc-bronze")
+        .master("local[*]")
+        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        .config("spark.sql.session.timeZone", "UTC")
+        .getOrCreate()
+    )
+
+    conn, cur = open_replication_cursor(args.slot_name, tables)
+    batch, batch_rows, batch_lsn = {}, 0, None
+    commit_ts = None
+    batch_started = datetime.now()
+    batches_flushed = 0
+
+    try:
+        while args.max_batches is None or batches_flushed < args.max_batches:
+            msg = cur.read_message()
+            if msg is not None:
+                payload = json.loads(msg.payload)
+                if payload.get("action") == "B":
+                    # Begin marker carries the transaction's commit timestamp
+                    commit_ts = payload.get("timestamp")
+                converted = change_to_row(payload, msg.data_start,
+                                          payload.get("timestamp", commit_ts))
+                if converted is not None:
+                    table, row, pg_types = converted
+                    rows, types = batch.setdefault(table, ([], {}))
+                    rows.append(row)
+                    types.update(pg_types)
+                    batch_rows += 1
+                batch_lsn = msg.data_start
+            else:
+                # Idle: wait for the server, sending keepalives meanwhile
+                select.select([cur], [], [], 1.0)
+
+            elapsed = (datetime.now() - batch_started).total_seconds()
+            if batch_rows >= args.batch_max_rows or (elapsed >= args.batch_seconds and batch_lsn):
+                if batch:
+                    logger.info("Flushing micro-batch: %d changes (%.1fs)", batch_rows, elapsed)
+                    flush_batch(spark, batch)
+                    batches_flushed += 1
+                # Only now may PostgreSQL recycle the WAL behind this batch
+                cur.send_feedback(flush_lsn=batch_lsn)
+                batch, batch_rows, batch_lsn = {}, 0, None
+                batch_started = datetime.now()
+
+    except KeyboardInterrupt:
+        logger.info("Interrupted — unflushed changes will be replayed from the slot")
+    except Exception as exc:
+        logger.exception("Job 1 (CDC): Bronze ingestion — FAILED: %s", exc)
+        raise
+    finally:
+        logger.info("Job 1 (CDC): Bronze ingestion — stopped after %d batches", batches_flushed)
+        conn.close()
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,23 +5,56 @@ Reads transactional tables (last 90 days by default), catalog tables (full load)
 and the Payment table from Supabase via JDBC, writing the results as Parquet files
 in the bronze layer.
 
+Transactional tables and Payment are read in parallel: the subquery is split into
+``--num-partitions`` slices, either by ``createdAt`` ranges (``date``) or by a hash
+of ``id`` (``hash``), so each Spark task pulls its slice over its own connection.
+
+With ``--incremental`` only rows created or updated after the table's stored
+high-watermark are pulled and appended to a stable dataset under
+``BRONZE_INCREMENTAL_PATH/<table>``, partitioned by ``businessDate``. A row that
+is updated again is appended again; readers keep the latest ``_extractedAt``
+per ``id``. The first incremental run bootstraps from the regular date window.
+Watermarks trail each run's cutoff by ``BRONZE_WATERMARK_LAG_SECONDS``, so
+rows of transactions still open at the read are caught by the next run (the
+overlap is appended twice and deduplicated the same way).
+
+Only the columns listed in ``TABLE_COLUMNS`` are selected, so free text, secrets
+and other fields no silver/gold step reads never leave the database. Pass
+``--all-columns`` to fall back to ``SELECT *``.
+
+Tables are extracted concurrently: up to ``--max-concurrent-tables`` tables are
+in flight at once, and each one reserves as many slots of the
+``--max-connections`` budget as it opens JDBC connections. Row counts are
+collected as write metrics, so every table is scanned exactly once.
+
 Usage:
     spark-submit jobs/job1_extract_bronze.py \
         [--restaurant-id UUID] \
         [--date-from YYYY-MM-DD] \
-        [--date-to YYYY-MM-DD]
+        [--date-to YYYY-MM-DD] \
+        [--num-partitions N] \
+        [--fetchsize N] \
+        [--partition-strategy date|hash] \
+        [--max-concurrent-tables N] \
+        [--max-connections N] \
+        [--all-columns] \
+        [--incremental]
 """
 
 import sys
 import os
+import json
 import logging
 import argparse
-from datetime import date, datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta, timezone
 
 # Add project root to path so config.settings can be imported
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.settings import *
+from jobs.common import thread_target, write_parquet
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -73,14 +106,79 @@ CATALOG_TABLES = [
 # Payment table: partitioned by createdAt, window-filtered
 PAYMENT_TABLE = "Payment"
 
+# Columns extracted per table, pushed down into the JDBC subquery. Derived
+# from what job2_build_silver.py and the gold jobs read (keys, status,
+# timestamps and amounts); tables missing here are extracted with SELECT *.
+# Every table keeps "id" and its DATE_COL / watermark column.
+TABLE_COLUMNS = {
+    # Transactional
+    "RestaurantOrder": ["id", "restaurantId", "diningSessionId", "source", "status",
+                        "createdAt", "updatedAt", "closedAt", "cancelledAt"],
+    "OrderItem": ["id", "orderId", "menuItemId", "variantId", "stationId", "status",
+                  "quantity", "itemNameSnapshot", "unitPriceCents", "subtotalCents",
+                  "taxAmountCents", "totalCents", "createdAt", "updatedAt"],
+    "OrderItemModifier": ["id", "orderItemId", "modifierOptionId", "quantity",
+                          "unitAdjustmentCents", "totalAdjustmentCents", "createdAt"],
+    "OrderItemStatusEvent": ["id", "orderItemId", "fromStatus", "toStatus", "createdAt"],
+    "Settlement": ["id", "restaurantId", "diningSessionId", "currency", "status",
+                   "splitMode", "subtotalCents", "discountCents", "tipAmountCents",
+                   "taxAmountCents", "totalCents", "amountSettledCents", "remainingCents",
+                   "createdAt", "updatedAt", "settledAt"],
+    "SettlementContribution": ["id", "settlementId", "method", "status", "amountCents",
+                               "createdAt"],
+    "SettlementAllocation": ["id", "settlementId", "contributionId", "orderItemId",
+                             "amountCents", "createdAt"],
+    "AppliedAdjustment": ["id", "restaurantId", "orderItemId", "settlementId", "type",
+                          "calculationMode", "status", "valueBps", "valueCents",
+                          "amountCents", "createdAt"],
+    # Catalog
+    "RestaurantMenuItem": ["id", "restaurantId", "categoryId", "stationId", "name",
+                           "priceCents", "archivedAt"],
+    "ModifierGroup": ["id", "restaurantId", "name"],
+    "ModifierOption": ["id", "groupId", "name", "priceAdjustmentCents"],
+    "RestaurantCategory": ["id", "restaurantId", "name"],
+    "Chain": ["id", "name", "currency"],
+    "Zone": ["id", "chainId", "name"],
+    "Restaurant": ["id", "chainId", "zoneId", "name", "currency", "archivedAt"],
+    "Station": ["id", "restaurantId", "name"],
+    "DiningSession": ["id", "restaurantId", "status", "pax", "openedAt", "activatedAt",
+                      "firstOrderAt", "settledAt", "closedAt", "updatedAt"],
+    "DiningSessionTable": ["id", "diningSessionId", "tableId", "joinedAt", "leftAt"],
+    "DiningTable": ["id", "restaurantId", "number", "capacity", "status"],
+    "Guest": ["id", "diningSessionId", "isHost", "joinedAt", "leftAt", "createdAt"],
+    # Payment
+    "Payment": ["id", "restaurantId", "tableId", "sessionId", "orderId", "status",
+                "method", "splitMode", "splitCount", "paxPaid", "currency", "subtotal",
+                "tipAmount", "totalAmount", "amountPaid", "createdAt", "paidAt"],
+}
+
 # Column used for date partitioning on transactional/payment tables
 DATE_COL = "createdAt"
 
+# Column hashed by the "hash" partition strategy
+ID_COL = "id"
+
+# Window used when no --date-from is given (must match build_where_clause)
+DEFAULT_WINDOW_DAYS = 90
+
+# Incremental mode: column tracked by the high-watermark of each table.
+# Mutable tables use updatedAt so late status changes are picked up again;
+# append-only tables fall back to DATE_COL.
+WATERMARK_COLS = {
+    "RestaurantOrder": "updatedAt",
+    "OrderItem": "updatedAt",
+    "Settlement": "updatedAt",
+}
+
+# Partition column added to incremental bronze, derived from DATE_COL
+BUSINESS_DATE_COL = "businessDate"
+BUSINESS_TIMEZONE = "America/Mexico_City"
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Extract bronze layer from Supabase")
     parser.add_argument("--restaurant-id", type=str, default=None,
                         help="Optional restaurant UUID to filter by")
@@ -88,7 +186,40 @@ def parse_args():
                         help="Start date in YYYY-MM-DD format (default: 90 days ago)")
     parser.add_argument("--date-to", type=str, default=None,
                         help="End date in YYYY-MM-DD format (default: today)")
-    return parser.parse_args()
+    parser.add_argument("--num-partitions", type=int, default=JDBC_NUM_PARTITIONS,
+                        help="Parallel JDBC reads per transactional table "
+                             "(default: JDBC_NUM_PARTITIONS)")
+    parser.add_argument("--fetchsize", type=int, default=JDBC_FETCHSIZE,
+                        help="Rows fetched per JDBC round-trip (default: JDBC_FETCHSIZE)")
+    parser.add_argument("--partition-strategy", choices=("date", "hash"),
+                        default=JDBC_PARTITION_STRATEGY,
+                        help="Split reads by createdAt ranges or by a hash of id "
+                             "(default: JDBC_PARTITION_STRATEGY)")
+    parser.add_argument("--max-concurrent-tables", type=int,
+                        default=EXTRACT_MAX_CONCURRENT_TABLES,
+                        help="Tables extracted at the same time "
+                             "(default: EXTRACT_MAX_CONCURRENT_TABLES)")
+    parser.add_argument("--max-connections", type=int, default=JDBC_MAX_CONNECTIONS,
+                        help="Upper bound on open JDBC connections across all tables "
+                             "(default: JDBC_MAX_CONNECTIONS)")
+    parser.add_argument("--all-columns", action="store_true",
+                        help="Extract every column (SELECT *) instead of TABLE_COLUMNS")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Pull only rows newer than each table's watermark and "
+                             "append them to BRONZE_INCREMENTAL_PATH")
+    args = parser.parse_args(argv)
+    if args.incremental and (args.restaurant_id or args.date_to):
+        # A filtered run would advance the shared watermark past rows it never read
+        parser.error("--incremental cannot be combined with --restaurant-id or --date-to")
+    return args
+
+
+def select_list(table_name, all_columns=False):
+    """Quoted column list for the table's JDBC subquery (``*`` when not pruned)."""
+    columns = TABLE_COLUMNS.get(table_name)
+    if all_columns or not columns:
+        return "*"
+    return ", ".join(f'"{col}"' for col in columns)
 
 
 def build_where_clause(date_col, date_from, date_to, restaurant_id):
@@ -116,51 +247,253 @@ def build_where_clause(date_col, date_from, date_to, restaurant_id):
     return ""
 
 
-def read_partitioned_table(spark, table_name, date_col, date_from, date_to, restaurant_id):
+def build_incremental_where_clause(watermark_col, watermark, cutoff, date_from):
+    """
+    Build the WHERE clause for an incremental pull: rows whose
+    ``watermark_col`` is in ``(watermark, cutoff]``. Without a stored
+    watermark the lower bound is the regular ``--date-from`` / 90-day window.
+    """
+    if watermark:
+        lower = f'"{watermark_col}" > \'{watermark}\'::timestamp'
+    elif date_from:
+        lower = f'"{DATE_COL}" >= \'{date_from}\'::timestamp'
+    else:
+        lower = f'"{DATE_COL}" >= NOW() - INTERVAL \'{DEFAULT_WINDOW_DAYS} days\''
+    return f' WHERE {lower} AND "{watermark_col}" <= \'{cutoff}\'::timestamp'
+
+
+def load_watermarks(path):
+    """Return the ``{table: ISO timestamp}`` watermark map, empty on first run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save_watermarks(path, watermarks):
+    """Persist the watermark map atomically (write to a temp file, then rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(watermarks, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class ConnectionBudget:
+    """
+    Counting semaphore with weighted acquire, bounding the JDBC connections
+    opened by concurrently extracted tables. A request larger than the whole
+    budget is clamped so it can still run on its own.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(1, capacity)
+        self.available = self.capacity
+        self._cond = threading.Condition()
+
+    def acquire(self, slots):
+        slots = min(max(1, slots), self.capacity)
+        with self._cond:
+            self._cond.wait_for(lambda: self.available >= slots)
+            self.available -= slots
+        return slots
+
+    def release(self, slots):
+        with self._cond:
+            self.available += slots
+            self._cond.notify_all()
+
+
+def jdbc_properties(fetchsize):
+    """JDBC_PROPS plus the fetch size used for every read."""
+    props = dict(JDBC_PROPS)
+    props["fetchsize"] = str(fetchsize)
+    return props
+
+
+def resolve_date_bounds(date_from, date_to):
     """
-    Read a transactional table via JDBC with a date-filtered subquery.
+    Return (lower, upper) timestamps bounding the extraction window.
+
+    Only used to compute the stride of ``createdAt`` range partitions; rows
+    outside the bounds are still read (by the first/last partition), the
+    actual filter lives in the WHERE clause.
+    """
+    if date_from:
+        lower = datetime.fromisoformat(date_from)
+    else:
+        lower = datetime.combine(date.today() - timedelta(days=DEFAULT_WINDOW_DAYS),
+                                 datetime.min.time())
+    if date_to:
+        upper = datetime.fromisoformat(date_to) + timedelta(days=1)
+    else:
+        upper = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    return lower, upper
+
+
+def hash_predicates(id_col, num_partitions):
+    """One WHERE predicate per partition, bucketing rows by a hash of ``id_col``."""
+    return [
+        f'(hashtext("{id_col}") & 2147483647) % {num_partitions} = {bucket}'
+        for bucket in range(num_partitions)
+    ]
+
+
+def read_partitioned_table(spark, table_name, where, bounds, partition_col=DATE_COL,
+                           num_partitions=1, fetchsize=JDBC_FETCHSIZE, strategy="date",
+                           columns="*"):
+    """
+    Read a transactional table via JDBC with a filtered subquery.
+
+    With ``num_partitions`` > 1 the subquery is split into that many parallel
+    reads, by ``partition_col`` ranges over ``bounds`` (``strategy="date"``)
+    or by a hash of the ``id`` column (``strategy="hash"``). ``columns`` is
+    the SELECT list pushed into the subquery.
     Returns a DataFrame or None if the table is empty / unavailable.
     """
-    where = build_where_clause(date_col, date_from, date_to, restaurant_id)
-    subquery = f'(SELECT * FROM "{table_name}"{where}) t'
+    subquery = f'(SELECT {columns} FROM "{table_name}"{where}) t'
+    props = jdbc_properties(fetchsize)
 
     logger.info("  → Subquery: %s", subquery)
-    df = spark.read.jdbc(
-        url=JDBC_URL,
-        table=subquery,
-        properties=JDBC_PROPS,
+    if num_partitions <= 1:
+        return spark.read.jdbc(url=JDBC_URL, table=subquery, properties=props)
+
+    if strategy == "hash":
+        logger.info("  → %d partitions on hash(%s)", num_partitions, ID_COL)
+        return spark.read.jdbc(
+            url=JDBC_URL,
+            table=subquery,
+            predicates=hash_predicates(ID_COL, num_partitions),
+            properties=props,
+        )
+
+    lower, upper = bounds
+    logger.info("  → %d partitions on %s [%s, %s)", num_partitions, partition_col, lower, upper)
+    # DataFrameReader.jdbc() only accepts integral bounds, so timestamp
+    # partitioning goes through the generic JDBC options.
+    return (
+        spark.read.format("jdbc")
+        .option("url", JDBC_URL)
+        .option("dbtable", subquery)
+        .option("partitionColumn", partition_col)
+        .option("lowerBound", lower.isoformat(sep=" "))
+        .option("upperBound", upper.isoformat(sep=" "))
+        .option("numPartitions", num_partitions)
+        .options(**props)
+        .load()
     )
-    return df
 
 
-def read_catalog_table(spark, table_name):
+def read_catalog_table(spark, table_name, fetchsize=JDBC_FETCHSIZE, columns="*"):
     """Read a small catalog table in full."""
     df = spark.read.jdbc(
         url=JDBC_URL,
-        table=f'"{table_name}"',
-        properties=JDBC_PROPS,
+        table=f'(SELECT {columns} FROM "{table_name}") t',
+        properties=jdbc_properties(fetchsize),
     )
     return df
 
 
-def save_as_parquet(df, output_path, partition_col=None):
-    """Write DataFrame to Parquet, optionally partitioning by a column."""
-    writer = df.write.mode("overwrite")
-    if partition_col and partition_col in df.columns:
-        writer = writer.partitionBy(partition_col)
-    writer.parquet(output_path)
+def save_as_parquet(df, output_path, partition_col=None, mode="overwrite"):
+    """
+    Write DataFrame to Parquet, optionally partitioning by one or more columns.
+
+    Returns the number of rows written, observed during the write itself so
+    the source (a JDBC query) is not scanned a second time by ``count()``.
+    """
+    partition_cols = [partition_col] if isinstance(partition_col, str) else partition_col or []
+    partition_cols = [c for c in partition_cols if c in df.columns]
+    return write_parquet(df, output_path, mode=mode, partition_by=partition_cols)
+
+
+# Serialises updates of the shared watermark map between extraction threads
+_watermarks_lock = threading.Lock()
+
+
+def extract_partitioned_table(spark, table_name, args, output_base, cutoff, watermarks):
+    """
+    Extract one transactional/payment table and return ``(count, path)``.
+
+    Full mode overwrites ``output_base/<table>`` with the date window.
+    Incremental mode appends rows changed since the table's watermark to
+    ``BRONZE_INCREMENTAL_PATH/<table>`` and advances the watermark to
+    ``cutoff`` minus ``BRONZE_WATERMARK_LAG_SECONDS`` once the write has
+    succeeded.
+    """
+    from pyspark.sql import functions as F
+
+    if not args.incremental:
+        where = build_where_clause(DATE_COL, args.date_from, args.date_to, args.restaurant_id)
+        df = read_partitioned_table(
+            spark, table_name, where, resolve_date_bounds(args.date_from, args.date_to),
+            num_partitions=args.num_partitions,
+            fetchsize=args.fetchsize,
+            strategy=args.partition_strategy,
+            columns=select_list(table_name, args.all_columns),
+        )
+        table_path = os.path.join(output_base, table_name)
+        count = save_as_parquet(df, table_path, partition_col="restaurantId")
+        return count, table_path
+
+    watermark_col = WATERMARK_COLS.get(table_name, DATE_COL)
+    watermark = watermarks.get(table_name)
+    where = build_incremental_where_clause(watermark_col, watermark, cutoff, args.date_from)
+    lower = (datetime.fromisoformat(watermark) if watermark
+             else resolve_date_bounds(args.date_from, None)[0])
+    df = read_partitioned_table(
+        spark, table_name, where, (lower, cutoff),
+        partition_col=watermark_col,
+        num_partitions=args.num_partitions,
+        fetchsize=args.fetchsize,
+        strategy=args.partition_strategy,
+        columns=select_list(table_name, args.all_columns),
+    )
+    df = df \
+        .withColumn(BUSINESS_DATE_COL,
+                    F.to_date(F.convert_timezone(F.lit("UTC"), F.lit(BUSINESS_TIMEZONE),
+                                                 F.col(DATE_COL)))) \
+        .withColumn("_extractedAt", F.lit(cutoff.isoformat(sep=" ")).cast("timestamp"))
+    table_path = os.path.join(BRONZE_INCREMENTAL_PATH, table_name)
+    count = save_as_parquet(df, table_path, partition_col=[BUSINESS_DATE_COL, "restaurantId"],
+                            mode="append")
+    # updatedAt is set when a statement runs, not when it commits: re-read the
+    # last few minutes next time instead of skipping rows committed after now
+    advanced = cutoff - timedelta(seconds=BRONZE_WATERMARK_LAG_SECONDS)
+    if watermark:
+        advanced = max(advanced, datetime.fromisoformat(watermark))
+    with _watermarks_lock:
+        watermarks[table_name] = advanced.isoformat(sep=" ")
+        save_watermarks(BRONZE_WATERMARKS_FILE, watermarks)
+    return count, table_path
+
+
+def extract_catalog_table(spark, table_name, args, output_base):
+    """Extract one catalog table in full and return ``(count, path)``."""
+    df = read_catalog_table(spark, table_name, fetchsize=args.fetchsize,
+                            columns=select_list(table_name, args.all_columns))
+    table_path = os.path.join(output_base, table_name)
+    count = save_as_parquet(df, table_path)
+    return count, table_path
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
-
-    # Resolve today's date for the output path
+def run(spark, args):
+    """Extract the bronze layer on an existing SparkSession."""
+    # Resolve today's date for the output path; incremental runs append to a
+    # stable dataset and snapshot catalogs next to it instead.
     today_str = date.today().isoformat()
-    output_base = os.path.join(BRONZE_PATH, today_str)
+    if args.incremental:
+        output_base = BRONZE_INCREMENTAL_PATH
+    else:
+        output_base = os.path.join(BRONZE_PATH, today_str)
+
+    # Upper bound of this run's incremental window (naive UTC, like the
+    # TIMESTAMP(3) columns written by Prisma)
+    cutoff = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+    watermarks = load_watermarks(BRONZE_WATERMARKS_FILE) if args.incremental else {}
 
     logger.info("=" * 60)
     logger.info("Job 1: Extract Bronze — starting")
@@ -168,11 +501,83 @@ def main():
     logger.info("  Restaurant ID filter: %s", args.restaurant_id or "none")
     logger.info("  Date window: %s → %s",
                 args.date_from or "90 days ago", args.date_to or "today")
+    logger.info("  JDBC: %d partitions (%s), fetchsize=%d",
+                args.num_partitions, args.partition_strategy, args.fetchsize)
+    if args.incremental:
+        logger.info("  Incremental: up to %s, %d stored watermarks", cutoff, len(watermarks))
+    logger.info("  Concurrency: %d tables, %d JDBC connections",
+                args.max_concurrent_tables, args.max_connections)
     logger.info("=" * 60)
 
+    total_start = datetime.now()
+    tables_processed = 0
+    tables_failed = 0
+
+    # Largest tables first so they start while the small catalogs fill the gaps
+    tasks = [(table_name, args.num_partitions) for table_name in TRANSACTIONAL_TABLES]
+    tasks.append((PAYMENT_TABLE, args.num_partitions))
+    tasks += [(table_name, 1) for table_name in CATALOG_TABLES]
+    budget = ConnectionBudget(args.max_connections)
+
+    def run_task(table_name, connections):
+        """Extract one table within the connection budget; never raises."""
+        slots = budget.acquire(connections)
+        table_start = datetime.now()
+        logger.info("Reading %s ...", table_name)
+        try:
+            if table_name in CATALOG_TABLES:
+                count, table_path = extract_catalog_table(spark, table_name, args, output_base)
+            else:
+                count, table_path = extract_partitioned_table(
+                    spark, table_name, args, output_base, cutoff, watermarks,
+                )
+            error = None
+        except Exception as exc:
+            count, table_path, error = 0, None, exc
+        finally:
+            budget.release(slots)
+        return count, table_path, (datetime.now() - table_start).total_seconds(), error
+
+    try:
+        # Extractions inherit this thread's Spark pool and job group, or get a
+        # FAIR pool per table so they share cores instead of queueing FIFO
+        task = thread_target(run_task, pool=lambda table_name, _connections: f"bronze-{table_name}")
+        with ThreadPoolExecutor(max_workers=max(1, args.max_concurrent_tables),
+                                thread_name_prefix="extract") as pool:
+            futures = {
+                pool.submit(task, table_name, connections): table_name
+                for table_name, connections in tasks
+            }
+            for future in as_completed(futures):
+                table_name = futures[future]
+                count, table_path, elapsed, error = future.result()
+                if error is None:
+                    logger.info("  ✓ %s — %d records saved to %s (%.1fs)",
+                                table_name, count, table_path, elapsed)
+                    tables_processed += 1
+                else:
+                    logger.warning("  ✗ %s — FAILED after %.1fs: %s",
+                                   table_name, elapsed, error)
+                    tables_failed += 1
+
+    finally:
+        total_elapsed = (datetime.now() - total_start).total_seconds()
+        logger.info("=" * 60)
+        logger.info("Job 1: Extract Bronze — finished")
+        logger.info("  Tables processed: %d", tables_processed)
+        logger.info("  Tables failed:    %d", tables_failed)
+        logger.info("  Total time:       %.1f seconds", total_elapsed)
+        logger.info("=" * 60)
+
+
+def main():
+    args = parse_args()
+
     # -----------------------------------------------------------------------
     # SparkSession
     # -----------------------------------------------------------------------
+    from pyspark.sql import SparkSession
+
     spark = (
         SparkSession.builder
         .appName("bouquet-extract-bronze")
@@ -180,96 +585,17 @@ def main():
         .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
         .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
         .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        # Concurrent table extractions share cores: one FAIR pool per table (run())
+        .config("spark.scheduler.mode", "FAIR")
         .getOrCreate()
     )
 
     logger.info("SparkSession created (driver=%s, executor=%s, shuffle.partitions=%d)",
                 SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS)
 
-    total_start = datetime.now()
-    tables_processed = 0
-    tables_failed = 0
-
     try:
-        # -------------------------------------------------------------------
-        # 1. Transactional tables (date-partitioned reads)
-        # -------------------------------------------------------------------
-        logger.info("--- Transactional tables ---")
-        for table_name in TRANSACTIONAL_TABLES:
-            table_start = datetime.now()
-            logger.info("Reading %s ...", table_name)
-            try:
-                df = read_partitioned_table(
-                    spark, table_name, DATE_COL,
-                    args.date_from, args.date_to, args.restaurant_id,
-                )
-                count = df.count()
-                table_path = os.path.join(output_base, table_name)
-                save_as_parquet(df, table_path, partition_col="restaurantId")
-                elapsed = (datetime.now() - table_start).total_seconds()
-                logger.info("  ✓ %s — %d records saved to %s (%.1fs)",
-                            table_name, count, table_path, elapsed)
-                tables_processed += 1
-            except Exception as exc:
-                elapsed = (datetime.now() - table_start).total_seconds()
-                logger.warning("  ✗ %s — FAILED after %.1fs: %s",
-                               table_name, elapsed, exc)
-                tables_failed += 1
-
-        # -------------------------------------------------------------------
-        # 2. Catalog tables (full load)
-        # -------------------------------------------------------------------
-        logger.info("--- Catalog tables ---")
-        for table_name in CATALOG_TABLES:
-            table_start = datetime.now()
-            logger.info("Reading %s ...", table_name)
-            try:
-                df = read_catalog_table(spark, table_name)
-                count = df.count()
-                table_path = os.path.join(output_base, table_name)
-                save_as_parquet(df, table_path)
-                elapsed = (datetime.now() - table_start).total_seconds()
-                logger.info("  ✓ %s — %d records saved to %s (%.1fs)",
-                            table_name, count, table_path, elapsed)
-                tables_processed += 1
-            except Exception as exc:
-                elapsed = (datetime.now() - table_start).total_seconds()
-                logger.warning("  ✗ %s — FAILED after %.1fs: %s",
-                               table_name, elapsed, exc)
-                tables_failed += 1
-
-        # -------------------------------------------------------------------
-        # 3. Payment table (date-partitioned read)
-        # -------------------------------------------------------------------
-        logger.info("--- Payment table ---")
-        table_start = datetime.now()
-        logger.info("Reading %s ...", PAYMENT_TABLE)
-        try:
-            df = read_partitioned_table(
-                spark, PAYMENT_TABLE, DATE_COL,
-                args.date_from, args.date_to, args.restaurant_id,
-            )
-            count = df.count()
-            table_path = os.path.join(output_base, PAYMENT_TABLE)
-            save_as_parquet(df, table_path, partition_col="restaurantId")
-            elapsed = (datetime.now() - table_start).total_seconds()
-            logger.info("  ✓ %s — %d records saved to %s (%.1fs)",
-                        PAYMENT_TABLE, count, table_path, elapsed)
-            tables_processed += 1
-        except Exception as exc:
-            elapsed = (datetime.now() - table_start).total_seconds()
-            logger.warning("  ✗ %s — FAILED after %.1fs: %s",
-                           PAYMENT_TABLE, elapsed, exc)
-            tables_failed += 1
-
+        run(spark, args)
     finally:
-        total_elapsed = (datetime.now() - total_start).total_seconds()
-        logger.info("=" * 60)
-        logger.info("Job 1: Extract Bronze — finished")
-        logger.info("  Tables processed: %d", tables_processed)
-        logger.info("  Tables failed:    %d", tables_failed)
-        logger.info("  Total time:       %.1f seconds", total_elapsed)
-        logger.info("=" * 60)
         spark.stop()
 
 
@@ -2,23 +2,38 @@
 Job 2: Build Silver — Clean, join, and enrich bronze data into silver layer.
 
 Reads Parquet from the bronze layer, performs joins and transformations,
-and writes enriched datasets to the silver layer.
+and writes enriched datasets to the silver layer, partitioned by
+``restaurantId`` and ``createdDate`` (business date in America/Mexico_City).
+
+Incremental mode (``--incremental``) builds one stable silver dataset under
+``SILVER_INCREMENTAL_PATH`` from the incremental bronze layer instead. A
+manifest records a fingerprint of every bronze partition used by the last
+successful build; only the business dates whose partitions are new or changed
+are re-enriched (latest version of each row) and their silver partitions
+replaced, so nightly work follows the day's volume rather than the window.
+Catalog changes are not propagated to untouched dates; run a full build for
+that.
 
 Usage:
     spark-submit jobs/job2_build_silver.py \
-        [--date YYYY-MM-DD]
+        [--date YYYY-MM-DD] \
+        [--incremental]
 """
 
 import sys
 import os
+import json
+import hashlib
 import logging
 import argparse
-from datetime import date
+from datetime import date, timedelta
 
 # Add project root to path so config.settings can be imported
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.settings import BRONZE_PATH, SILVER_PATH, LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS
+from config.settings import BRONZE_PATH, SILVER_PATH, LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS, BROADCAST_DIMENSION_MAX_BYTES
+from config.settings import BRONZE_INCREMENTAL_PATH, SILVER_INCREMENTAL_PATH, SILVER_MANIFEST_FILE
+from jobs.common import SILVER_PARTITION_COLS, broadcast_if_small, write_partitioned
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -35,23 +50,284 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Imported after logging is configured: job1 sets up its own handlers at import
+from jobs.job1_extract_bronze import BUSINESS_DATE_COL  # noqa: E402
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
 
-def parse_args():
+# Fact tables tracked by the incremental manifest
+INCREMENTAL_FACT_TABLES = ["RestaurantOrder", "OrderItem", "OrderItemStatusEvent"]
+
+# Bookkeeping columns of incremental bronze (job1 --incremental, CDC)
+BRONZE_META_COLS = ["_extractedAt", "_lsn", "_cdcOp", BUSINESS_DATE_COL]
+
+ORDER_STATUS_LABELS = {
+    "OPEN": "Abierta", "SENT": "Enviada",
+    "PARTIALLY_READY": "Parcialmente Lista",
+    "READY": "Lista", "CLOSED": "Cerrada",
+    "CANCELLED": "Cancelada"
+}
+
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Build Silver layer from Bronze data")
     parser.add_argument("--date", type=str, default=date.today().isoformat(),
                         help="Business date in YYYY-MM-DD format")
-    return parser.parse_args()
+    parser.add_argument("--incremental", action="store_true",
+                        help="Re-enrich only bronze partitions changed since the last "
+                             "incremental build into SILVER_INCREMENTAL_PATH")
+    return parser.parse_args(argv)
+
+
+def build_orders_enriched(orders, restaurants, chains):
+    """silver_orders_enriched: orders with restaurant/chain names and local date/hour."""
+    from pyspark.sql import functions as F
+
+    status_udf = F.create_map(
+        [F.lit(k) for pair in ORDER_STATUS_LABELS.items() for k in pair]
+    )
+    return orders \
+        .join(restaurants.select("id", "name", "chainId", "zoneId"),
+              orders.restaurantId == restaurants.id, "left") \
+        .join(chains.select("id", "name"),
+              restaurants.chainId == chains.id, "left") \
+        .withColumn("restaurantName", restaurants["name"]) \
+        .withColumn("chainName", chains["name"]) \
+        .withColumn("statusLabel", status_udf[orders.status]) \
+        .withColumn("createdDate",
+                    F.to_date(F.convert_timezone("UTC",
+                              "America/Mexico_City",
+                              orders.createdAt))) \
+        .withColumn("createdHour",
+                    F.hour(F.convert_timezone("UTC",
+                           "America/Mexico_City",
+                           orders.createdAt)))
+
+
+def build_items_enriched(items, menu, categories, stations):
+    """silver_order_items_enriched: items with menu, category and station data."""
+    from pyspark.sql import functions as F
+
+    return items \
+        .join(menu.select("id", "name", "priceCents", "categoryId",
+                          "stationId", "restaurantId"),
+              items.menuItemId == menu.id, "left") \
+        .join(categories.select("id", "name"),
+              menu.categoryId == categories.id, "left") \
+        .join(stations.select("id", "name"),
+              menu.stationId == stations.id, "left") \
+        .withColumn("categoryName", categories["name"]) \
+        .withColumn("stationName", stations["name"]) \
+        .withColumn("unitPriceMXN",
+                    F.round(items.unitPriceCents / 100, 2)) \
+        .withColumn("totalMXN",
+                    F.round(items.totalCents / 100, 2)) \
+        .withColumn("createdDate",
+                    F.to_date(F.convert_timezone(F.lit("UTC"),
+                              F.lit("America/Mexico_City"),
+                              items.createdAt)))
+
+
+def build_process_events(events, items, menu, stations):
+    """
+    silver_process_events: status events with their item's restaurant and
+    station, and the stage durations derived from each item's event stream.
+    """
+    from pyspark.sql import functions as F
+    from pyspark.sql.window import Window
+
+    # Each event closes the stage its item spent in ``fromStatus``
+    # (queued → preparing → ready → served): ``durationSeconds`` is the time
+    # since the item's previous event, ``itemElapsedSeconds`` the time since
+    # its first one. The window only shuffles by item and sorts within each
+    # partition — there is no global sort.
+    item_stream = Window.partitionBy("orderItemId").orderBy("createdAt", "id")
+    created = F.col("createdAt").cast("double")
+    events = events \
+        .withColumn("durationSeconds",
+                    created - F.lag("createdAt").over(item_stream).cast("double")) \
+        .withColumn("itemElapsedSeconds",
+                    created - F.first("createdAt").over(item_stream).cast("double"))
+
+    # Items carry no restaurantId; take it from the menu item so events
+    # can be partitioned (and grouped) by restaurant.
+    item_keys = items \
+        .join(menu.select(F.col("id").alias("menuId"), "restaurantId"),
+              items.menuItemId == F.col("menuId"), "left") \
+        .select(items.id, items.menuItemId, items.stationId,
+                items.itemNameSnapshot, "restaurantId")
+    return events \
+        .join(item_keys, events.orderItemId == item_keys.id, "left") \
+        .join(stations.select("id", "name"),
+              item_keys.stationId == stations.id, "left") \
+        .withColumn("stationName", stations["name"]) \
+        .withColumn("createdDate",
+                    F.to_date(F.convert_timezone(F.lit("UTC"),
+                              F.lit("America/Mexico_City"),
+                              events.createdAt)))
+
+
+# ---------------------------------------------------------------------------
+# Incremental builds
+# ---------------------------------------------------------------------------
+
+def load_manifest(path):
+    """Return the ``{table: {partition: fingerprint}}`` manifest, empty on first run."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def save_manifest(path, manifest):
+    """Persist the manifest atomically (write to a temp file, then rename)."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def partition_fingerprints(table_path):
+    """
+    Fingerprint every partition directory of a bronze table by its Parquet
+    files (names and sizes). Appends add files, so any new extract or CDC
+    batch changes the fingerprint of the partitions it touched.
+    """
+    fingerprints = {}
+    for root, _dirs, files in os.walk(table_path):
+        parts = sorted(f"{f}:{os.path.getsize(os.path.join(root, f))}"
+                       for f in files if f.endswith(".parquet"))
+        if parts:
+            rel = os.path.relpath(root, table_path)
+            fingerprints[rel] = hashlib.sha1("\n".join(parts).encode()).hexdigest()
+    return fingerprints
+
+
+def changed_business_dates(current, previous):
+    """Business dates of the partitions in ``current`` that differ from ``previous``."""
+    dates = set()
+    for rel, fingerprint in current.items():
+        if previous.get(rel) == fingerprint:
+            continue
+        for segment in rel.split(os.sep):
+            if segment.startswith(f"{BUSINESS_DATE_COL}="):
+                dates.add(segment.split("=", 1)[1])
+    return dates
+
+
+def read_latest(spark, table, business_dates):
+    """
+    Read the given business dates of an incremental bronze table, keeping
+    only the latest version of each row and dropping rows deleted by CDC.
+    """
+    from pyspark.sql import functions as F
+    from pyspark.sql.window import Window
+
+    df = spark.read.option("mergeSchema", "true") \
+        .parquet(os.path.join(BRONZE_INCREMENTAL_PATH, table)) \
+        .filter(F.col(BUSINESS_DATE_COL).cast("string").isin(sorted(business_dates)))
+    order = [F.col("_extractedAt").desc()]
+    if "_lsn" in df.columns:
+        order.append(F.col("_lsn").desc())
+    df = df \
+        .withColumn("_version", F.row_number().over(Window.partitionBy("id").orderBy(*order))) \
+        .filter(F.col("_version") == 1) \
+        .drop("_version")
+    if "_cdcOp" in df.columns:
+        df = df.filter(F.col("_cdcOp").isNull() | (F.col("_cdcOp") != "D"))
+    return df.drop(*[c for c in BRONZE_META_COLS if c in df.columns])
+
+
+def run_incremental(spark, args):
+    """Merge the bronze partitions changed since the last build into incremental silver."""
+    logger.info("=" * 60)
+    logger.info("Job 2: Build Silver (incremental) — starting")
+    logger.info("  Bronze dir: %s", BRONZE_INCREMENTAL_PATH)
+    logger.info("  Silver dir: %s", SILVER_INCREMENTAL_PATH)
+    logger.info("=" * 60)
+
+    manifest = load_manifest(SILVER_MANIFEST_FILE)
+    current = {
+        table: partition_fingerprints(os.path.join(BRONZE_INCREMENTAL_PATH, table))
+        for table in INCREMENTAL_FACT_TABLES
+    }
+    dates = set()
+    for table in INCREMENTAL_FACT_TABLES:
+        dates |= changed_business_dates(current[table], manifest.get(table, {}))
+
+    if not dates:
+        logger.info("No new or changed bronze partitions — silver is up to date")
+        return {}
+    logger.info("Re-enriching %d business dates: %s", len(dates), ", ".join(sorted(dates)))
+
+    from pyspark.sql import functions as F
+
+    try:
+        def dimension(table):
+            path = os.path.join(BRONZE_INCREMENTAL_PATH, table)
+            df, _size = broadcast_if_small(spark.read.parquet(path), path,
+                                           BROADCAST_DIMENSION_MAX_BYTES)
+            return df
+
+        menu        = dimension("RestaurantMenuItem")
+        categories  = dimension("RestaurantCategory")
+        restaurants = dimension("Restaurant")
+        chains      = dimension("Chain")
+        stations    = dimension("Station")
+
+        orders = read_latest(spark, "RestaurantOrder", dates)
+        items  = read_latest(spark, "OrderItem", dates)
+        # Events right after midnight can belong to items created the day
+        # before; their earlier events are read too so stage durations are
+        # computed over the item's whole stream, then only ``dates`` are kept
+        event_dates = dates | {
+            (date.fromisoformat(d) - timedelta(days=1)).isoformat() for d in dates
+        }
+        events = read_latest(spark, "OrderItemStatusEvent", event_dates)
+        event_items = read_latest(spark, "OrderItem", event_dates)
+
+        # Dynamic overwrite: only the (restaurantId, createdDate) partitions of
+        # the re-enriched dates are replaced, all others stay as they are
+        outputs = [
+            ("orders_enriched", build_orders_enriched(orders, restaurants, chains)),
+            ("order_items_enriched", build_items_enriched(items, menu, categories, stations)),
+            ("process_events", build_process_events(events, event_items, menu, stations)
+                               .filter(F.col("createdDate").cast("string").isin(sorted(dates)))),
+        ]
+        for name, df in outputs:
+            path = os.path.join(SILVER_INCREMENTAL_PATH, name)
+            os.makedirs(path, exist_ok=True)
+            count = write_partitioned(df, path, SILVER_PARTITION_COLS, dynamic=True)
+            logger.info("  ✓ silver_%s — %d records merged", name, count)
+
+        save_manifest(SILVER_MANIFEST_FILE, current)
+        logger.info("Job 2: Build Silver (incremental) — completed successfully")
+        return {}
+
+    except Exception as exc:
+        logger.exception("Job 2: Build Silver (incremental) — FAILED: %s", exc)
+        raise
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
+def run(spark, args, persist=False):
+    """
+    Build the silver layer for ``args.date`` on an existing SparkSession.
+
+    Returns the silver DataFrames by dataset name. With ``persist=True`` they
+    are cached while being written, so later stages of the same application
+    reuse them instead of reading the Parquet back. Incremental builds
+    return an empty mapping.
+    """
+    if args.incremental:
+        return run_incremental(spark, args)
+
     business_date = args.date
 
     bronze_dir = os.path.join(BRONZE_PATH, business_date)
@@ -64,126 +340,101 @@ def main():
     logger.info("  Silver dir: %s", silver_dir)
     logger.info("=" * 60)
 
-    # -------------------------------------------------------------------
-    # SparkSession
-    # -------------------------------------------------------------------
-    from pyspark.sql import SparkSession
-    from pyspark.sql import functions as F
-
-    spark = (
-        SparkSession.builder
-        .appName("bouquet-build-silver")
-        .master("local[*]")
-        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
-        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
-        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
-        .getOrCreate()
-    )
-
     try:
         # -------------------------------------------------------------------
         # Read Bronze datasets
         # -------------------------------------------------------------------
         logger.info("Reading Bronze datasets...")
 
+        def dimension(table):
+            """Read a catalog table, hinted for broadcast if small enough."""
+            path = f"{bronze_dir}/{table}"
+            df, size = broadcast_if_small(spark.read.parquet(path), path,
+                                          BROADCAST_DIMENSION_MAX_BYTES)
+            logger.info("  %s: %d bytes — %s", table, size,
+                        "broadcast" if size <= BROADCAST_DIMENSION_MAX_BYTES else "shuffle join")
+            return df
+
         orders      = spark.read.parquet(f"{bronze_dir}/RestaurantOrder")
         items       = spark.read.parquet(f"{bronze_dir}/OrderItem")
         modifiers   = spark.read.parquet(f"{bronze_dir}/OrderItemModifier")
         events      = spark.read.parquet(f"{bronze_dir}/OrderItemStatusEvent")
         payments    = spark.read.parquet(f"{bronze_dir}/Payment")
-        menu        = spark.read.parquet(f"{bronze_dir}/RestaurantMenuItem")
-        categories  = spark.read.parquet(f"{bronze_dir}/RestaurantCategory")
-        restaurants = spark.read.parquet(f"{bronze_dir}/Restaurant")
-        chains      = spark.read.parquet(f"{bronze_dir}/Chain")
-        stations    = spark.read.parquet(f"{bronze_dir}/Station")
+        menu        = dimension("RestaurantMenuItem")
+        categories  = dimension("RestaurantCategory")
+        restaurants = dimension("Restaurant")
+        chains      = dimension("Chain")
+        stations    = dimension("Station")
         sessions    = spark.read.parquet(f"{bronze_dir}/DiningSession")
 
-        # -------------------------------------------------------------------
-        # Enums to labels
-        # -------------------------------------------------------------------
-        order_status_map = {
-            "OPEN": "Abierta", "SENT": "Enviada",
-            "PARTIALLY_READY": "Parcialmente Lista",
-            "READY": "Lista", "CLOSED": "Cerrada",
-            "CANCELLED": "Cancelada"
-        }
-
-        status_udf = F.create_map(
-            [F.lit(k) for pair in order_status_map.items() for k in pair]
-        )
-
         # -------------------------------------------------------------------
         # silver_orders_enriched
         # -------------------------------------------------------------------
         logger.info("Building silver_orders_enriched...")
-        silver_orders = orders \
-            .join(restaurants.select("id", "name", "chainId"),
-                  orders.restaurantId == restaurants.id, "left") \
-            .join(chains.select("id", "name"),
-                  restaurants.chainId == chains.id, "left") \
-            .withColumn("restaurantName", restaurants["name"]) \
-            .withColumn("chainName", chains["name"]) \
-            .withColumn("statusLabel", status_udf[orders.status]) \
-            .withColumn("createdDate",
-                        F.to_date(F.convert_timezone("UTC",
-                                  "America/Mexico_City",
-                                  orders.createdAt))) \
-            .withColumn("createdHour",
-                        F.hour(F.convert_timezone("UTC",
-                               "America/Mexico_City",
-                               orders.createdAt)))
+        silver_orders = build_orders_enriched(orders, restaurants, chains)
 
+        if persist:
+            silver_orders = silver_orders.persist()
         os.makedirs(os.path.join(silver_dir, "orders_enriched"), exist_ok=True)
-        silver_orders.write.mode("overwrite") \
-            .parquet(f"{silver_dir}/orders_enriched")
-        logger.info("  ✓ silver_orders_enriched — %d records", silver_orders.count())
+        count = write_partitioned(silver_orders, f"{silver_dir}/orders_enriched",
+                                  SILVER_PARTITION_COLS)
+        logger.info("  ✓ silver_orders_enriched — %d records", count)
 
         # -------------------------------------------------------------------
         # silver_order_items_enriched
         # -------------------------------------------------------------------
         logger.info("Building silver_order_items_enriched...")
-        silver_items = items \
-            .join(menu.select("id", "name", "priceCents", "categoryId",
-                              "stationId", "restaurantId"),
-                  items.menuItemId == menu.id, "left") \
-            .join(categories.select("id", "name"),
-                  menu.categoryId == categories.id, "left") \
-            .join(stations.select("id", "name"),
-                  menu.stationId == stations.id, "left") \
-            .withColumn("categoryName", categories["name"]) \
-            .withColumn("stationName", stations["name"]) \
-            .withColumn("unitPriceMXN",
-                        F.round(items.unitPriceCents / 100, 2)) \
-            .withColumn("totalMXN",
-                        F.round(items.totalCents / 100, 2))
+        silver_items = build_items_enriched(items, menu, categories, stations)
 
+        if persist:
+            silver_items = silver_items.persist()
         os.makedirs(os.path.join(silver_dir, "order_items_enriched"), exist_ok=True)
-        silver_items.write.mode("overwrite") \
-            .parquet(f"{silver_dir}/order_items_enriched")
-        logger.info("  ✓ silver_order_items_enriched — %d records", silver_items.count())
+        count = write_partitioned(silver_items, f"{silver_dir}/order_items_enriched",
+                                  SILVER_PARTITION_COLS)
+        logger.info("  ✓ silver_order_items_enriched — %d records", count)
 
         # -------------------------------------------------------------------
         # silver_process_events
         # -------------------------------------------------------------------
         logger.info("Building silver_process_events...")
-        silver_events = events \
-            .join(items.select("id", "menuItemId", "stationId",
-                               "itemNameSnapshot"),
-                  events.orderItemId == items.id, "left") \
-            .join(stations.select("id", "name"),
-                  items.stationId == stations.id, "left") \
-            .withColumn("stationName", stations["name"])
+        silver_events = build_process_events(events, items, menu, stations)
 
+        if persist:
+            silver_events = silver_events.persist()
         os.makedirs(os.path.join(silver_dir, "process_events"), exist_ok=True)
-        silver_events.write.mode("overwrite") \
-            .parquet(f"{silver_dir}/process_events")
-        logger.info("  ✓ silver_process_events — %d records", silver_events.count())
+        count = write_partitioned(silver_events, f"{silver_dir}/process_events",
+                                  SILVER_PARTITION_COLS)
+        logger.info("  ✓ silver_process_events — %d records", count)
 
         logger.info("Job 2: Build Silver — completed successfully")
+        return {
+            "orders_enriched": silver_orders,
+            "order_items_enriched": silver_items,
+            "process_events": silver_events,
+        }
 
     except Exception as exc:
         logger.exception("Job 2: Build Silver — FAILED: %s", exc)
         raise
+
+
+def main():
+    args = parse_args()
+
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .appName("bouquet-build-silver")
+        .master("local[*]")
+        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        .getOrCreate()
+    )
+
+    try:
+        run(spark, args)
     finally:
         spark.stop()
 
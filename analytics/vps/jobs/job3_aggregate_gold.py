@@ -6,9 +6,21 @@ Reads enriched data from the silver layer and computes aggregated metrics:
 - Zone-level: branch comparison
 - Restaurant-level: sales daily, item velocity, service times, session depth
 
+Each silver input is scanned once into a gold base cube at the finest grain
+the metrics need: ``analytic_base_cube_orders`` (restaurant × date × hour)
+and ``analytic_base_cube_items`` (restaurant × date × hour × menu item),
+tagged with chain and zone. Every chain/zone/restaurant table is a roll-up
+of the cube, so a new level or metric is a small aggregation over it
+instead of another fact scan.
+
+Service times are also kept as one exact prep-time histogram per restaurant,
+station and day in SERVICE_TIME_SKETCH_PATH, which merge into percentiles for
+any date range (``jobs.common.merge_sketches``).
+
 Usage:
     spark-submit jobs/job3_aggregate_gold.py \
-        [--date YYYY-MM-DD]
+        [--date YYYY-MM-DD] \
+        [--incremental]
 """
 
 import sys
@@ -20,7 +32,8 @@ from datetime import date, datetime
 # Add project root to path so config.settings can be imported
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.settings import SILVER_PATH, GOLD_PATH, LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS
+from config.settings import SILVER_PATH, SILVER_INCREMENTAL_PATH, GOLD_PATH, SERVICE_TIME_SKETCH_PATH, LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS
+from jobs.common import GOLD_PARTITION_COLS, SILVER_PARTITION_COLS, read_dataset, write_parquet, write_partitioned
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -39,22 +52,30 @@ logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Aggregate Gold metrics from Silver data")
     parser.add_argument("--date", type=str, default=date.today().isoformat(),
                         help="Business date in YYYY-MM-DD format")
-    return parser.parse_args()
+    parser.add_argument("--incremental", action="store_true",
+                        help="Read the incremental silver (SILVER_INCREMENTAL_PATH) "
+                             "instead of SILVER_PATH/<date>")
+    return parser.parse_args(argv)
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
+def run(spark, args, silver=None):
+    """
+    Aggregate gold metrics for ``args.date`` on an existing SparkSession.
+    ``silver`` optionally maps silver dataset names to DataFrames already in
+    memory; the others are read from the silver layer.
+    """
     business_date = args.date
 
-    silver_dir = os.path.join(SILVER_PATH, business_date)
+    silver_dir = (SILVER_INCREMENTAL_PATH if args.incremental
+                  else os.path.join(SILVER_PATH, business_date))
     gold_dir = os.path.join(GOLD_PATH, business_date)
 
     logger.info("=" * 60)
@@ -64,43 +85,89 @@ def main():
     logger.info("  Gold dir: %s", gold_dir)
     logger.info("=" * 60)
 
-    from pyspark.sql import SparkSession
+    from pyspark import StorageLevel
     from pyspark.sql import functions as F
     from pyspark.sql.window import Window
 
-    spark = (
-        SparkSession.builder
-        .appName("bouquet-aggregate-gold")
-        .master("local[*]")
-        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
-        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
-        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
-        .getOrCreate()
-    )
-
+    cached = []
     try:
         # -------------------------------------------------------------------
         # Read Silver datasets
         # -------------------------------------------------------------------
         logger.info("Reading Silver datasets...")
+        # The incremental silver holds every date; keep this one's partition
+        day = business_date if args.incremental else None
         try:
-            orders   = spark.read.parquet(f"{silver_dir}/orders_enriched")
-            items    = spark.read.parquet(f"{silver_dir}/order_items_enriched")
-            sessions = spark.read.parquet(f"{silver_dir}/sessions_enriched") if os.path.isdir(f"{silver_dir}/sessions_enriched") else None
-            events   = spark.read.parquet(f"{silver_dir}/process_events")
+            orders   = read_dataset(spark, silver_dir, "orders_enriched", silver, day)
+            items    = read_dataset(spark, silver_dir, "order_items_enriched", silver, day)
+            sessions = read_dataset(spark, silver_dir, "sessions_enriched", silver, day) if os.path.isdir(f"{silver_dir}/sessions_enriched") else None
+            events   = read_dataset(spark, silver_dir, "process_events", silver, day)
         except Exception as e:
             logger.error("Silver files not found: %s", e)
             return
 
         job_run_id = "job3_batch_" + business_date
 
+        # ---------------------------------------------------------------
+        # LEVEL 0: BASE CUBE (one scan per silver input)
+        # ---------------------------------------------------------------
+        # Every chain/zone/restaurant table below is a roll-up of these two
+        # cubes, which are also kept in gold for ad-hoc roll-ups.
+        logger.info("Building base cube...")
+        # Order facts per restaurant × date × hour. The zone ticket stddev is
+        # rebuilt from the count, sum and sum of squares of the tickets.
+        orders_cube = orders \
+            .groupBy("chainId", "zoneId", "restaurantId", "createdDate", "createdHour") \
+            .agg(
+                F.count("id").alias("orderCount"),
+                F.count("totalCents").alias("ticketCount"),
+                F.sum("totalCents").alias("totalCents"),
+                F.sum(F.col("totalCents").cast("double") ** 2).alias("totalCentsSquared")
+            ) \
+            .persist(StorageLevel.MEMORY_AND_DISK)
+        cached.append(orders_cube)
+
+        os.makedirs(os.path.join(gold_dir, "analytic_base_cube_orders"), exist_ok=True)
+        count = write_partitioned(orders_cube, f"{gold_dir}/analytic_base_cube_orders",
+                                  GOLD_PARTITION_COLS)
+        logger.info("  ✓ analytic_base_cube_orders — %d records", count)
+
+        # Item facts per restaurant × date × hour × item; items carry no chain,
+        # so it comes from the (already cached) order cube.
+        restaurant_chains = F.broadcast(
+            orders_cube.select("restaurantId", "chainId").distinct()
+        )
+        items_cube = items \
+            .withColumn("createdHour",
+                        F.hour(F.convert_timezone(F.lit("UTC"),
+                               F.lit("America/Mexico_City"),
+                               F.col("createdAt")))) \
+            .groupBy("restaurantId", "createdDate", "createdHour",
+                     "menuItemId", "itemNameSnapshot") \
+            .agg(
+                F.sum("quantity").alias("quantity"),
+                F.sum("totalCents").alias("totalCents")
+            ) \
+            .join(restaurant_chains, "restaurantId", "left") \
+            .persist(StorageLevel.MEMORY_AND_DISK)
+        cached.append(items_cube)
+
+        os.makedirs(os.path.join(gold_dir, "analytic_base_cube_items"), exist_ok=True)
+        count = write_partitioned(items_cube, f"{gold_dir}/analytic_base_cube_items",
+                                  GOLD_PARTITION_COLS)
+        logger.info("  ✓ analytic_base_cube_items — %d records", count)
+
+        if sessions is not None:
+            sessions = sessions.persist(StorageLevel.MEMORY_AND_DISK)
+            cached.append(sessions)
+
         # ---------------------------------------------------------------
         # LEVEL 1: CHAIN
         # ---------------------------------------------------------------
 
         # 1. AnalyticChainSalesDaily
         logger.info("Computing AnalyticChainSalesDaily...")
-        chain_sales = orders \
+        chain_sales = orders_cube \
             .groupBy("chainId") \
             .agg(F.sum("totalCents").alias("totalRevenueCents")) \
             .withColumn("businessDate", F.lit(business_date)) \
@@ -110,8 +177,8 @@ def main():
             .withColumn("computedAt", F.current_timestamp())
 
         os.makedirs(os.path.join(gold_dir, "analytic_chain_sales_daily"), exist_ok=True)
-        chain_sales.write.mode("overwrite").parquet(f"{gold_dir}/analytic_chain_sales_daily")
-        logger.info("  ✓ analytic_chain_sales_daily — %d records", chain_sales.count())
+        count = write_parquet(chain_sales, f"{gold_dir}/analytic_chain_sales_daily")
+        logger.info("  ✓ analytic_chain_sales_daily — %d records", count)
 
         # 2. AnalyticChainPeakHours
         logger.info("Computing AnalyticChainPeakHours...")
@@ -125,14 +192,14 @@ def main():
                 .withColumn("computedAt", F.current_timestamp())
 
             os.makedirs(os.path.join(gold_dir, "analytic_chain_peak_hours"), exist_ok=True)
-            chain_peak.write.mode("overwrite").parquet(f"{gold_dir}/analytic_chain_peak_hours")
-            logger.info("  ✓ analytic_chain_peak_hours — %d records", chain_peak.count())
+            count = write_parquet(chain_peak, f"{gold_dir}/analytic_chain_peak_hours")
+            logger.info("  ✓ analytic_chain_peak_hours — %d records", count)
         else:
             logger.warning("  ⚠ Skipping chain peak hours: sessions_enriched not available")
 
         # 3. AnalyticChainTopProducts
         logger.info("Computing AnalyticChainTopProducts...")
-        chain_top = items \
+        chain_top = items_cube \
             .groupBy("chainId", "menuItemId") \
             .agg(
                 F.sum("quantity").alias("chainTotalQuantity"),
@@ -144,8 +211,8 @@ def main():
             .withColumn("computedAt", F.current_timestamp())
 
         os.makedirs(os.path.join(gold_dir, "analytic_chain_top_products"), exist_ok=True)
-        chain_top.write.mode("overwrite").parquet(f"{gold_dir}/analytic_chain_top_products")
-        logger.info("  ✓ analytic_chain_top_products — %d records", chain_top.count())
+        count = write_parquet(chain_top, f"{gold_dir}/analytic_chain_top_products")
+        logger.info("  ✓ analytic_chain_top_products — %d records", count)
 
         # ---------------------------------------------------------------
         # LEVEL 2: ZONE
@@ -153,11 +220,22 @@ def main():
 
         # AnalyticZoneBranchComparison
         logger.info("Computing AnalyticZoneBranchComparison...")
-        zone_comp = orders \
+        zone_comp = orders_cube \
             .groupBy("zoneId") \
             .agg(
-                F.avg("totalCents").alias("avgZoneTicketCents"),
-                F.stddev("totalCents").alias("ticketStdDev")
+                F.sum("ticketCount").alias("n"),
+                F.sum("totalCents").alias("s"),
+                F.sum("totalCentsSquared").alias("ss")
+            ) \
+            .select(
+                "zoneId",
+                (F.col("s") / F.col("n")).alias("avgZoneTicketCents"),
+                # Sample standard deviation, as F.stddev over the tickets
+                F.when(F.col("n") > 1,
+                       F.sqrt(F.greatest(F.lit(0.0),
+                                         (F.col("ss") - F.col("s") * F.col("s") / F.col("n"))
+                                         / (F.col("n") - 1))))
+                 .alias("ticketStdDev")
             ) \
             .withColumn("branchOutliers", F.lit("[]").cast("string")) \
             .withColumn("menuOverlapPercent", F.lit(100.0)) \
@@ -166,8 +244,8 @@ def main():
             .withColumn("computedAt", F.current_timestamp())
 
         os.makedirs(os.path.join(gold_dir, "analytic_zone_branch_comparison"), exist_ok=True)
-        zone_comp.write.mode("overwrite").parquet(f"{gold_dir}/analytic_zone_branch_comparison")
-        logger.info("  ✓ analytic_zone_branch_comparison — %d records", zone_comp.count())
+        count = write_parquet(zone_comp, f"{gold_dir}/analytic_zone_branch_comparison")
+        logger.info("  ✓ analytic_zone_branch_comparison — %d records", count)
 
         # ---------------------------------------------------------------
         # LEVEL 3: RESTAURANT
@@ -175,10 +253,10 @@ def main():
 
         # 1. AnalyticSalesDaily
         logger.info("Computing AnalyticSalesDaily...")
-        sales_daily = orders \
+        sales_daily = orders_cube \
             .groupBy("restaurantId") \
             .agg(
-                F.count("id").alias("orderCount"),
+                F.sum("orderCount").alias("orderCount"),
                 F.sum("totalCents").alias("grossConsumptionCents")
             ) \
             .withColumn("itemCount", F.lit(0)) \
@@ -189,12 +267,13 @@ def main():
             .withColumn("computedAt", F.current_timestamp())
 
         os.makedirs(os.path.join(gold_dir, "analytic_sales_daily"), exist_ok=True)
-        sales_daily.write.mode("overwrite").parquet(f"{gold_dir}/analytic_sales_daily")
-        logger.info("  ✓ analytic_sales_daily — %d records", sales_daily.count())
+        count = write_partitioned(sales_daily, f"{gold_dir}/analytic_sales_daily",
+                                  GOLD_PARTITION_COLS)
+        logger.info("  ✓ analytic_sales_daily — %d records", count)
 
         # 2. AnalyticItemVelocity
         logger.info("Computing AnalyticItemVelocity...")
-        item_velocity = items \
+        item_velocity = items_cube \
             .groupBy("restaurantId", "menuItemId", "itemNameSnapshot") \
             .agg(
                 F.sum("quantity").alias("quantitySold"),
@@ -205,28 +284,54 @@ def main():
             .withColumn("computedAt", F.current_timestamp())
 
         os.makedirs(os.path.join(gold_dir, "analytic_item_velocity"), exist_ok=True)
-        item_velocity.write.mode("overwrite").parquet(f"{gold_dir}/analytic_item_velocity")
-        logger.info("  ✓ analytic_item_velocity — %d records", item_velocity.count())
+        count = write_partitioned(item_velocity, f"{gold_dir}/analytic_item_velocity",
+                                  GOLD_PARTITION_COLS)
+        logger.info("  ✓ analytic_item_velocity — %d records", count)
 
         # 3. AnalyticServiceTimes
         logger.info("Computing AnalyticServiceTimes...")
         SLA_SECONDS = 600
+        # Prep time of a served item: from its first status event to SERVED
         service_times = events \
             .filter(events.toStatus == "SERVED") \
             .groupBy("restaurantId", "stationId") \
             .agg(
-                F.avg("durationSeconds").alias("avgPrepSeconds"),
-                F.expr("percentile_approx(durationSeconds, 0.5)").alias("p50PrepSeconds"),
-                F.expr("percentile_approx(durationSeconds, 0.9)").alias("p90PrepSeconds"),
-                F.sum(F.when(events.durationSeconds > SLA_SECONDS, 1).otherwise(0)).alias("delayedItemsCount")
+                F.avg("itemElapsedSeconds").alias("avgPrepSeconds"),
+                F.expr("percentile_approx(itemElapsedSeconds, 0.5)").alias("p50PrepSeconds"),
+                F.expr("percentile_approx(itemElapsedSeconds, 0.9)").alias("p90PrepSeconds"),
+                F.sum(F.when(events.itemElapsedSeconds > SLA_SECONDS, 1).otherwise(0)).alias("delayedItemsCount")
             ) \
             .withColumn("businessDate", F.lit(business_date)) \
             .withColumn("jobRunId", F.lit(job_run_id)) \
             .withColumn("computedAt", F.current_timestamp())
 
         os.makedirs(os.path.join(gold_dir, "analytic_service_times"), exist_ok=True)
-        service_times.write.mode("overwrite").parquet(f"{gold_dir}/analytic_service_times")
-        logger.info("  ✓ analytic_service_times — %d records", service_times.count())
+        count = write_partitioned(service_times, f"{gold_dir}/analytic_service_times",
+                                  GOLD_PARTITION_COLS)
+        logger.info("  ✓ analytic_service_times — %d records", count)
+
+        # Per-day service-time sketches: a {seconds: count} histogram per
+        # restaurant, station and day, merged for date-range percentiles
+        # (see jobs.common.merge_sketches). Only the days present in this
+        # silver are replaced; older days stay in the store.
+        logger.info("Updating service-time sketches...")
+        sketches = events \
+            .filter((events.toStatus == "SERVED") & events.itemElapsedSeconds.isNotNull()) \
+            .withColumn("seconds", F.round("itemElapsedSeconds").cast("long")) \
+            .groupBy("restaurantId", "stationId", "createdDate", "seconds") \
+            .agg(F.count(F.lit(1)).alias("n")) \
+            .groupBy("restaurantId", "stationId", "createdDate") \
+            .agg(
+                F.sum("n").alias("sampleCount"),
+                F.map_from_entries(F.collect_list(F.struct("seconds", "n")))
+                 .alias("durationHistogram")
+            ) \
+            .withColumn("jobRunId", F.lit(job_run_id)) \
+            .withColumn("computedAt", F.current_timestamp())
+
+        count = write_partitioned(sketches, SERVICE_TIME_SKETCH_PATH,
+                                  SILVER_PARTITION_COLS, dynamic=True)
+        logger.info("  ✓ service-time sketches — %d station-days", count)
 
         # 4. AnalyticRestaurantSessionDepth
         logger.info("Computing AnalyticRestaurantSessionDepth...")
@@ -243,8 +348,9 @@ def main():
                 .withColumn("computedAt", F.current_timestamp())
 
             os.makedirs(os.path.join(gold_dir, "analytic_restaurant_session_depth"), exist_ok=True)
-            session_depth.write.mode("overwrite").parquet(f"{gold_dir}/analytic_restaurant_session_depth")
-            logger.info("  ✓ analytic_restaurant_session_depth — %d records", session_depth.count())
+            count = write_partitioned(session_depth, f"{gold_dir}/analytic_restaurant_session_depth",
+                                      GOLD_PARTITION_COLS)
+            logger.info("  ✓ analytic_restaurant_session_depth — %d records", count)
         else:
             logger.warning("  ⚠ Skipping session depth: sessions_enriched not available")
 
@@ -253,6 +359,28 @@ def main():
     except Exception as exc:
         logger.exception("Job 3: Aggregate Gold — FAILED: %s", exc)
         raise
+    finally:
+        for df in cached:
+            df.unpersist()
+
+
+def main():
+    args = parse_args()
+
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .appName("bouquet-aggregate-gold")
+        .master("local[*]")
+        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        .getOrCreate()
+    )
+
+    try:
+        run(spark, args)
     finally:
         spark.stop()
 
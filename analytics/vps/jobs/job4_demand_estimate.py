@@ -4,13 +4,27 @@ Job 4: Demand Estimate — Forecast demand for the next 7 days.
 Uses historical sales data from the silver layer to compute weekly moving
 average patterns and project demand for the upcoming week, with confidence scores.
 
+Per menu item, an additive Holt-Winters model (weekly season; simple
+exponential smoothing for items with under two weeks of history) is fitted
+in a grouped pandas UDF and written to ``analytic_demand_estimate``.
+
+Day-of-week history lives in a rolling statistics store (``DEMAND_STATS_PATH``):
+per restaurant, category and day of week it keeps the number of days seen,
+the mean daily units/revenue and the sum of squared deviations of daily units
+(Welford's M2). Each run folds in only the completed days after the store's
+``lastDate`` (Chan et al.'s parallel merge), so a run costs O(new days) however
+long the history is.
+
 Usage:
     spark-submit jobs/job4_demand_estimate.py \
-        [--date YYYY-MM-DD]
+        [--date YYYY-MM-DD] \
+        [--incremental] \
+        [--reset-stats]
 """
 
 import sys
 import os
+import shutil
 import logging
 import argparse
 from datetime import date, datetime, timedelta
@@ -18,7 +32,8 @@ from datetime import date, datetime, timedelta
 # Add project root to path so config.settings can be imported
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config.settings import SILVER_PATH, GOLD_PATH, LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS
+from config.settings import SILVER_PATH, SILVER_INCREMENTAL_PATH, GOLD_PATH, DEMAND_STATS_PATH, LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS
+from jobs.common import GOLD_PARTITION_COLS, read_dataset, swap_directory, write_parquet, write_partitioned
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -37,23 +52,206 @@ logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Demand estimate from Silver data")
     parser.add_argument("--date", type=str, default=date.today().isoformat(),
                         help="Reference date in YYYY-MM-DD format")
-    return parser.parse_args()
+    parser.add_argument("--incremental", action="store_true",
+                        help="Read the incremental silver (SILVER_INCREMENTAL_PATH) "
+                             "instead of SILVER_PATH/<date>")
+    parser.add_argument("--reset-stats", action="store_true",
+                        help="Drop the rolling statistics store and rebuild it from this silver")
+    return parser.parse_args(argv)
+
+
+# Grain of the rolling statistics store
+STATS_KEYS = ["restaurantId", "categoryName", "dayOfWeek"]
+
+
+def daily_batch_stats(daily):
+    """
+    Per-key statistics of a batch of daily totals: ``batchN``, ``batchMeanUnits``,
+    ``batchM2Units`` and ``batchMeanRevenueCents``.
+    """
+    from pyspark.sql import functions as F
+
+    return daily.groupBy(*STATS_KEYS).agg(
+        F.count(F.lit(1)).alias("batchN"),
+        F.avg("dailyUnits").alias("batchMeanUnits"),
+        (F.var_pop("dailyUnits") * F.count(F.lit(1))).alias("batchM2Units"),
+        F.avg("dailyRevenueCents").alias("batchMeanRevenueCents"),
+    )
+
+
+def merge_stats(stats, batch, last_date):
+    """
+    Fold ``batch`` into the rolling ``stats`` (either may be None) with the
+    pairwise update of Chan et al.:
+
+        n    = nA + nB
+        d    = meanB - meanA
+        mean = meanA + d * nB / n
+        M2   = M2A + M2B + d^2 * nA * nB / n
+    """
+    from pyspark.sql import functions as F
+
+    if stats is None:
+        return batch.select(
+            *STATS_KEYS,
+            F.col("batchN").alias("n"),
+            F.col("batchMeanUnits").alias("meanUnits"),
+            F.col("batchM2Units").alias("m2Units"),
+            F.col("batchMeanRevenueCents").alias("meanRevenueCents"),
+            F.lit(last_date).alias("lastDate"),
+        )
+
+    # categoryName is NULL for items without a menu item: match keys null-safely
+    s, b = stats.alias("s"), batch.alias("b")
+    on = [F.col(f"s.{key}").eqNullSafe(F.col(f"b.{key}")) for key in STATS_KEYS]
+    joined = s.join(b, on, "full_outer").select(
+        *[F.coalesce(F.col(f"s.{key}"), F.col(f"b.{key}")).alias(key) for key in STATS_KEYS],
+        "s.n", "s.meanUnits", "s.m2Units", "s.meanRevenueCents",
+        "b.batchN", "b.batchMeanUnits", "b.batchM2Units", "b.batchMeanRevenueCents",
+    )
+    n_a = F.coalesce(F.col("n"), F.lit(0))
+    n_b = F.coalesce(F.col("batchN"), F.lit(0))
+    n = n_a + n_b
+
+    def merged_mean(mean_a, mean_b):
+        return F.when(n_b == 0, F.col(mean_a)) \
+                .when(n_a == 0, F.col(mean_b)) \
+                .otherwise(F.col(mean_a) + (F.col(mean_b) - F.col(mean_a)) * n_b / n)
+
+    delta = F.col("batchMeanUnits") - F.col("meanUnits")
+    return joined.select(
+        *STATS_KEYS,
+        n.alias("n"),
+        merged_mean("meanUnits", "batchMeanUnits").alias("meanUnits"),
+        (F.coalesce(F.col("m2Units"), F.lit(0.0))
+         + F.coalesce(F.col("batchM2Units"), F.lit(0.0))
+         + F.when((n_a > 0) & (n_b > 0), delta * delta * n_a * n_b / n)
+            .otherwise(F.lit(0.0))).alias("m2Units"),
+        merged_mean("meanRevenueCents", "batchMeanRevenueCents").alias("meanRevenueCents"),
+        F.lit(last_date).alias("lastDate"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Per-item forecasting
+# ---------------------------------------------------------------------------
+
+# Days of daily history fed to each item's model (bounds the rows per group)
+ITEM_FORECAST_HISTORY_DAYS = 16 * 7
+ITEM_FORECAST_SEASON_DAYS = 7
+# Below two full seasons an item gets simple exponential smoothing instead
+ITEM_FORECAST_MIN_SEASONAL_DAYS = 2 * ITEM_FORECAST_SEASON_DAYS
+
+ITEM_FORECAST_SCHEMA = (
+    "restaurantId string, menuItemId string, estimateDate date, "
+    "expectedQuantity int, confidenceBps int, method string"
+)
+
+
+def item_forecaster(last_day, forecast_dates):
+    """
+    Build the ``applyInPandas`` function that forecasts one menu item.
+
+    The function receives the item's daily units (``restaurantId``,
+    ``menuItemId``, ``createdDate``, ``dailyUnits``) up to ``last_day`` and
+    returns one row per date in ``forecast_dates``. Everything it needs is
+    defined here so the closure is shipped to the Python workers by value.
+    """
+    season = ITEM_FORECAST_SEASON_DAYS
+    min_seasonal = ITEM_FORECAST_MIN_SEASONAL_DAYS
+
+    def simple_exp_smoothing(y, horizons):
+        import numpy as np
+
+        # All smoothing constants are fitted at once, one column each
+        alphas = np.array([0.1, 0.2, 0.3, 0.5, 0.7])
+        level = np.full(alphas.shape, y[0])
+        sse = np.zeros(alphas.shape)
+        for t in range(1, len(y)):
+            err = y[t] - level
+            sse += err * err
+            level = level + alphas * err
+        best = np.argmin(sse)
+        rmse = np.sqrt(sse[best] / max(len(y) - 1, 1))
+        return np.full(len(horizons), level[best]), rmse
+
+    def holt_winters(y, horizons):
+        import numpy as np
+
+        # Additive Holt-Winters over a small (alpha, beta, gamma) grid, fitted
+        # as one vectorized pass; the lowest one-step-ahead SSE wins.
+        grid = np.array(np.meshgrid([0.1, 0.3, 0.5], [0.01, 0.1], [0.1, 0.3],
+                                    indexing="ij")).reshape(3, -1)
+        alpha, beta, gamma = grid
+        level = np.full(alpha.shape, y[:season].mean())
+        trend = np.full(alpha.shape, (y[season:2 * season].mean() - y[:season].mean()) / season)
+        seasonal = np.tile(y[:season] - y[:season].mean(), (alpha.size, 1))
+        sse = np.zeros(alpha.shape)
+        for t in range(len(y)):
+            phase = seasonal[:, t % season]
+            if t >= season:
+                err = y[t] - (level + trend + phase)
+                sse += err * err
+            new_level = alpha * (y[t] - phase) + (1 - alpha) * (level + trend)
+            trend = beta * (new_level - level) + (1 - beta) * trend
+            seasonal[:, t % season] = gamma * (y[t] - new_level) + (1 - gamma) * phase
+            level = new_level
+        best = np.argmin(sse)
+        n = len(y)
+        forecast = level[best] + horizons * trend[best] \
+            + seasonal[best, (n - 1 + horizons) % season]
+        rmse = np.sqrt(sse[best] / max(n - season, 1))
+        return forecast, rmse
+
+    def forecast_item(pdf):
+        import numpy as np
+        import pandas as pd
+
+        # Dense daily series: days without sales are zero
+        days = pd.date_range(pd.Timestamp(pdf["createdDate"].min()), pd.Timestamp(last_day))
+        units = pdf.groupby(pd.to_datetime(pdf["createdDate"]))["dailyUnits"].sum()
+        y = units.reindex(days, fill_value=0).to_numpy(dtype=float)
+        horizons = np.array([(d - last_day).days for d in forecast_dates])
+
+        if len(y) >= min_seasonal:
+            forecast, rmse = holt_winters(y, horizons)
+            method = "holt_winters_additive"
+        else:
+            forecast, rmse = simple_exp_smoothing(y, horizons)
+            method = "simple_exp_smoothing"
+
+        confidence = max(0.0, min(1.0, 1.0 - rmse / (y.mean() + 1)))
+        return pd.DataFrame({
+            "restaurantId": pdf["restaurantId"].iloc[0],
+            "menuItemId": pdf["menuItemId"].iloc[0],
+            "estimateDate": forecast_dates,
+            "expectedQuantity": np.rint(np.clip(forecast, 0, None)).astype("int32"),
+            "confidenceBps": int(round(confidence * 10000)),
+            "method": method,
+        })
+
+    return forecast_item
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
+def run(spark, args, silver=None):
+    """
+    Compute the 7-day demand forecast for ``args.date`` on an existing
+    SparkSession. ``silver`` optionally maps silver dataset names to
+    DataFrames already in memory; the others are read from the silver layer.
+    """
     reference_date_str = args.date
     reference_date = date.fromisoformat(reference_date_str)
 
-    silver_dir = os.path.join(SILVER_PATH, reference_date_str)
+    silver_dir = (SILVER_INCREMENTAL_PATH if args.incremental
+                  else os.path.join(SILVER_PATH, reference_date_str))
     gold_dir = os.path.join(GOLD_PATH, reference_date_str)
 
     logger.info("=" * 60)
@@ -63,54 +261,76 @@ def main():
     logger.info("  Gold dir: %s", gold_dir)
     logger.info("=" * 60)
 
-    from pyspark.sql import SparkSession
     from pyspark.sql import functions as F
     from pyspark.sql.window import Window
 
-    spark = (
-        SparkSession.builder
-        .appName("bouquet-demand-estimate")
-        .master("local[*]")
-        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
-        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
-        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
-        .getOrCreate()
-    )
-
     try:
         # -------------------------------------------------------------------
         # Read Silver datasets
         # -------------------------------------------------------------------
         logger.info("Reading Silver datasets...")
-        items  = spark.read.parquet(f"{silver_dir}/order_items_enriched")
-        orders = spark.read.parquet(f"{silver_dir}/orders_enriched")
+        items  = read_dataset(spark, silver_dir, "order_items_enriched", silver)
+        orders = read_dataset(spark, silver_dir, "orders_enriched", silver)
 
         # -------------------------------------------------------------------
-        # Join items with order metadata
+        # Rolling statistics store
         # -------------------------------------------------------------------
-        logger.info("Joining items with order dates...")
-        sales = items \
-            .join(orders.select("id", "restaurantId", "chainId",
-                                "restaurantName", "createdDate"),
-                  items.orderId == orders.id, "inner") \
-            .filter(items.status != "CANCELLED") \
-            .withColumn("dayOfWeek", F.dayofweek("createdDate"))
+        if args.reset_stats:
+            logger.info("Resetting rolling statistics store %s", DEMAND_STATS_PATH)
+            shutil.rmtree(DEMAND_STATS_PATH, ignore_errors=True)
+        stats = spark.read.parquet(DEMAND_STATS_PATH) \
+            if os.path.isdir(DEMAND_STATS_PATH) else None
+        last_date = stats.agg(F.max("lastDate")).first()[0] if stats is not None else None
+        # Only completed days are folded in; today's partial sales are not
+        fold_until = reference_date - timedelta(days=1)
+        logger.info("  Stats store: last folded day %s, folding through %s",
+                    last_date or "none", fold_until)
+
+        if last_date is None or date.fromisoformat(last_date) < fold_until:
+            # -----------------------------------------------------------------
+            # Join the new days' items with order metadata
+            # -----------------------------------------------------------------
+            logger.info("Joining items with order dates...")
+            new_orders = orders.filter(F.col("createdDate") <= F.lit(fold_until))
+            new_items = items
+            if last_date:
+                new_orders = new_orders.filter(F.col("createdDate") > F.lit(last_date))
+                # Items of an order placed just before midnight may fall on the next day
+                new_items = new_items.filter(F.col("createdDate") >= F.lit(last_date))
+            sales = new_items \
+                .filter(F.col("status") != "CANCELLED") \
+                .select("orderId", "categoryName", "quantity", "totalCents") \
+                .join(new_orders.select("id", "restaurantId", "createdDate"),
+                      F.col("orderId") == new_orders.id, "inner") \
+                .withColumn("dayOfWeek", F.dayofweek("createdDate"))
+
+            daily = sales \
+                .groupBy(*STATS_KEYS, "createdDate") \
+                .agg(F.sum("quantity").alias("dailyUnits"),
+                     F.sum("totalCents").alias("dailyRevenueCents"))
+
+            logger.info("Folding new days into the rolling statistics...")
+            merged = merge_stats(stats, daily_batch_stats(daily), fold_until.isoformat())
+            count = write_parquet(merged, f"{DEMAND_STATS_PATH}.new")
+            swap_directory(f"{DEMAND_STATS_PATH}.new", DEMAND_STATS_PATH)
+            logger.info("  ✓ rolling statistics — %d keys", count)
+        else:
+            logger.info("  Rolling statistics already include %s", fold_until)
 
         # -------------------------------------------------------------------
         # Historical averages by day of week and category
         # -------------------------------------------------------------------
-        logger.info("Computing historical averages...")
-        historical_avg = sales \
-            .groupBy("restaurantId", "categoryName",
-                     "dayOfWeek", "createdDate") \
-            .agg(F.sum("quantity").alias("dailyUnits"),
-                 F.sum("totalCents").alias("dailyRevenueCents")) \
-            .groupBy("restaurantId", "categoryName", "dayOfWeek") \
-            .agg(
-                F.avg("dailyUnits").alias("avgUnits"),
-                F.avg("dailyRevenueCents").alias("avgRevenueCents"),
-                F.stddev("dailyUnits").alias("stddevUnits")
-            )
+        if not os.path.isdir(DEMAND_STATS_PATH):
+            logger.warning("No sales history before %s — nothing to forecast", reference_date_str)
+            return
+        historical_avg = spark.read.parquet(DEMAND_STATS_PATH).select(
+            *STATS_KEYS,
+            F.col("meanUnits").alias("avgUnits"),
+            F.col("meanRevenueCents").alias("avgRevenueCents"),
+            # Sample standard deviation, like F.stddev over the daily totals
+            F.when(F.col("n") > 1, F.sqrt(F.col("m2Units") / (F.col("n") - 1)))
+             .alias("stddevUnits"),
+        )
 
         # -------------------------------------------------------------------
         # Generate forecast for the next 7 days
@@ -155,15 +375,60 @@ def main():
         # Write to Gold
         # -------------------------------------------------------------------
         os.makedirs(os.path.join(gold_dir, "forecast"), exist_ok=True)
-        forecast.write.mode("overwrite") \
-            .parquet(f"{gold_dir}/forecast")
-        logger.info("  ✓ forecast — %d records written to gold layer", forecast.count())
+        count = write_partitioned(forecast, f"{gold_dir}/forecast", GOLD_PARTITION_COLS)
+        logger.info("  ✓ forecast — %d records written to gold layer", count)
+
+        # -------------------------------------------------------------------
+        # Per-item forecast (AnalyticDemandEstimate)
+        # -------------------------------------------------------------------
+        # One model per menu item, fitted in the Python workers on Arrow
+        # batches; each group holds at most ITEM_FORECAST_HISTORY_DAYS rows.
+        logger.info("Generating per-item forecasts...")
+        history_start = reference_date - timedelta(days=ITEM_FORECAST_HISTORY_DAYS)
+        item_daily = items \
+            .filter((F.col("status") != "CANCELLED")
+                    & F.col("menuItemId").isNotNull()
+                    & (F.col("createdDate") >= F.lit(history_start))
+                    & (F.col("createdDate") <= F.lit(fold_until))) \
+            .groupBy("restaurantId", "menuItemId", "createdDate") \
+            .agg(F.sum("quantity").alias("dailyUnits"))
+        forecast_days = [reference_date + timedelta(days=delta) for delta in range(1, 8)]
+        item_forecast = item_daily \
+            .groupBy("restaurantId", "menuItemId") \
+            .applyInPandas(item_forecaster(fold_until, forecast_days),
+                           schema=ITEM_FORECAST_SCHEMA) \
+            .withColumn("jobRunId", F.lit("job4_batch_" + reference_date_str)) \
+            .withColumn("computedAt", F.current_timestamp())
+
+        os.makedirs(os.path.join(gold_dir, "analytic_demand_estimate"), exist_ok=True)
+        count = write_partitioned(item_forecast, f"{gold_dir}/analytic_demand_estimate",
+                                  GOLD_PARTITION_COLS)
+        logger.info("  ✓ analytic_demand_estimate — %d records written to gold layer", count)
 
         logger.info("Job 4: Demand Estimate — completed successfully")
 
     except Exception as exc:
         logger.exception("Job 4: Demand Estimate — FAILED: %s", exc)
         raise
+
+
+def main():
+    args = parse_args()
+
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .appName("bouquet-demand-estimate")
+        .master("local[*]")
+        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        .getOrCreate()
+    )
+
+    try:
+        run(spark, args)
     finally:
         spark.stop()
 
@@ -2,18 +2,32 @@
 Job 5: Write-Back — Publish Gold metrics to Supabase PostgreSQL.
 
 Reads the gold layer Parquet files and writes them into corresponding
-Supabase analytic tables via JDBC.
+Supabase analytic tables. Each table is streamed with ``COPY FROM STDIN`` into
+a staging table and then replaces, in one transaction, the rows of the same
+natural key slice (``WRITE_BACK_KEYS``), so re-publishing a date does not
+duplicate rows. ``--jdbc`` keeps the former append-only JDBC write.
+
+Tables are published concurrently, largest first, each holding one
+connection of a pool of ``--max-connections``; a table failing with a
+transient database error (connection loss, deadlock, serialization failure,
+resource exhaustion) is retried with exponential backoff.
 
 Usage:
     spark-submit jobs/job5_write_back.py \
-        [--date YYYY-MM-DD]
+        [--date YYYY-MM-DD] \
+        [--jdbc] \
+        [--max-connections N] \
+        [--retries N]
 """
 
 import sys
 import os
+import time
+import random
 import logging
 import argparse
-from datetime import date
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
 
 # Add project root to path so config.settings can be imported
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,7 +36,9 @@ from config.settings import (
     GOLD_PATH, LOGS_PATH,
     SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS,
     JDBC_URL, JDBC_PROPS,
+    WRITE_BACK_MAX_CONNECTIONS, WRITE_BACK_RETRIES, WRITE_BACK_BACKOFF_SECONDS,
 )
+from jobs.common import copy_replace, parquet_size, parse_jdbc_url, thread_target, write_jdbc
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -51,22 +67,83 @@ GOLD_TABLES = [
     "analytic_service_times",
     "analytic_restaurant_session_depth",
     "forecast",
+    "analytic_demand_estimate",
 ]
 
+# Natural key slice each gold table replaces on write-back: target rows whose
+# values for these columns occur in the gold data are deleted before insert.
+WRITE_BACK_KEYS = {
+    "analytic_chain_sales_daily": ["chainId", "businessDate"],
+    "analytic_chain_peak_hours": ["chainId", "businessDate"],
+    "analytic_chain_top_products": ["chainId", "businessDate"],
+    "analytic_zone_branch_comparison": ["zoneId", "businessDate"],
+    "analytic_sales_daily": ["restaurantId", "businessDate"],
+    "analytic_item_velocity": ["restaurantId", "businessDate"],
+    "analytic_service_times": ["restaurantId", "businessDate"],
+    "analytic_restaurant_session_depth": ["restaurantId", "businessDate"],
+    "forecast": ["restaurantId", "forecastDate"],
+    "analytic_demand_estimate": ["restaurantId", "estimateDate"],
+}
+
+# SQLSTATE classes worth retrying: connection exception, transaction rollback
+# (deadlock, serialization failure), insufficient resources, operator
+# intervention (e.g. admin shutdown).
+TRANSIENT_SQLSTATE_CLASSES = ("08", "40", "53", "57")
+
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Write-Back Gold data to Supabase")
     parser.add_argument("--date", type=str, default=date.today().isoformat(),
                         help="Business date in YYYY-MM-DD format")
-    return parser.parse_args()
+    parser.add_argument("--jdbc", action="store_true",
+                        help="Append through Spark JDBC instead of COPY + replace "
+                             "(re-runs duplicate rows)")
+    parser.add_argument("--max-connections", type=int, default=WRITE_BACK_MAX_CONNECTIONS,
+                        help="Tables written concurrently, one database connection each "
+                             "(default: WRITE_BACK_MAX_CONNECTIONS)")
+    parser.add_argument("--retries", type=int, default=WRITE_BACK_RETRIES,
+                        help="Retries per table on transient database errors "
+                             "(default: WRITE_BACK_RETRIES)")
+    return parser.parse_args(argv)
+
+
+def connection_pool(size):
+    """Thread-safe pool of up to ``size`` psycopg2 connections to JDBC_URL."""
+    from psycopg2.pool import ThreadedConnectionPool
+
+    params = parse_jdbc_url(JDBC_URL)
+    params["user"] = JDBC_PROPS.get("user", "")
+    params["password"] = JDBC_PROPS.get("password", "")
+    return ThreadedConnectionPool(1, size, **params)
+
+
+def is_transient(exc):
+    """True if ``exc`` is a database error that may succeed when retried."""
+    import psycopg2
+
+    if isinstance(exc, psycopg2.Error):
+        if exc.pgcode:
+            return exc.pgcode[:2] in TRANSIENT_SQLSTATE_CLASSES
+        # No SQLSTATE: the connection itself failed or was lost
+        return isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
+    # Spark JDBC errors surface as Java exceptions
+    message = str(exc)
+    return "SQLTransient" in message or "SQLRecoverable" in message
+
+
+def copy_table(conn, df, table_name):
+    """Stream ``df`` into ``table_name`` with COPY, replacing its key slice."""
+    return copy_replace(conn, table_name, df.columns,
+                        (tuple(row) for row in df.toLocalIterator()),
+                        WRITE_BACK_KEYS[table_name])
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
+def run(spark, args):
+    """Publish the gold tables of ``args.date`` on an existing SparkSession."""
     business_date = args.date
 
     gold_dir = os.path.join(GOLD_PATH, business_date)
@@ -75,8 +152,89 @@ def main():
     logger.info("Job 5: Write-Back — starting")
     logger.info("  Date: %s", business_date)
     logger.info("  Gold dir: %s", gold_dir)
+    logger.info("  Method: %s", "JDBC append" if args.jdbc else "COPY + replace")
+    logger.info("  Concurrent tables: %d", args.max_connections)
     logger.info("=" * 60)
 
+    tables_written = 0
+    tables_skipped = 0
+    pool = None
+
+    def write_table(table_name):
+        df = spark.read.parquet(os.path.join(gold_dir, table_name))
+        if args.jdbc:
+            # One JDBC connection per table, like the COPY path
+            return write_jdbc(df, JDBC_URL, f'"{table_name}"',
+                              {**JDBC_PROPS, "numPartitions": "1"})
+        conn = pool.getconn()
+        failed = True
+        try:
+            count = copy_table(conn, df, table_name)
+            failed = False
+            return count
+        finally:
+            # A connection that saw an error may be broken; don't hand it out again
+            pool.putconn(conn, close=failed)
+
+    def run_task(table_name):
+        """Publish one gold table, retrying transient errors; never raises."""
+        table_start = datetime.now()
+        logger.info("Writing %s ...", table_name)
+        attempt = 0
+        while True:
+            try:
+                count, error = write_table(table_name), None
+                break
+            except Exception as exc:
+                attempt += 1
+                if attempt > args.retries or not is_transient(exc):
+                    count, error = 0, exc
+                    break
+                delay = WRITE_BACK_BACKOFF_SECONDS * 2 ** (attempt - 1) * random.uniform(0.5, 1.0)
+                logger.warning("  ↻ %s — transient error (attempt %d/%d), retrying in %.1fs: %s",
+                               table_name, attempt, args.retries, delay, exc)
+                time.sleep(delay)
+        return count, (datetime.now() - table_start).total_seconds(), error
+
+    try:
+        if not args.jdbc:
+            pool = connection_pool(args.max_connections)
+        # Largest tables first so the small ones fill the gaps
+        tables = sorted(GOLD_TABLES, key=lambda t: parquet_size(os.path.join(gold_dir, t)),
+                        reverse=True)
+        # Writes inherit this thread's Spark pool and job group, or get a FAIR
+        # pool per table so they share cores instead of queueing FIFO
+        task = thread_target(run_task, pool=lambda table_name: f"write-back-{table_name}")
+        with ThreadPoolExecutor(max_workers=max(1, args.max_connections),
+                                thread_name_prefix="write-back") as executor:
+            futures = {executor.submit(task, table_name): table_name
+                       for table_name in tables}
+            for future in as_completed(futures):
+                table_name = futures[future]
+                count, elapsed, error = future.result()
+                if error is None:
+                    logger.info("  ✓ %s — %d records written to Supabase (%.1fs)",
+                                table_name, count, elapsed)
+                    tables_written += 1
+                else:
+                    logger.warning("  ✗ Skipping %s: %s", table_name, error)
+                    tables_skipped += 1
+
+        logger.info("Job 5: Write-Back — completed")
+        logger.info("  Tables written: %d", tables_written)
+        logger.info("  Tables skipped: %d", tables_skipped)
+
+    except Exception as exc:
+        logger.exception("Job 5: Write-Back — FAILED: %s", exc)
+        raise
+    finally:
+        if pool is not None:
+            pool.closeall()
+
+
+def main():
+    args = parse_args()
+
     from pyspark.sql import SparkSession
 
     spark = (
@@ -86,40 +244,13 @@ def main():
         .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
         .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
         .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        # Gold tables are written concurrently, one FAIR pool each (run())
+        .config("spark.scheduler.mode", "FAIR")
         .getOrCreate()
     )
 
-    tables_written = 0
-    tables_skipped = 0
-
     try:
-        for table_name in GOLD_TABLES:
-            parquet_path = os.path.join(gold_dir, table_name)
-            try:
-                logger.info("Writing %s ...", table_name)
-                df = spark.read.parquet(parquet_path)
-                count = df.count()
-
-                df.write \
-                    .mode("append") \
-                    .jdbc(
-                        url=JDBC_URL,
-                        table=f'"{table_name}"',
-                        properties=JDBC_PROPS,
-                    )
-                logger.info("  ✓ %s — %d records written to Supabase", table_name, count)
-                tables_written += 1
-            except Exception as e:
-                logger.warning("  ✗ Skipping %s: %s", table_name, e)
-                tables_skipped += 1
-
-        logger.info("Job 5: Write-Back — completed")
-        logger.info("  Tables written: %d", tables_written)
-        logger.info("  Tables skipped: %d", tables_skipped)
-
-    except Exception as exc:
-        logger.exception("Job 5: Write-Back — FAILED: %s", exc)
-        raise
+        run(spark, args)
     finally:
         spark.stop()
 
@@ -7,7 +7,8 @@ the hourly velocity metrics to the gold layer and optionally to Supabase.
 Usage:
     spark-submit jobs/job6_hourly_velocity.py \
         --restaurant-id UUID \
-        [--date YYYY-MM-DD]
+        [--date YYYY-MM-DD] \
+        [--incremental]
 """
 
 import sys
@@ -20,11 +21,12 @@ from datetime import date
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config.settings import (
-    SILVER_PATH, GOLD_PATH,
+    SILVER_PATH, SILVER_INCREMENTAL_PATH, GOLD_PATH,
     JDBC_URL, JDBC_PROPS,
     SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS,
     LOGS_PATH,
 )
+from jobs.common import GOLD_PARTITION_COLS, observe_count, write_partitioned
 
 # ---------------------------------------------------------------------------
 # Logging setup
@@ -44,25 +46,29 @@ logger = logging.getLogger(__name__)
 # ---------------------------------------------------------------------------
 
 
-def parse_args():
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Hourly Velocity — on-demand restaurant velocity")
     parser.add_argument("--restaurant-id", type=str, required=True,
                         help="Target restaurant UUID")
     parser.add_argument("--date", type=str, default=date.today().isoformat(),
                         help="Business date in YYYY-MM-DD format")
-    return parser.parse_args()
+    parser.add_argument("--incremental", action="store_true",
+                        help="Read the incremental silver (SILVER_INCREMENTAL_PATH) "
+                             "instead of SILVER_PATH/<date>")
+    return parser.parse_args(argv)
 
 
 # ---------------------------------------------------------------------------
 # Main
 # ---------------------------------------------------------------------------
 
-def main():
-    args = parse_args()
+def run(spark, args):
+    """Compute one restaurant's hourly velocity on an existing SparkSession."""
     restaurant_id = args.restaurant_id
     business_date = args.date
 
-    silver_dir = os.path.join(SILVER_PATH, business_date)
+    silver_dir = (SILVER_INCREMENTAL_PATH if args.incremental
+                  else os.path.join(SILVER_PATH, business_date))
     gold_dir = os.path.join(GOLD_PATH, business_date)
 
     logger.info("=" * 60)
@@ -73,19 +79,8 @@ def main():
     logger.info("  Gold dir: %s", gold_dir)
     logger.info("=" * 60)
 
-    from pyspark.sql import SparkSession
     from pyspark.sql import functions as F
 
-    spark = (
-        SparkSession.builder
-        .appName(f"bouquet-hourly-velocity-{restaurant_id[:8]}")
-        .master("local[*]")
-        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
-        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
-        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
-        .getOrCreate()
-    )
-
     try:
         # -------------------------------------------------------------------
         # Read Silver data
@@ -95,20 +90,18 @@ def main():
             orders = spark.read.parquet(f"{silver_dir}/orders_enriched")
         except Exception as e:
             logger.error("Silver orders not found: %s", e)
-            spark.stop()
             return
 
         # -------------------------------------------------------------------
-        # Filter for this restaurant
+        # Filter for this restaurant and date (rows counted during the gold
+        # write). Silver is partitioned by restaurantId/createdDate, so only
+        # their files are read.
         # -------------------------------------------------------------------
         restaurant_orders = orders.filter(F.col("restaurantId") == restaurant_id)
-        order_count = restaurant_orders.count()
-        logger.info("  Restaurant orders: %d", order_count)
-
-        if order_count == 0:
-            logger.warning("No orders found for restaurant %s on %s", restaurant_id, business_date)
-            spark.stop()
-            return
+        if args.incremental:
+            # The incremental silver holds every date; keep this one's partition
+            restaurant_orders = restaurant_orders.filter(F.col("createdDate") == F.lit(business_date))
+        restaurant_orders, orders_observation = observe_count(restaurant_orders)
 
         # -------------------------------------------------------------------
         # Group by hour
@@ -127,16 +120,26 @@ def main():
         # -------------------------------------------------------------------
         # Write to Gold (Parquet)
         # -------------------------------------------------------------------
+        # Dynamic overwrite: only this restaurant's partition is replaced
         output_path = os.path.join(gold_dir, "analytic_restaurant_hourly_velocity")
         os.makedirs(output_path, exist_ok=True)
-        hourly_velocity.write.mode("overwrite") \
-            .parquet(f"{output_path}/restaurant={restaurant_id}")
-        logger.info("  ✓ hourly_velocity — %d records written to gold layer", hourly_velocity.count())
+        count = write_partitioned(hourly_velocity, output_path, GOLD_PARTITION_COLS,
+                                  dynamic=True)
+        order_count = orders_observation.get["rows"]
+        logger.info("  Restaurant orders: %d", order_count)
+
+        if order_count == 0:
+            logger.warning("No orders found for restaurant %s on %s", restaurant_id, business_date)
+            return
+        logger.info("  ✓ hourly_velocity — %d records written to gold layer", count)
 
         # -------------------------------------------------------------------
         # Write-back to Supabase (optional best-effort)
         # -------------------------------------------------------------------
         try:
+            # Re-read the few rows just written instead of recomputing from silver
+            hourly_velocity = spark.read.parquet(output_path) \
+                .filter(F.col("restaurantId") == restaurant_id)
             hourly_velocity.write.mode("append").jdbc(
                 url=JDBC_URL,
                 table='"analytic_restaurant_hourly_velocity"',
@@ -151,6 +154,25 @@ def main():
     except Exception as exc:
         logger.exception("Job 6: Hourly Velocity — FAILED: %s", exc)
         raise
+
+
+def main():
+    args = parse_args()
+
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .appName(f"bouquet-hourly-velocity-{args.restaurant_id[:8]}")
+        .master("local[*]")
+        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        .getOrCreate()
+    )
+
+    try:
+        run(spark, args)
     finally:
         spark.stop()
 
@@ -0,0 +1,152 @@
+"""
+Pipeline: Run jobs 1-5 (BRONZE → WRITE_BACK) in a single Spark application.
+
+Running the chain as five spark-submits starts Spark five times and makes
+every stage re-read (and re-infer the schema of) what the previous one just
+wrote. Here the stages share one SparkSession:
+
+- Bronze is still written to disk (it is the raw extract every rerun starts
+  from) and read by job2 as usual.
+- Silver orders, items and process events are persisted while job2 writes
+  them and handed to job3 and job4 in memory; the Parquet copy is kept for
+  job6 and for reruns of individual stages.
+- Gold is written by job3/job4 and published by job5 from disk, so a failed
+  write-back can be retried on its own.
+
+Usage:
+    spark-submit jobs/pipeline.py \
+        [--date YYYY-MM-DD] \
+        [--date-from YYYY-MM-DD] \
+        [--skip-bronze]
+
+The pipeline always covers every restaurant: job2 overwrites the whole
+date's silver, job3 derives the chain and zone tables from it, job5 replaces
+their (chainId|zoneId, businessDate) slices and job4 advances the shared
+stats store. Run BRONZE or HOURLY_VELOCITY for a single restaurant.
+"""
+
+import sys
+import os
+import logging
+import argparse
+from datetime import date, datetime
+
+# Add project root to path so config.settings can be imported
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import LOGS_PATH, SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_SHUFFLE_PARTITIONS
+
+# ---------------------------------------------------------------------------
+# Logging setup
+# ---------------------------------------------------------------------------
+os.makedirs(LOGS_PATH, exist_ok=True)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(name)s — %(message)s",
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler(os.path.join(LOGS_PATH, "pipeline.log")),
+    ],
+)
+logger = logging.getLogger(__name__)
+
+# Imported after logging is configured so the stages log to pipeline.log
+from jobs import (  # noqa: E402
+    job1_extract_bronze as job1,
+    job2_build_silver as job2,
+    job3_aggregate_gold as job3,
+    job4_demand_estimate as job4,
+    job5_write_back as job5,
+)
+
+# ---------------------------------------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the BRONZE → WRITE_BACK pipeline in one Spark application")
+    parser.add_argument("--date", type=str, default=date.today().isoformat(),
+                        help="Business date in YYYY-MM-DD format")
+    # Accepted only to refuse it with a clear message (see module docstring)
+    parser.add_argument("--restaurant-id", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--date-from", type=str, default=None,
+                        help="Start of the bronze extraction window (default: 90 days ago)")
+    parser.add_argument("--skip-bronze", action="store_true",
+                        help="Reuse the bronze extract already on disk for --date")
+    args = parser.parse_args(argv)
+    if args.restaurant_id:
+        parser.error("--restaurant-id is not supported: a single-restaurant run would "
+                     "overwrite the other restaurants' silver and chain/zone gold")
+    # job1 always extracts into today's bronze folder
+    if not args.skip_bronze and args.date != date.today().isoformat():
+        parser.error("--date other than today requires --skip-bronze")
+    return args
+
+
+def bronze_argv(args):
+    """job1 arguments for this pipeline run."""
+    argv = []
+    if args.date_from:
+        argv.append(f"--date-from={args.date_from}")
+    return argv
+
+
+# ---------------------------------------------------------------------------
+# Main
+# ---------------------------------------------------------------------------
+
+def run(spark, args):
+    """Run jobs 1-5 for ``args.date`` on an existing SparkSession."""
+    stage_argv = [f"--date={args.date}"]
+
+    logger.info("=" * 60)
+    logger.info("Pipeline: BRONZE → WRITE_BACK — starting")
+    logger.info("  Date: %s", args.date)
+    logger.info("  Bronze: %s", "skipped" if args.skip_bronze else "extract")
+    logger.info("=" * 60)
+
+    total_start = datetime.now()
+    silver = {}
+    try:
+        if not args.skip_bronze:
+            job1.run(spark, job1.parse_args(bronze_argv(args)))
+        silver = job2.run(spark, job2.parse_args(stage_argv), persist=True)
+        job3.run(spark, job3.parse_args(stage_argv), silver=silver)
+        job4.run(spark, job4.parse_args(stage_argv), silver=silver)
+        job5.run(spark, job5.parse_args(stage_argv))
+
+        logger.info("Pipeline: BRONZE → WRITE_BACK — completed in %.1f seconds",
+                    (datetime.now() - total_start).total_seconds())
+
+    except Exception as exc:
+        logger.exception("Pipeline: BRONZE → WRITE_BACK — FAILED: %s", exc)
+        raise
+    finally:
+        for df in silver.values():
+            df.unpersist()
+
+
+def main():
+    args = parse_args()
+
+    from pyspark.sql import SparkSession
+
+    spark = (
+        SparkSession.builder
+        .appName("bouquet-pipeline")
+        .master("local[*]")
+        .config("spark.driver.memory", SPARK_DRIVER_MEMORY)
+        .config("spark.executor.memory", SPARK_EXECUTOR_MEMORY)
+        .config("spark.sql.shuffle.partitions", str(SPARK_SHUFFLE_PARTITIONS))
+        # job1 and job5 process tables concurrently, one FAIR pool each
+        .config("spark.scheduler.mode", "FAIR")
+        .getOrCreate()
+    )
+
+    try:
+        run(spark, args)
+    finally:
+        spark.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,648 @@
+"""
+Bouquet Analytics Orchestrator — asyncio variant of orchestrator/main.py.
+
+Same API and job queue semantics (AnalyticsJobRun rows claimed with
+``FOR UPDATE SKIP LOCKED``), but the service never parks a thread on I/O:
+
+- Postgres is reached through an asyncpg pool, so ``POST /jobs`` and
+  ``GET /jobs/{jobId}`` are coroutines on the event loop instead of sync
+  handlers holding a threadpool thread for each query.
+- Queue workers are asyncio tasks; spark-submit and the DuckDB engine run
+  through ``asyncio.create_subprocess_exec`` and are awaited, not waited on
+  with a blocking ``communicate()``. Warm Spark jobs (in-process) run in a
+  thread via ``asyncio.to_thread``.
+- Job output is read line by line from the subprocess pipe into the shared
+  job log registry; ``GET /jobs/{jobId}/logs`` streams it without a thread.
+
+Request models, job arguments and engine selection are shared with
+orchestrator/main.py. Run with:
+
+    uvicorn orchestrator.async_main:app --host 0.0.0.0 --port 8001
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+from contextlib import asynccontextmanager
+from datetime import date
+from typing import Optional
+from urllib.parse import quote, urlencode
+from uuid import uuid4
+
+# Allow importing orchestrator/, config/ and jobs/ from the project root
+_project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _project_root)
+
+import asyncpg
+import uvicorn
+from fastapi import FastAPI, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
+
+# orchestrator.main loads .env and sets up logging on import
+from orchestrator import main as sync_app
+from orchestrator.main import (
+    GLOBAL_JOB_TYPES,
+    JOB_MODULE_MAP,
+    JOB_SCRIPT_MAP,
+    LITE_ENGINE_SCRIPT,
+    JobRequest,
+    JobResponse,
+    ServiceTimesResponse,
+    _build_job_args,
+    _cached_velocity,
+    _record_completed_job,
+    _select_engine,
+    _validate_api_key,
+)
+from orchestrator.job_logs import JobLogHandler, current_job_id, follow_events
+from orchestrator.job_queue import as_date_str, default_worker_count, new_worker_id
+from orchestrator.result_cache import silver_version
+
+# noinspection PyUnresolvedReferences
+from config.settings import (  # type: ignore[import-untyped]
+    JDBC_PROPS,
+    JDBC_URL,
+    JOB_QUEUE_HEARTBEAT_SECONDS,
+    JOB_QUEUE_POLL_SECONDS,
+    JOB_QUEUE_SHUTDOWN_SECONDS,
+    JOB_QUEUE_STALE_SECONDS,
+    ORCHESTRATOR_DB_POOL_MAX,
+    ORCHESTRATOR_DB_POOL_MIN,
+    SPARK_DRIVER_MEMORY,
+    SPARK_EXECUTOR_MEMORY,
+    SPARK_SHUFFLE_PARTITIONS,
+)
+from jobs.common import parse_jdbc_url
+
+logger = logging.getLogger("orchestrator.async")
+
+# Shared with orchestrator/main.py's registry (one per process)
+_job_logs = sync_app._job_logs
+
+# spark-submit/DuckDB processes of the running jobs, by job id
+_job_processes: dict[str, asyncio.subprocess.Process] = {}
+
+# Job output is read in chunks and split into lines here: StreamReader's line
+# iteration raises on a line over its limit. Longer lines (Spark plans can be
+# long) are logged in pieces of this size.
+_MAX_OUTPUT_LINE_BYTES = 1024 * 1024
+_OUTPUT_CHUNK_BYTES = 64 * 1024
+
+
+def _dsn() -> str:
+    """``postgresql://`` DSN for asyncpg, built once from JDBC_URL."""
+    params = parse_jdbc_url(JDBC_URL)
+    host, port, dbname = params.pop("host"), params.pop("port"), params.pop("dbname")
+    user = quote(JDBC_PROPS.get("user", ""), safe="")
+    password = quote(JDBC_PROPS.get("password", ""), safe="")
+    query = f"?{urlencode(params)}" if params else ""
+    return f"postgresql://{user}:{password}@{host}:{port}/{dbname}{query}"
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _parse_date(value: Optional[str], field: str) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{field} must be a YYYY-MM-DD date.",
+        )
+
+
+# ---------------------------------------------------------------------------
+# Job queue (asyncio tasks)
+# ---------------------------------------------------------------------------
+
+class AsyncJobQueue:
+    """Worker tasks running the QUEUED jobs of ``AnalyticsJobRun``."""
+
+    def __init__(self, workers: Optional[int] = None,
+                 poll_seconds: float = JOB_QUEUE_POLL_SECONDS):
+        self._workers = workers or default_worker_count()
+        self._poll_seconds = poll_seconds
+        # Row ownership and heartbeats as in orchestrator/job_queue.py, so this
+        # service can share the table with orchestrator/main.py
+        self.worker_id = new_worker_id()
+        self.stopping = False
+        self._wakeup = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+        self._keep_alive_task: Optional[asyncio.Task] = None
+        # Ids of the jobs the workers are running now; only these get
+        # heartbeats, so a row whose final status update failed goes stale
+        self._running: set[str] = set()
+
+    async def start(self) -> None:
+        """Start the workers and the heartbeat (which also requeues stale jobs)."""
+        self.stopping = False
+        self._tasks = [asyncio.create_task(self._work(), name=f"job-worker-{i}")
+                       for i in range(self._workers)]
+        self._keep_alive_task = asyncio.create_task(self._keep_alive(), name="job-heartbeat")
+        logger.info("Job queue %s started with %d workers", self.worker_id, self._workers)
+
+    async def stop(self, timeout: float = JOB_QUEUE_SHUTDOWN_SECONDS) -> None:
+        """
+        Stop claiming jobs, interrupt the running ones and wait up to
+        ``timeout`` seconds for them, then requeue what is still RUNNING here.
+        """
+        self.stopping = True
+        self._wakeup.set()
+        if self._keep_alive_task is not None:
+            self._keep_alive_task.cancel()
+        await _interrupt_jobs()
+        if self._tasks:
+            _done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        try:
+            result = await _pool.execute(
+                """
+                UPDATE "AnalyticsJobRun"
+                SET status = 'QUEUED', "workerId" = NULL, "heartbeatAt" = NULL
+                WHERE "workerId" = $1 AND status = 'RUNNING'
+                """,
+                self.worker_id,
+            )
+            requeued = int(result.split()[-1])
+            if requeued:
+                logger.warning("Requeued %d jobs interrupted by the shutdown", requeued)
+        except (asyncpg.PostgresError, OSError) as exc:
+            # Not fatal: the rows are requeued once their heartbeat goes stale
+            logger.error("Could not requeue the jobs of %s: %s", self.worker_id, exc)
+        logger.info("Job queue stopped.")
+
+    async def _keep_alive(self) -> None:
+        """Refresh this queue's heartbeats and requeue the jobs of dead instances."""
+        while True:
+            try:
+                if self._running:
+                    await _pool.execute(
+                        """
+                        UPDATE "AnalyticsJobRun"
+                        SET "heartbeatAt" = now()
+                        WHERE id = ANY($1::text[]) AND "workerId" = $2 AND status = 'RUNNING'
+                        """,
+                        list(self._running), self.worker_id,
+                    )
+                # Rows without a heartbeat were claimed before heartbeats existed
+                result = await _pool.execute(
+                    """
+                    UPDATE "AnalyticsJobRun"
+                    SET status = 'QUEUED', "workerId" = NULL, "heartbeatAt" = NULL
+                    WHERE status = 'RUNNING'
+                      AND ("heartbeatAt" IS NULL
+                           OR "heartbeatAt" < now() - make_interval(secs => $1))
+                    """,
+                    JOB_QUEUE_STALE_SECONDS,
+                )
+                requeued = int(result.split()[-1])
+                if requeued:
+                    logger.warning("Requeued %d jobs whose worker stopped sending heartbeats",
+                                   requeued)
+            except (asyncpg.PostgresError, OSError) as exc:
+                logger.error("Job queue heartbeat failed: %s", exc)
+            await asyncio.sleep(JOB_QUEUE_HEARTBEAT_SECONDS)
+
+    def notify(self) -> None:
+        """Wake the idle workers (a job was just queued)."""
+        self._wakeup.set()
+
+    async def _claim(self) -> Optional[asyncpg.Record]:
+        return await _pool.fetchrow(
+            """
+            UPDATE "AnalyticsJobRun"
+            SET status = 'RUNNING', "startedAt" = now(),
+                "workerId" = $1, "heartbeatAt" = now()
+            WHERE id = (
+                SELECT id
+                FROM "AnalyticsJobRun"
+                WHERE status = 'QUEUED'
+                ORDER BY "startedAt"
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, "restaurantId", "jobType", "dataWindowStart", "dataWindowEnd"
+            """,
+            self.worker_id,
+        )
+
+    async def _work(self) -> None:
+        while not self.stopping:
+            # Cleared before claiming so a notify() during the claim is not lost
+            self._wakeup.clear()
+            try:
+                job = await self._claim()
+            except (asyncpg.PostgresError, OSError) as exc:
+                logger.error("Could not claim a job: %s", exc)
+                job = None
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self._poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            logger.info("Claimed job %s (%s, restaurant=%s)",
+                        job["id"], job["jobType"], job["restaurantId"])
+            self._running.add(job["id"])
+            try:
+                await _run_job(
+                    job["id"], job["restaurantId"], job["jobType"],
+                    as_date_str(job["dataWindowStart"]),
+                    as_date_str(job["dataWindowEnd"]),
+                )
+            except Exception:
+                # _run_job records failures itself; keep the worker alive
+                logger.exception("Job %s: unhandled error in worker", job["id"])
+            finally:
+                self._running.discard(job["id"])
+
+
+# ---------------------------------------------------------------------------
+# Job execution
+# ---------------------------------------------------------------------------
+
+async def _update_job_status(
+    job_id: str,
+    status_value: str,
+    error_message: Optional[str] = None,
+) -> None:
+    """Record a finished job (COMPLETED or FAILED) in AnalyticsJobRun."""
+    try:
+        await _pool.execute(
+            """
+            UPDATE "AnalyticsJobRun"
+            SET status = $1, "finishedAt" = now(), "errorMessage" = $2
+            WHERE id = $3
+            """,
+            status_value, error_message, job_id,
+        )
+        logger.info("Job %s updated to status=%s", job_id, status_value)
+    except (asyncpg.PostgresError, OSError) as exc:
+        logger.error("Database error updating job %s: %s", job_id, exc)
+
+
+def _run_warm_job(job_id: str, job_type: str, job_args: list[str]) -> None:
+    """Run a job in the warm SparkSession, logging into its job log (worker thread)."""
+    job_log = _job_logs.open(job_id)
+    handler = JobLogHandler(job_log)
+    logging.getLogger().addHandler(handler)
+    token = current_job_id.set(job_id)
+    try:
+        sync_app._warm_spark.run_job(job_id, JOB_MODULE_MAP[job_type], job_args)
+    finally:
+        current_job_id.reset(token)
+        logging.getLogger().removeHandler(handler)
+        _job_logs.close(job_log)
+
+
+async def _interrupt_jobs() -> None:
+    """End the running jobs (service shutdown): terminate their processes, cancel warm jobs."""
+    procs = list(_job_processes.items())
+    for job_id, proc in procs:
+        logger.info("Terminating job %s (pid %d)", job_id, proc.pid)
+        try:
+            proc.terminate()
+        except ProcessLookupError:
+            pass  # already exited
+    for job_id, proc in procs:
+        try:
+            await asyncio.wait_for(proc.wait(), sync_app._TERMINATE_GRACE_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning("Job %s did not exit on SIGTERM — killing pid %d", job_id, proc.pid)
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+    if sync_app._warm_spark is not None:
+        await asyncio.to_thread(sync_app._warm_spark.cancel_all)
+
+
+async def _pipe_output(stream: asyncio.StreamReader, job_log) -> None:
+    """Append a process's output to its job log, line by line, until EOF."""
+    pending = b""
+    while True:
+        chunk = await stream.read(_OUTPUT_CHUNK_BYTES)
+        if not chunk:
+            break
+        lines = (pending + chunk).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            job_log.append(line.decode(errors="replace"))
+        if len(pending) >= _MAX_OUTPUT_LINE_BYTES:
+            job_log.append(pending.decode(errors="replace"))
+            pending = b""
+    if pending:
+        job_log.append(pending.decode(errors="replace"))
+
+
+async def _kill_process(job_id: str, proc: asyncio.subprocess.Process) -> None:
+    """Kill a job's process that is still running and reap it."""
+    if proc.returncode is not None:
+        return
+    logger.warning("Killing job %s (pid %d)", job_id, proc.pid)
+    try:
+        proc.kill()
+    except ProcessLookupError:
+        pass  # already exited
+    await proc.wait()
+
+
+async def _run_job(
+    job_id: str,
+    restaurant_id: str,
+    job_type: str,
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> None:
+    """Execute a claimed (RUNNING) job and record its outcome."""
+    if job_type not in JOB_SCRIPT_MAP:
+        await _update_job_status(job_id, "FAILED", f"Unknown job type {job_type}")
+        return
+    job_args = _build_job_args(job_type, restaurant_id, date_from, date_to)
+    run_date = date_to or date_from or date.today().isoformat()
+    # Taken before the run: a result is cached against the silver it read
+    velocity_version = (await asyncio.to_thread(silver_version, restaurant_id, run_date)
+                        if job_type == "HOURLY_VELOCITY" else None)
+
+    # Engine selection sizes input directories on disk
+    engine = await asyncio.to_thread(_select_engine, job_type, restaurant_id, date_from, date_to)
+    if engine == "duckdb":
+        cmd = [sys.executable, LITE_ENGINE_SCRIPT, job_type, *job_args]
+    elif sync_app._warm_spark is not None:
+        logger.info("Running job_id=%s  type=%s in warm SparkSession  args=%s",
+                    job_id, job_type, " ".join(job_args))
+        try:
+            await asyncio.to_thread(_run_warm_job, job_id, job_type, job_args)
+            await _update_job_status(job_id, "COMPLETED")
+            _record_completed_job(job_id, restaurant_id, job_type, run_date, velocity_version)
+        except Exception as exc:
+            if _job_queue.stopping:
+                # Cancelled by the shutdown: the queue requeues the row
+                logger.warning("Job %s interrupted by shutdown: %s", job_id, exc)
+                return
+            error_msg = f"{type(exc).__name__}: {exc}"[:2000]
+            logger.exception("Job %s failed in warm SparkSession: %s", job_id, error_msg)
+            await _update_job_status(job_id, "FAILED", error_msg)
+        return
+    else:
+        cmd = [
+            "spark-submit",
+            "--master=local[*]",
+            f"--driver-memory={SPARK_DRIVER_MEMORY}",
+            f"--executor-memory={SPARK_EXECUTOR_MEMORY}",
+            f"--conf=spark.sql.shuffle.partitions={SPARK_SHUFFLE_PARTITIONS}",
+            JOB_SCRIPT_MAP[job_type],
+            *job_args,
+        ]
+
+    logger.info("Launching %s for job_id=%s  type=%s  restaurant=%s  cmd=%s",
+                os.path.basename(cmd[0]), job_id, job_type, restaurant_id, " ".join(cmd))
+    job_log = _job_logs.open(job_id)
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=_project_root,
+        )
+        _job_processes[job_id] = proc
+        try:
+            await _pipe_output(proc.stdout, job_log)
+            await proc.wait()
+        finally:
+            try:
+                # Reading failed or was cancelled: leave no orphaned spark-submit
+                await _kill_process(job_id, proc)
+            finally:
+                _job_processes.pop(job_id, None)
+    except FileNotFoundError:
+        error_msg = f"{cmd[0]} not found on PATH"
+        logger.error("Job %s: %s", job_id, error_msg)
+        await _update_job_status(job_id, "FAILED", error_msg)
+        return
+    except Exception as exc:
+        error_msg = f"Unexpected error launching {cmd[0]}: {exc}"
+        logger.exception("Job %s: %s", job_id, error_msg)
+        await _update_job_status(job_id, "FAILED", error_msg[:2000])
+        return
+    finally:
+        _job_logs.close(job_log)
+
+    if proc.returncode != 0 and _job_queue.stopping:
+        # Terminated by the shutdown: the queue requeues the row
+        logger.warning("Job %s interrupted by shutdown (rc=%d)", job_id, proc.returncode)
+    elif proc.returncode == 0:
+        logger.info("Job %s completed successfully.", job_id)
+        await _update_job_status(job_id, "COMPLETED")
+        _record_completed_job(job_id, restaurant_id, job_type, run_date, velocity_version)
+    else:
+        error_msg = job_log.tail(2000) or "Unknown error"
+        logger.error("Job %s failed with rc=%d: %s", job_id, proc.returncode, error_msg)
+        await _update_job_status(job_id, "FAILED", error_msg)
+
+
+# ---------------------------------------------------------------------------
+# FastAPI application
+# ---------------------------------------------------------------------------
+_pool: Optional[asyncpg.Pool] = None
+_job_queue = AsyncJobQueue()
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    """Open the asyncpg pool, then the warm SparkSession and the queue workers."""
+    global _pool
+    _pool = await asyncpg.create_pool(
+        _dsn(), min_size=ORCHESTRATOR_DB_POOL_MIN, max_size=ORCHESTRATOR_DB_POOL_MAX,
+    )
+    if sync_app._warm_spark is not None:
+        await asyncio.to_thread(sync_app._warm_spark.start)
+    await _job_queue.start()
+    try:
+        yield
+    finally:
+        await _job_queue.stop()
+        if sync_app._warm_spark is not None:
+            await asyncio.to_thread(sync_app._warm_spark.stop)
+        await _pool.close()
+
+
+app = FastAPI(
+    title="Bouquet Analytics Orchestrator (async)",
+    description="Orchestrates Spark analytics pipeline jobs for restaurant data.",
+    version="0.1.0",
+    lifespan=_lifespan,
+)
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+@app.post("/jobs", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
+async def create_job(
+    body: JobRequest,
+    response: Response,
+    x_analytics_key: Optional[str] = Header(None, alias="X-Analytics-Key"),
+):
+    """Queue a new analytics pipeline job (see orchestrator.main.create_job)."""
+    _validate_api_key(x_analytics_key)
+
+    job_type = body.jobType.upper()
+    if job_type == "HOURLY_VELOCITY":
+        # Fingerprinting the silver input walks the disk
+        cached = await asyncio.to_thread(_cached_velocity, body.restaurantId,
+                                         body.dateFrom, body.dateTo)
+        if cached:
+            logger.info("HOURLY_VELOCITY for restaurant %s served from job %s (silver unchanged)",
+                        body.restaurantId, cached["jobId"])
+            response.status_code = status.HTTP_200_OK
+            return JobResponse(jobId=cached["jobId"], status="COMPLETED",
+                               finishedAt=cached["finishedAt"])
+    date_from = _parse_date(body.dateFrom, "dateFrom")
+    date_to = _parse_date(body.dateTo, "dateTo")
+    job_id = str(uuid4())
+
+    try:
+        async with _pool.acquire() as conn:
+            async with conn.transaction():
+                existing_id = await conn.fetchval(
+                    """
+                    SELECT id
+                    FROM "AnalyticsJobRun"
+                    WHERE ("restaurantId" = $1 OR $3)
+                      AND "jobType" = $2
+                      AND status IN ('QUEUED', 'RUNNING')
+                    LIMIT 1
+                    """,
+                    body.restaurantId, job_type, job_type in GLOBAL_JOB_TYPES,
+                )
+                if existing_id:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail=(
+                            f"A {job_type} job for restaurant {body.restaurantId} "
+                            f"is already QUEUED or RUNNING (jobId={existing_id})."
+                        ),
+                    )
+                started_at = await conn.fetchval(
+                    """
+                    INSERT INTO "AnalyticsJobRun"
+                        (id, "restaurantId", "jobType", status, "startedAt",
+                         "dataWindowStart", "dataWindowEnd")
+                    VALUES ($1, $2, $3, 'QUEUED', now(), $4::date, $5::date)
+                    RETURNING "startedAt"
+                    """,
+                    job_id, body.restaurantId, job_type, date_from, date_to,
+                )
+    except (asyncpg.PostgresError, OSError) as exc:
+        logger.error("Database error inserting job %s: %s", job_id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable.",
+        )
+    logger.info("Job %s created: type=%s restaurant=%s", job_id, job_type, body.restaurantId)
+
+    _job_queue.notify()
+    return JobResponse(jobId=job_id, status="QUEUED", startedAt=_iso(started_at))
+
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Query a job by its UUID and return current status."""
+    try:
+        row = await _pool.fetchrow(
+            """
+            SELECT id, status, "startedAt", "finishedAt", "errorMessage"
+            FROM "AnalyticsJobRun"
+            WHERE id = $1
+            """,
+            job_id,
+        )
+    except (asyncpg.PostgresError, OSError) as exc:
+        logger.error("Database error fetching job %s: %s", job_id, exc)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable.",
+        )
+
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job {job_id} not found.",
+        )
+
+    return JobResponse(
+        jobId=row["id"],
+        status=row["status"],
+        startedAt=_iso(row["startedAt"]),
+        finishedAt=_iso(row["finishedAt"]),
+        errorMessage=row["errorMessage"],
+    )
+
+
+@app.get("/jobs/{job_id}/logs")
+async def get_job_logs(
+    job_id: str,
+    follow: bool = True,
+    x_analytics_key: Optional[str] = Header(None, alias="X-Analytics-Key"),
+):
+    """Job output and progress; SSE while the job runs (see orchestrator/main.py)."""
+    _validate_api_key(x_analytics_key)
+    job_log = _job_logs.get(job_id)
+    if follow and job_log is not None and not job_log.finished:
+        return StreamingResponse(
+            follow_events(job_log),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    snapshot = await asyncio.to_thread(_job_logs.snapshot, job_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No logs for job {job_id}.",
+        )
+    return snapshot
+
+
+# Reads local Parquet through DuckDB; FastAPI runs the sync handler in its threadpool
+app.add_api_route("/service-times/{restaurant_id}", sync_app.get_service_times,
+                  methods=["GET"], response_model=ServiceTimesResponse)
+
+
+@app.get("/health")
+async def health():
+    return {
+        "status": "ok",
+        "dbPool": {
+            "size": _pool.get_size() if _pool else 0,
+            "idle": _pool.get_idle_size() if _pool else 0,
+            "minConnections": ORCHESTRATOR_DB_POOL_MIN,
+            "maxConnections": ORCHESTRATOR_DB_POOL_MAX,
+        },
+        "velocityCache": sync_app._velocity_cache.stats(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Entry point
+# ---------------------------------------------------------------------------
+
+if __name__ == "__main__":
+    uvicorn.run(
+        "orchestrator.async_main:app",
+        host="0.0.0.0",
+        port=8001,
+    )
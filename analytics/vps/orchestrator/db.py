@@ -0,0 +1,160 @@
+"""
+Pooled PostgreSQL access for the orchestrator.
+
+One process-wide ``ConnectionPool`` replaces opening a psycopg2 connection
+per request: the connection parameters are parsed from ``JDBC_URL`` once,
+connections are reused across requests and queue workers, a connection idle
+for longer than ``ORCHESTRATOR_DB_HEALTHCHECK_SECONDS`` is pinged before it
+is handed out, and broken connections are dropped instead of returned.
+``stats()`` reports pool metrics (served by ``GET /health``).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool
+
+# noinspection PyUnresolvedReferences
+from config.settings import (  # type: ignore[import-untyped]
+    JDBC_PROPS,
+    JDBC_URL,
+    ORCHESTRATOR_DB_HEALTHCHECK_SECONDS,
+    ORCHESTRATOR_DB_POOL_MAX,
+    ORCHESTRATOR_DB_POOL_MIN,
+)
+from jobs.common import parse_jdbc_url
+
+logger = logging.getLogger("orchestrator.db")
+
+
+def connection_params() -> dict[str, str]:
+    """psycopg2 connection kwargs for the Supabase database (JDBC_URL)."""
+    params = parse_jdbc_url(JDBC_URL)
+    params["user"] = JDBC_PROPS.get("user", "")
+    params["password"] = JDBC_PROPS.get("password", "")
+    return params
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool that blocks when all connections are in use."""
+
+    def __init__(
+        self,
+        minconn: int = ORCHESTRATOR_DB_POOL_MIN,
+        maxconn: int = ORCHESTRATOR_DB_POOL_MAX,
+        healthcheck_seconds: float = ORCHESTRATOR_DB_HEALTHCHECK_SECONDS,
+    ):
+        self._minconn = minconn
+        self._maxconn = maxconn
+        self._healthcheck_seconds = healthcheck_seconds
+        self._params = connection_params()
+        self._pool = None
+        self._lock = threading.Lock()
+        # psycopg2's pool raises when exhausted; callers wait here instead
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._last_used: dict[int, float] = {}
+        self._stats = {
+            "checkouts": 0,
+            "waitSecondsTotal": 0.0,
+            "waitSecondsMax": 0.0,
+            "healthChecks": 0,
+            "discarded": 0,
+            "inUse": 0,
+        }
+
+    def _get_pool(self) -> ThreadedConnectionPool:
+        # Created on first use so the service starts even if the database is down
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(self._minconn, self._maxconn, **self._params)
+                logger.info("Database pool opened (min=%d, max=%d)", self._minconn, self._maxconn)
+            return self._pool
+
+    def _checkout(self, pool: ThreadedConnectionPool):
+        conn = pool.getconn()
+        idle = time.monotonic() - self._last_used.get(id(conn), time.monotonic())
+        if conn.closed:
+            pool.putconn(conn, close=True)
+            return self._discarded(pool)
+        if idle > self._healthcheck_seconds:
+            with self._lock:
+                self._stats["healthChecks"] += 1
+            try:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                conn.rollback()
+            except psycopg2.Error:
+                pool.putconn(conn, close=True)
+                return self._discarded(pool)
+        return conn
+
+    def _discarded(self, pool: ThreadedConnectionPool):
+        """Count a dropped connection and open a replacement."""
+        with self._lock:
+            self._stats["discarded"] += 1
+        logger.warning("Discarded a broken database connection")
+        return pool.getconn()
+
+    @contextmanager
+    def connection(self) -> Iterator:
+        """
+        Borrow a connection for one transaction: committed when the block
+        exits normally, rolled back on an exception, then returned to the
+        pool (or closed, if it broke).
+        """
+        started = time.monotonic()
+        self._slots.acquire()
+        try:
+            pool = self._get_pool()
+            conn = self._checkout(pool)
+        except Exception:
+            self._slots.release()
+            raise
+        waited = time.monotonic() - started
+        with self._lock:
+            self._stats["checkouts"] += 1
+            self._stats["inUse"] += 1
+            self._stats["waitSecondsTotal"] += waited
+            self._stats["waitSecondsMax"] = max(self._stats["waitSecondsMax"], waited)
+
+        try:
+            with conn:
+                yield conn
+        finally:
+            # psycopg2 flags a connection whose server link was lost as closed
+            broken = bool(conn.closed)
+            if broken:
+                with self._lock:
+                    self._stats["discarded"] += 1
+                self._last_used.pop(id(conn), None)
+            else:
+                self._last_used[id(conn)] = time.monotonic()
+            with self._lock:
+                self._stats["inUse"] -= 1
+            pool.putconn(conn, close=broken)
+            self._slots.release()
+
+    def stats(self) -> dict:
+        """Pool metrics: size limits, connections in use and checkout counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["minConnections"] = self._minconn
+        stats["maxConnections"] = self._maxconn
+        stats["waitSecondsAvg"] = (stats["waitSecondsTotal"] / stats["checkouts"]
+                                   if stats["checkouts"] else 0.0)
+        return stats
+
+    def close(self) -> None:
+        """Close every pooled connection (application shutdown)."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._last_used.clear()
+                logger.info("Database pool closed.")
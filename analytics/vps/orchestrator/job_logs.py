@@ -0,0 +1,229 @@
+"""
+Live job output for the orchestrator.
+
+Job output is consumed line by line while the job runs instead of being
+buffered by ``communicate()``. Every line goes to
+
+- a bounded in-memory ring buffer (``JOB_LOG_BUFFER_LINES``), which is what
+  ``GET /jobs/{jobId}/logs`` streams and what a failed job's error message
+  is taken from (the tail, where the traceback is), and
+- a rotating per-job file under ``LOGS_PATH/jobs`` (``JOB_LOG_MAX_BYTES`` per
+  file, ``JOB_LOG_BACKUPS`` rotated copies), read back once the in-memory
+  log of a finished job has been evicted.
+
+Lines of the form ``✓ <dataset> — <N> records ...`` that every job logs when a
+dataset is written are parsed into stage progress.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import re
+import threading
+import uuid
+from typing import Optional
+
+# noinspection PyUnresolvedReferences
+from config.settings import (  # type: ignore[import-untyped]
+    JOB_LOG_BACKUPS,
+    JOB_LOG_BUFFER_LINES,
+    JOB_LOG_MAX_BYTES,
+    LOGS_PATH,
+)
+
+JOB_LOGS_DIR = os.path.join(LOGS_PATH, "jobs")
+
+# In-memory logs of finished jobs kept for streaming; older ones are read from disk
+FINISHED_JOB_LOGS_KEPT = 100
+
+# Job whose output the current thread produces: set by the warm runner and
+# carried into a job's worker threads by jobs.common.thread_target
+current_job_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_job_id", default=None,
+)
+
+_PROGRESS_RE = re.compile(r"✓ (?P<stage>\S+) — (?P<records>\d+)")
+
+
+def job_log_path(job_id: str) -> str:
+    return os.path.join(JOB_LOGS_DIR, f"{job_id}.log")
+
+
+def parse_progress(line: str) -> Optional[dict]:
+    """``{"stage", "records"}`` for a dataset-written line, else None."""
+    m = _PROGRESS_RE.search(line)
+    if not m:
+        return None
+    return {"stage": m.group("stage"), "records": int(m.group("records"))}
+
+
+def sse_event(data, event: Optional[str] = None) -> str:
+    """One Server-Sent Events message; non-string data is sent as JSON."""
+    if not isinstance(data, str):
+        data = json.dumps(data)
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data}\n\n"
+
+
+class JobLog:
+    """Output of one job: ring buffer, rotating file and parsed progress."""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+        self.finished = False
+        self.progress: list[dict] = []
+        self._lines: collections.deque[str] = collections.deque(maxlen=JOB_LOG_BUFFER_LINES)
+        # Number of lines ever appended; the buffer holds the last len(_lines)
+        self._count = 0
+        self._lock = threading.Lock()
+        os.makedirs(JOB_LOGS_DIR, exist_ok=True)
+        self._file = logging.handlers.RotatingFileHandler(
+            job_log_path(job_id), maxBytes=JOB_LOG_MAX_BYTES,
+            backupCount=JOB_LOG_BACKUPS, encoding="utf-8",
+        )
+        self._file.setFormatter(logging.Formatter("%(message)s"))
+
+    def append(self, line: str) -> None:
+        line = line.rstrip("\n")
+        self._file.handle(logging.makeLogRecord({"msg": line, "args": None}))
+        step = parse_progress(line)
+        with self._lock:
+            self._lines.append(line)
+            self._count += 1
+            if step is not None:
+                self.progress.append(step)
+
+    def finish(self) -> None:
+        with self._lock:
+            self.finished = True
+        self._file.close()
+
+    def progress_since(self, position: int) -> list[dict]:
+        """Progress steps after the first ``position`` ones."""
+        with self._lock:
+            return self.progress[position:]
+
+    def tail(self, max_chars: int) -> str:
+        """The last ``max_chars`` characters of the buffered output."""
+        with self._lock:
+            return "\n".join(self._lines)[-max_chars:]
+
+    def read_from(self, position: int) -> tuple[list[str], int]:
+        """
+        Lines appended since ``position`` (a count returned by an earlier
+        call, 0 at first) and the new position. Lines that already left the
+        ring buffer are skipped.
+        """
+        with self._lock:
+            first = self._count - len(self._lines)
+            start = max(position, first)
+            return list(self._lines)[start - first:], self._count
+
+
+class JobLogHandler(logging.Handler):
+    """
+    Routes the log records of one job into a ``JobLog``: captures the output
+    of a job module run in-process (warm Spark). Records are matched on
+    ``current_job_id``, so lines logged from the job's worker threads (job1's
+    extractions, job5's writes) are kept too.
+    """
+
+    def __init__(self, job_log: JobLog):
+        super().__init__()
+        self._job_log = job_log
+        self.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(name)s — %(message)s"))
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # Handlers run in the logging thread, under its context
+        if current_job_id.get() == self._job_log.job_id:
+            self._job_log.append(self.format(record))
+
+
+class JobLogRegistry:
+    """Live and recently finished job logs, by job id."""
+
+    def __init__(self, finished_kept: int = FINISHED_JOB_LOGS_KEPT):
+        self._logs: dict[str, JobLog] = {}
+        self._finished: collections.deque[str] = collections.deque()
+        self._finished_kept = finished_kept
+        self._lock = threading.Lock()
+
+    def open(self, job_id: str) -> JobLog:
+        job_log = JobLog(job_id)
+        with self._lock:
+            self._logs[job_id] = job_log
+        return job_log
+
+    def close(self, job_log: JobLog) -> None:
+        job_log.finish()
+        with self._lock:
+            self._finished.append(job_log.job_id)
+            while len(self._finished) > self._finished_kept:
+                self._logs.pop(self._finished.popleft(), None)
+
+    def get(self, job_id: str) -> Optional[JobLog]:
+        with self._lock:
+            return self._logs.get(job_id)
+
+    def snapshot(self, job_id: str) -> Optional[dict]:
+        """
+        Buffered lines and progress of a job, from memory or — for a job this
+        process no longer holds — its log file. None if there is neither.
+        """
+        job_log = self.get(job_id)
+        if job_log is not None:
+            lines, _ = job_log.read_from(0)
+            return {"jobId": job_id, "finished": job_log.finished,
+                    "lines": lines, "progress": job_log.progress_since(0)}
+        lines = self.read_file(job_id)
+        if lines is None:
+            return None
+        return {"jobId": job_id, "finished": True, "lines": lines,
+                "progress": [step for step in map(parse_progress, lines) if step]}
+
+    @staticmethod
+    def read_file(job_id: str, max_lines: int = JOB_LOG_BUFFER_LINES) -> Optional[list[str]]:
+        """Last ``max_lines`` lines of a job's current log file, or None."""
+        try:
+            path = job_log_path(str(uuid.UUID(job_id)))
+        except ValueError:
+            return None
+        if not os.path.isfile(path):
+            return None
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return [line.rstrip("\n") for line in collections.deque(f, maxlen=max_lines)]
+
+
+async def follow_events(job_log: JobLog, poll_seconds: float = 0.5,
+                        heartbeat_seconds: float = 15.0):
+    """
+    SSE messages for a live job: one ``data`` message per output line, a
+    ``progress`` event per parsed step and a final ``end`` event, with a
+    comment as heartbeat. Polls the log on the event loop, so a follower
+    does not hold a threadpool thread for the length of the job.
+    """
+    position = reported = 0
+    idle = 0.0
+    while True:
+        finished = job_log.finished
+        lines, position = job_log.read_from(position)
+        for line in lines:
+            yield sse_event(line)
+        steps = job_log.progress_since(reported)
+        for step in steps:
+            yield sse_event(step, "progress")
+        reported += len(steps)
+        if finished:
+            yield sse_event({"jobId": job_log.job_id}, "end")
+            return
+        idle = 0.0 if lines else idle + poll_seconds
+        if idle >= heartbeat_seconds:
+            yield ": heartbeat\n\n"
+            idle = 0.0
+        await asyncio.sleep(poll_seconds)
@@ -0,0 +1,265 @@
+"""
+Durable job queue for the orchestrator.
+
+``POST /jobs`` only inserts a QUEUED row into ``AnalyticsJobRun``; a fixed
+pool of worker threads claims queued rows with ``SELECT ... FOR UPDATE SKIP
+LOCKED`` (so two workers — or two orchestrator instances — never take the
+same job), marks them RUNNING and runs them. The number of concurrent
+spark-submits is therefore bounded by the pool size, not by the number of
+requests, and a job that is QUEUED when the service stops is picked up again
+when it starts.
+
+A claimed row is stamped with the queue's ``workerId`` and its
+``heartbeatAt`` is refreshed every ``JOB_QUEUE_HEARTBEAT_SECONDS`` while the
+job runs. Only RUNNING rows whose heartbeat is older than
+``JOB_QUEUE_STALE_SECONDS`` — their instance died — are requeued, so
+instances sharing the table (orchestrator/main.py next to
+orchestrator/async_main.py, or a rolling restart) never rerun each other's
+jobs. ``stop()`` interrupts the running jobs, waits for them and requeues
+what it could not finish.
+
+The pool is sized to the machine unless ``JOB_QUEUE_WORKERS`` is set: one
+worker per two cores (Spark runs ``local[*]``), and no more than fit in
+three quarters of the memory at ``SPARK_DRIVER_MEMORY`` each.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import date, datetime, timezone
+from typing import Callable, ContextManager, Optional
+
+# noinspection PyUnresolvedReferences
+from config.settings import (  # type: ignore[import-untyped]
+    JOB_QUEUE_HEARTBEAT_SECONDS,
+    JOB_QUEUE_POLL_SECONDS,
+    JOB_QUEUE_SHUTDOWN_SECONDS,
+    JOB_QUEUE_STALE_SECONDS,
+    JOB_QUEUE_WORKERS,
+    SPARK_DRIVER_MEMORY,
+)
+
+logger = logging.getLogger("orchestrator.job_queue")
+
+_MEMORY_UNITS = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}
+
+
+def _memory_bytes(spec: str) -> int:
+    """Bytes in a Spark memory string such as ``"2g"`` or ``"512m"``."""
+    spec = spec.strip().lower().rstrip("b")
+    if spec and spec[-1] in _MEMORY_UNITS:
+        return int(float(spec[:-1]) * _MEMORY_UNITS[spec[-1]])
+    return int(spec)
+
+
+def default_worker_count() -> int:
+    """Workers that fit this machine: cores / 2, capped by memory."""
+    if JOB_QUEUE_WORKERS > 0:
+        return JOB_QUEUE_WORKERS
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    try:
+        total_memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+        workers = min(workers, int(total_memory * 0.75) // _memory_bytes(SPARK_DRIVER_MEMORY))
+    except (ValueError, OSError, AttributeError):
+        pass
+    return max(1, workers)
+
+
+def new_worker_id() -> str:
+    """Identity a queue stamps on the rows it claims (host, pid, random suffix)."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def as_date_str(value) -> Optional[str]:
+    """``dataWindowStart``/``End`` as the YYYY-MM-DD the job scripts expect."""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+class JobQueue:
+    """Worker pool running the QUEUED jobs of ``AnalyticsJobRun``."""
+
+    def __init__(
+        self,
+        connection: Callable[[], ContextManager],
+        handler: Callable[[str, str, str, Optional[str], Optional[str]], None],
+        workers: Optional[int] = None,
+        poll_seconds: float = JOB_QUEUE_POLL_SECONDS,
+        interrupt: Optional[Callable[[], None]] = None,
+    ):
+        """
+        ``connection()`` lends a psycopg2 connection for one transaction (see
+        ``orchestrator.db.ConnectionPool.connection``); ``handler(job_id,
+        restaurant_id, job_type, date_from, date_to)`` runs a claimed job and
+        records its final status. ``interrupt()`` is called by ``stop()`` to
+        end the running jobs (terminate their processes); a handler whose job
+        was interrupted (``stopping`` is set) leaves the status alone.
+        """
+        self._connection = connection
+        self._handler = handler
+        self._interrupt = interrupt
+        self._workers = workers or default_worker_count()
+        self._poll_seconds = poll_seconds
+        self.worker_id = new_worker_id()
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+        # Ids of the jobs the workers are running now; only these get
+        # heartbeats, so a row whose final status update failed goes stale
+        self._running: set[str] = set()
+        self._running_lock = threading.Lock()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stopping.is_set()
+
+    def start(self) -> None:
+        """Start the workers and the heartbeat (which also requeues stale jobs)."""
+        self._stopping.clear()
+        for i in range(self._workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._keep_alive, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        logger.info("Job queue %s started with %d workers", self.worker_id, self._workers)
+
+    def stop(self, timeout: float = JOB_QUEUE_SHUTDOWN_SECONDS) -> None:
+        """
+        Stop claiming jobs, interrupt the running ones and wait up to
+        ``timeout`` seconds for them; jobs still RUNNING under this queue are
+        then requeued right away rather than after they go stale.
+        """
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        if self._interrupt is not None:
+            self._interrupt()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        self._threads.clear()
+        try:
+            self._release_claimed()
+        except Exception as exc:
+            # Not fatal: the rows are requeued once their heartbeat goes stale
+            logger.error("Could not requeue the jobs of %s: %s", self.worker_id, exc)
+        logger.info("Job queue stopped.")
+
+    def notify(self) -> None:
+        """Wake one idle worker (a job was just queued)."""
+        with self._wakeup:
+            self._wakeup.notify()
+
+    def _keep_alive(self) -> None:
+        """Refresh this queue's heartbeats and requeue the jobs of dead instances."""
+        while not self._stopping.is_set():
+            try:
+                self._heartbeat()
+                self._requeue_stale()
+            except Exception as exc:
+                logger.error("Job queue heartbeat failed: %s", exc)
+            self._stopping.wait(JOB_QUEUE_HEARTBEAT_SECONDS)
+
+    def _heartbeat(self) -> None:
+        with self._running_lock:
+            running = list(self._running)
+        if not running:
+            return
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE "AnalyticsJobRun"
+                SET "heartbeatAt" = now()
+                WHERE id = ANY(%s) AND "workerId" = %s AND status = 'RUNNING'
+                """,
+                (running, self.worker_id),
+            )
+
+    def _requeue_stale(self) -> None:
+        # Rows without a heartbeat were claimed before heartbeats existed
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE "AnalyticsJobRun"
+                SET status = 'QUEUED', "workerId" = NULL, "heartbeatAt" = NULL
+                WHERE status = 'RUNNING'
+                  AND ("heartbeatAt" IS NULL
+                       OR "heartbeatAt" < now() - make_interval(secs => %s))
+                """,
+                (JOB_QUEUE_STALE_SECONDS,),
+            )
+            if cur.rowcount:
+                logger.warning("Requeued %d jobs whose worker stopped sending heartbeats",
+                               cur.rowcount)
+
+    def _release_claimed(self) -> None:
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE "AnalyticsJobRun"
+                SET status = 'QUEUED', "workerId" = NULL, "heartbeatAt" = NULL
+                WHERE "workerId" = %s AND status = 'RUNNING'
+                """,
+                (self.worker_id,),
+            )
+            if cur.rowcount:
+                logger.warning("Requeued %d jobs interrupted by the shutdown", cur.rowcount)
+
+    def _claim(self) -> Optional[tuple]:
+        """Mark the oldest QUEUED job RUNNING and return it, or None."""
+        now = datetime.now(timezone.utc).isoformat()
+        with self._connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE "AnalyticsJobRun"
+                SET status = 'RUNNING', "startedAt" = %s,
+                    "workerId" = %s, "heartbeatAt" = now()
+                WHERE id = (
+                    SELECT id
+                    FROM "AnalyticsJobRun"
+                    WHERE status = 'QUEUED'
+                    ORDER BY "startedAt"
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, "restaurantId", "jobType", "dataWindowStart", "dataWindowEnd"
+                """,
+                (now, self.worker_id),
+            )
+            return cur.fetchone()
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job = self._claim()
+            except Exception as exc:
+                logger.error("Could not claim a job: %s", exc)
+                job = None
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self._poll_seconds)
+                continue
+
+            job_id, restaurant_id, job_type, window_start, window_end = job
+            logger.info("Claimed job %s (%s, restaurant=%s)", job_id, job_type, restaurant_id)
+            with self._running_lock:
+                self._running.add(job_id)
+            try:
+                self._handler(job_id, restaurant_id, job_type,
+                              as_date_str(window_start), as_date_str(window_end))
+            except Exception:
+                # The handler records failures itself; keep the worker alive
+                logger.exception("Job %s: unhandled error in worker", job_id)
+            finally:
+                with self._running_lock:
+                    self._running.discard(job_id)
@@ -4,19 +4,37 @@ Bouquet Analytics Orchestrator — FastAPI service for Spark job orchestration.
 Endpoints:
   POST /jobs         — Start a Spark analytics pipeline job.
   GET  /jobs/{jobId} — Query job status from the AnalyticsJobRun table.
-
-Background execution runs spark-submit with the appropriate job script and
-updates job status in Supabase PostgreSQL via psycopg2.
+  GET  /jobs/{jobId}/logs — Job output and stage progress, streamed as
+                       Server-Sent Events while the job runs.
+  GET  /service-times/{restaurantId} — Prep-time percentiles over a date range,
+                       merged from job3's per-day service-time sketches.
+
+Jobs are queued as rows of the AnalyticsJobRun table and run by a fixed pool
+of workers (orchestrator/job_queue.py), so concurrent requests cannot start
+more Spark drivers than the machine holds and queued jobs survive a restart.
+A worker runs spark-submit with the appropriate job script (or, with
+SPARK_EXECUTION_MODE=warm, runs the job module inside a long-lived
+SparkSession kept by the service) and updates job status in Supabase
+PostgreSQL via psycopg2. Silver/gold jobs with small inputs run on DuckDB
+instead (jobs/duckdb_engine.py, see ANALYTICS_ENGINE).
+
+orchestrator/async_main.py serves the same API on asyncio (asyncpg and
+asyncio subprocesses) for high numbers of concurrent clients.
+
+HOURLY_VELOCITY requests whose silver input is unchanged since the last
+successful run are answered from that run (orchestrator/result_cache.py).
 """
 
 from __future__ import annotations
 
 import logging
 import os
-import re
 import subprocess
 import sys
-from datetime import datetime, timezone
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
 from typing import Optional
 from uuid import uuid4
 
@@ -31,7 +49,8 @@ from dotenv import load_dotenv
 import psycopg2
 import psycopg2.extras
 import uvicorn
-from fastapi import FastAPI, Header, HTTPException, status
+from fastapi import FastAPI, Header, HTTPException, Response, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 # ---------------------------------------------------------------------------
@@ -44,13 +63,23 @@ load_dotenv(os.path.join(_project_root, ".env"))
 # noinspection PyUnresolvedReferences
 from config.settings import (  # type: ignore[import-untyped]
     ANALYTICS_API_KEY,
-    JDBC_PROPS,
-    JDBC_URL,
+    ANALYTICS_ENGINE,
+    BRONZE_PATH,
+    LITE_ENGINE_MAX_INPUT_BYTES,
     LOGS_PATH,
+    SERVICE_TIME_SKETCH_PATH,
+    SILVER_PATH,
     SPARK_DRIVER_MEMORY,
     SPARK_EXECUTOR_MEMORY,
+    SPARK_EXECUTION_MODE,
     SPARK_SHUFFLE_PARTITIONS,
 )
+from jobs.common import SKETCH_QUANTILES, sketch_quantiles
+from orchestrator.db import ConnectionPool
+from orchestrator.job_logs import JobLogHandler, JobLogRegistry, current_job_id, follow_events
+from orchestrator.job_queue import JobQueue
+from orchestrator.result_cache import ResultCache, silver_version
+from orchestrator.warm_spark import WarmSparkExecutor
 
 # ---------------------------------------------------------------------------
 # Logging
@@ -64,10 +93,35 @@ logger = logging.getLogger("orchestrator")
 # ---------------------------------------------------------------------------
 # FastAPI application
 # ---------------------------------------------------------------------------
+_warm_spark: Optional[WarmSparkExecutor] = (
+    WarmSparkExecutor() if SPARK_EXECUTION_MODE == "warm" else None
+)
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    """
+    Start the warm SparkSession with the service so no request pays for it,
+    then the job queue workers (which also resume jobs queued before a restart).
+    """
+    if _warm_spark is not None:
+        _warm_spark.start()
+    _job_queue.start()
+    try:
+        yield
+    finally:
+        # Interrupts and waits for the running jobs, then requeues their rows
+        _job_queue.stop()
+        if _warm_spark is not None:
+            _warm_spark.stop()
+        _db.close()
+
+
 app = FastAPI(
     title="Bouquet Analytics Orchestrator",
     description="Orchestrates Spark analytics pipeline jobs for restaurant data.",
     version="0.1.0",
+    lifespan=_lifespan,
 )
 
 # ---------------------------------------------------------------------------
@@ -80,39 +134,99 @@ JOB_SCRIPT_MAP: dict[str, str] = {
     "DEMAND_FORECAST": os.path.join(_project_root, "jobs", "job4_demand_estimate.py"),
     "WRITE_BACK": os.path.join(_project_root, "jobs", "job5_write_back.py"),
     "HOURLY_VELOCITY": os.path.join(_project_root, "jobs", "job6_hourly_velocity.py"),
+    # BRONZE → WRITE_BACK in one Spark application
+    "PIPELINE": os.path.join(_project_root, "jobs", "pipeline.py"),
+}
+
+# Module names under jobs/ (warm execution imports and runs them in-process)
+JOB_MODULE_MAP: dict[str, str] = {
+    job_type: os.path.splitext(os.path.basename(path))[0]
+    for job_type, path in JOB_SCRIPT_MAP.items()
 }
 
 VALID_JOB_TYPES = frozenset(JOB_SCRIPT_MAP.keys())
 
-# ---------------------------------------------------------------------------
-# JDBC URL parser — extracts psycopg2 connection parameters
-# ---------------------------------------------------------------------------
-_JDBC_RE = re.compile(
-    r"^jdbc:postgresql://(?P<host>[^:/]+)(?::(?P<port>\d+))?/(?P<dbname>.+)$"
-)
+# Job types jobs/duckdb_engine.py can run instead of Spark
+LITE_ENGINE_SCRIPT = os.path.join(_project_root, "jobs", "duckdb_engine.py")
+LITE_ENGINE_JOB_TYPES = frozenset({"SILVER", "GOLD", "DEMAND_FORECAST", "HOURLY_VELOCITY"})
 
+# Job types that rebuild every restaurant's data (the request's restaurantId
+# only identifies the requester): at most one is active at a time
+GLOBAL_JOB_TYPES = frozenset({"PIPELINE"})
 
-def _parse_jdbc_url(jdbc_url: str) -> dict[str, str]:
-    """Parse a ``jdbc:postgresql://host:port/dbname`` URL into kwargs for psycopg2."""
-    m = _JDBC_RE.match(jdbc_url)
-    if not m:
-        raise ValueError(
-            f"Cannot parse JDBC_URL. Expected format "
-            f"jdbc:postgresql://host:port/dbname, got: {jdbc_url}"
-        )
-    return {
-        "host": m.group("host"),
-        "port": m.group("port") or "5432",
-        "dbname": m.group("dbname"),
-    }
+
+def _build_job_args(
+    job_type: str,
+    restaurant_id: str,
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> list[str]:
+    """Translate a job request into the command-line arguments its script accepts."""
+    if job_type in ("BRONZE", "PIPELINE"):
+        # The pipeline always covers every restaurant: its silver/gold stages
+        # overwrite whole dates and the chain/zone tables (see jobs/pipeline.py)
+        args = [f"--restaurant-id={restaurant_id}"] if job_type == "BRONZE" else []
+        if date_from:
+            args.append(f"--date-from={date_from}")
+        # The pipeline extracts up to now and processes today's business date
+        if date_to and job_type == "BRONZE":
+            args.append(f"--date-to={date_to}")
+        return args
+
+    # The other stages process a single business date
+    args = []
+    if job_type == "HOURLY_VELOCITY":
+        args.append(f"--restaurant-id={restaurant_id}")
+    run_date = date_to or date_from
+    if run_date:
+        args.append(f"--date={run_date}")
+    return args
+
+
+def _dir_size(path: str) -> int:
+    """Total size in bytes of the files under ``path`` (0 if it does not exist)."""
+    total = 0
+    for root, _dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def _job_input_bytes(job_type: str, restaurant_id: str, run_date: str) -> int:
+    """Size of the Parquet a job reads for ``run_date``."""
+    if job_type == "SILVER":
+        return _dir_size(os.path.join(BRONZE_PATH, run_date))
+    if job_type == "HOURLY_VELOCITY":
+        return _dir_size(os.path.join(SILVER_PATH, run_date, "orders_enriched",
+                                      f"restaurantId={restaurant_id}"))
+    return _dir_size(os.path.join(SILVER_PATH, run_date))
+
+
+def _select_engine(
+    job_type: str,
+    restaurant_id: str,
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> str:
+    """Return ``"duckdb"`` or ``"spark"`` for a job, per ANALYTICS_ENGINE."""
+    if job_type not in LITE_ENGINE_JOB_TYPES or ANALYTICS_ENGINE == "spark":
+        return "spark"
+    if ANALYTICS_ENGINE == "duckdb":
+        return "duckdb"
+    run_date = date_to or date_from or date.today().isoformat()
+    input_bytes = _job_input_bytes(job_type, restaurant_id, run_date)
+    engine = "duckdb" if input_bytes <= LITE_ENGINE_MAX_INPUT_BYTES else "spark"
+    logger.info("%s input for %s is %d bytes — using %s", job_type, run_date, input_bytes, engine)
+    return engine
 
 
-def _get_connection():
-    """Return a new psycopg2 connection to Supabase PostgreSQL."""
-    params = _parse_jdbc_url(JDBC_URL)
-    params["user"] = JDBC_PROPS.get("user", "")
-    params["password"] = JDBC_PROPS.get("password", "")
-    return psycopg2.connect(**params)
+# ---------------------------------------------------------------------------
+# Database access — one pool for the API and the queue workers
+# ---------------------------------------------------------------------------
+_db = ConnectionPool()
 
 
 # ---------------------------------------------------------------------------
@@ -125,7 +239,7 @@ class JobRequest(BaseModel):
     jobType: str = Field(
         ...,
         description="Pipeline stage to run.",
-        pattern=r"^(BRONZE|SILVER|GOLD|DEMAND_FORECAST|WRITE_BACK|HOURLY_VELOCITY)$",
+        pattern=r"^(BRONZE|SILVER|GOLD|DEMAND_FORECAST|WRITE_BACK|HOURLY_VELOCITY|PIPELINE)$",
     )
     restaurantId: str = Field(..., description="Target restaurant identifier.")
     dateFrom: Optional[str] = Field(None, description="Start date (ISO format).")
@@ -142,6 +256,25 @@ class JobResponse(BaseModel):
     errorMessage: Optional[str] = None
 
 
+class StationServiceTimes(BaseModel):
+    """Merged prep-time percentiles of one station."""
+
+    stationId: Optional[str] = None
+    sampleCount: int
+    p50PrepSeconds: Optional[int] = None
+    p90PrepSeconds: Optional[int] = None
+    p99PrepSeconds: Optional[int] = None
+
+
+class ServiceTimesResponse(BaseModel):
+    """Response of GET /service-times/{restaurantId}."""
+
+    restaurantId: str
+    dateFrom: str
+    dateTo: str
+    stations: list[StationServiceTimes]
+
+
 # ---------------------------------------------------------------------------
 # API key validation helper
 # ---------------------------------------------------------------------------
@@ -159,20 +292,22 @@ def _validate_api_key(x_analytics_key: Optional[str]) -> None:
 # ---------------------------------------------------------------------------
 
 def _find_active_job(restaurant_id: str, job_type: str) -> Optional[str]:
-    """Return the job_id of an active (QUEUED or RUNNING) job, or None."""
+    """
+    Return the job_id of an active (QUEUED or RUNNING) job, or None. For
+    GLOBAL_JOB_TYPES any restaurant's active job counts.
+    """
     query = """
         SELECT id
         FROM "AnalyticsJobRun"
-        WHERE "restaurantId" = %s
+        WHERE ("restaurantId" = %s OR %s)
           AND "jobType" = %s
           AND status IN ('QUEUED', 'RUNNING')
         LIMIT 1
     """
     try:
-        conn = _get_connection()
-        with conn:
+        with _db.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(query, (restaurant_id, job_type))
+                cur.execute(query, (restaurant_id, job_type in GLOBAL_JOB_TYPES, job_type))
                 row = cur.fetchone()
                 return row[0] if row else None
     except psycopg2.OperationalError as exc:
@@ -183,6 +318,41 @@ def _find_active_job(restaurant_id: str, job_type: str) -> Optional[str]:
         )
 
 
+# ---------------------------------------------------------------------------
+# HOURLY_VELOCITY result cache
+# ---------------------------------------------------------------------------
+
+def _cached_velocity(
+    restaurant_id: str,
+    date_from: Optional[str],
+    date_to: Optional[str],
+) -> Optional[dict]:
+    """The earlier run still valid for this HOURLY_VELOCITY request, or None."""
+    if not _velocity_cache.enabled:
+        return None
+    run_date = date_to or date_from or date.today().isoformat()
+    return _velocity_cache.get(restaurant_id, run_date, silver_version(restaurant_id, run_date))
+
+
+def _record_completed_job(
+    job_id: str,
+    restaurant_id: str,
+    job_type: str,
+    run_date: str,
+    velocity_version: Optional[str],
+) -> None:
+    """Keep the result cache in step with a job that just completed."""
+    if job_type == "HOURLY_VELOCITY":
+        _velocity_cache.put(restaurant_id, run_date, velocity_version, job_id)
+    elif job_type in ("SILVER", "PIPELINE"):
+        # The pipeline rebuilds today's business date
+        rebuilt = date.today().isoformat() if job_type == "PIPELINE" else run_date
+        dropped = _velocity_cache.invalidate(business_date=rebuilt)
+        if dropped:
+            logger.info("Silver for %s rebuilt — dropped %d cached velocity results",
+                        rebuilt, dropped)
+
+
 # ---------------------------------------------------------------------------
 # Background job execution (runs in a subprocess via Popen)
 # ---------------------------------------------------------------------------
@@ -194,60 +364,121 @@ def _run_background_job(
     date_from: Optional[str],
     date_to: Optional[str],
 ) -> None:
-    """Execute the Spark job in a background subprocess and update status."""
+    """Execute a job claimed by a queue worker (already RUNNING) and update status."""
+    if job_type not in JOB_SCRIPT_MAP:
+        _update_job_status(job_id, "FAILED", error_message=f"Unknown job type {job_type}")
+        return
     script_path = JOB_SCRIPT_MAP[job_type]
-
-    # Update status to RUNNING
-    _update_job_status(job_id, "RUNNING")
-
-    # Build spark-submit command
-    cmd = [
-        "spark-submit",
-        f"--master=local[*]",
-        f"--driver-memory={SPARK_DRIVER_MEMORY}",
-        f"--executor-memory={SPARK_EXECUTOR_MEMORY}",
-        f"--conf=spark.sql.shuffle.partitions={SPARK_SHUFFLE_PARTITIONS}",
-        script_path,
-        f"--restaurant_id={restaurant_id}",
-    ]
-    if date_from:
-        cmd.append(f"--date_from={date_from}")
-    if date_to:
-        cmd.append(f"--date_to={date_to}")
+    job_args = _build_job_args(job_type, restaurant_id, date_from, date_to)
+    run_date = date_to or date_from or date.today().isoformat()
+    # Taken before the run: a result is cached against the silver it read
+    velocity_version = (silver_version(restaurant_id, run_date)
+                        if job_type == "HOURLY_VELOCITY" else None)
+
+    if _select_engine(job_type, restaurant_id, date_from, date_to) == "duckdb":
+        # Small input: run in-process on DuckDB, no JVM
+        cmd = [sys.executable, LITE_ENGINE_SCRIPT, job_type, *job_args]
+    elif _warm_spark is not None:
+        if _run_warm_job(job_id, job_type, job_args):
+            _record_completed_job(job_id, restaurant_id, job_type, run_date, velocity_version)
+        return
+    else:
+        # Build spark-submit command
+        cmd = [
+            "spark-submit",
+            f"--master=local[*]",
+            f"--driver-memory={SPARK_DRIVER_MEMORY}",
+            f"--executor-memory={SPARK_EXECUTOR_MEMORY}",
+            f"--conf=spark.sql.shuffle.partitions={SPARK_SHUFFLE_PARTITIONS}",
+            script_path,
+            *job_args,
+        ]
 
     logger.info(
-        "Launching spark-submit for job_id=%s  type=%s  restaurant=%s  cmd=%s",
+        "Launching %s for job_id=%s  type=%s  restaurant=%s  cmd=%s",
+        os.path.basename(cmd[0]),
         job_id,
         job_type,
         restaurant_id,
         " ".join(cmd),
     )
 
+    job_log = _job_logs.open(job_id)
     try:
+        # Output is streamed line by line into the job log (stderr included,
+        # in order) instead of being buffered until the process exits
         proc = subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
             text=True,
+            errors="replace",
             cwd=_project_root,
         )
-        stdout, stderr = proc.communicate()
-
-        if proc.returncode == 0:
+        with _job_processes_lock:
+            _job_processes[job_id] = proc
+        try:
+            for line in proc.stdout:
+                job_log.append(line)
+            proc.wait()
+        finally:
+            with _job_processes_lock:
+                _job_processes.pop(job_id, None)
+
+        if proc.returncode != 0 and _job_queue.stopping:
+            # Terminated by the shutdown: the queue requeues the row
+            logger.warning("Job %s interrupted by shutdown (rc=%d)", job_id, proc.returncode)
+        elif proc.returncode == 0:
             logger.info("Job %s completed successfully.", job_id)
-            _update_job_status(job_id, "COMPLETED", stdout=stdout[:2000])
+            _update_job_status(job_id, "COMPLETED", stdout=job_log.tail(2000))
+            _record_completed_job(job_id, restaurant_id, job_type, run_date, velocity_version)
         else:
-            error_msg = (stderr or stdout or "Unknown error")[:2000]
+            error_msg = job_log.tail(2000) or "Unknown error"
             logger.error("Job %s failed with rc=%d: %s", job_id, proc.returncode, error_msg)
             _update_job_status(job_id, "FAILED", error_message=error_msg)
     except FileNotFoundError:
-        error_msg = f"spark-submit not found on PATH"
+        error_msg = f"{cmd[0]} not found on PATH"
         logger.error("Job %s: %s", job_id, error_msg)
         _update_job_status(job_id, "FAILED", error_message=error_msg)
     except Exception as exc:
-        error_msg = f"Unexpected error launching spark-submit: {exc}"
+        error_msg = f"Unexpected error launching {cmd[0]}: {exc}"
         logger.exception("Job %s: %s", job_id, error_msg)
         _update_job_status(job_id, "FAILED", error_message=error_msg[:2000])
+    finally:
+        _job_logs.close(job_log)
+
+
+def _run_warm_job(job_id: str, job_type: str, job_args: list[str]) -> bool:
+    """Run the job module inside the warm SparkSession and update status; True on success."""
+    logger.info(
+        "Running job_id=%s  type=%s in warm SparkSession  args=%s",
+        job_id,
+        job_type,
+        " ".join(job_args),
+    )
+    # Route the job module's records (this thread and its workers) to the job log
+    job_log = _job_logs.open(job_id)
+    handler = JobLogHandler(job_log)
+    logging.getLogger().addHandler(handler)
+    token = current_job_id.set(job_id)
+    try:
+        _warm_spark.run_job(job_id, JOB_MODULE_MAP[job_type], job_args)
+        logger.info("Job %s completed successfully.", job_id)
+        _update_job_status(job_id, "COMPLETED")
+        return True
+    except Exception as exc:
+        if _job_queue.stopping:
+            # Cancelled by the shutdown: the queue requeues the row
+            logger.warning("Job %s interrupted by shutdown: %s", job_id, exc)
+            return False
+        error_msg = f"{type(exc).__name__}: {exc}"[:2000]
+        logger.exception("Job %s failed in warm SparkSession: %s", job_id, error_msg)
+        _update_job_status(job_id, "FAILED", error_message=error_msg)
+        return False
+    finally:
+        current_job_id.reset(token)
+        logging.getLogger().removeHandler(handler)
+        _job_logs.close(job_log)
 
 
 def _update_job_status(
@@ -259,8 +490,7 @@ def _update_job_status(
     """Update the job row in AnalyticsJobRun."""
     now = datetime.now(timezone.utc).isoformat()
     try:
-        conn = _get_connection()
-        with conn:
+        with _db.connection() as conn:
             with conn.cursor() as cur:
                 if status_value == "RUNNING":
                     cur.execute(
@@ -294,6 +524,42 @@ def _update_job_status(
         logger.error("Database error updating job %s: %s", job_id, exc)
 
 
+# Output of running and recently finished jobs (GET /jobs/{jobId}/logs)
+_job_logs = JobLogRegistry()
+
+# Last successful HOURLY_VELOCITY run per restaurant and date, by silver version
+_velocity_cache = ResultCache()
+
+# spark-submit/DuckDB processes of the running jobs, by job id
+_job_processes: dict[str, subprocess.Popen] = {}
+_job_processes_lock = threading.Lock()
+
+# Seconds a job process gets to exit on SIGTERM before it is killed
+_TERMINATE_GRACE_SECONDS = 10
+
+
+def _interrupt_jobs() -> None:
+    """End the running jobs (service shutdown): terminate their processes, cancel warm jobs."""
+    with _job_processes_lock:
+        procs = list(_job_processes.items())
+    for job_id, proc in procs:
+        logger.info("Terminating job %s (pid %d)", job_id, proc.pid)
+        proc.terminate()
+    deadline = time.monotonic() + _TERMINATE_GRACE_SECONDS
+    for job_id, proc in procs:
+        try:
+            proc.wait(max(0.0, deadline - time.monotonic()))
+        except subprocess.TimeoutExpired:
+            logger.warning("Job %s did not exit on SIGTERM — killing pid %d", job_id, proc.pid)
+            proc.kill()
+    if _warm_spark is not None:
+        _warm_spark.cancel_all()
+
+
+# Workers claiming QUEUED jobs from AnalyticsJobRun (started by the lifespan)
+_job_queue = JobQueue(_db.connection, _run_background_job, interrupt=_interrupt_jobs)
+
+
 # ---------------------------------------------------------------------------
 # Endpoints
 # ---------------------------------------------------------------------------
@@ -302,18 +568,31 @@ def _update_job_status(
 @app.post("/jobs", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 def create_job(
     body: JobRequest,
+    response: Response,
     x_analytics_key: Optional[str] = Header(None, alias="X-Analytics-Key"),
 ):
     """Start a new analytics pipeline job.
 
-    Validates the API key, checks for duplicates, inserts a QUEUED row into
-    ``AnalyticsJobRun``, and launches ``spark-submit`` in the background.
+    Validates the API key, checks for duplicates and inserts a QUEUED row into
+    ``AnalyticsJobRun``; a job queue worker picks it up and runs it. An
+    HOURLY_VELOCITY request whose result is cached is answered with the
+    COMPLETED job that computed it (200) and nothing is queued.
     """
     # --- Auth ---
     _validate_api_key(x_analytics_key)
 
     job_type = body.jobType.upper()
 
+    # --- Cached result ---
+    if job_type == "HOURLY_VELOCITY":
+        cached = _cached_velocity(body.restaurantId, body.dateFrom, body.dateTo)
+        if cached:
+            logger.info("HOURLY_VELOCITY for restaurant %s served from job %s (silver unchanged)",
+                        body.restaurantId, cached["jobId"])
+            response.status_code = status.HTTP_200_OK
+            return JobResponse(jobId=cached["jobId"], status="COMPLETED",
+                               finishedAt=cached["finishedAt"])
+
     # --- Duplicate check ---
     existing_id = _find_active_job(body.restaurantId, job_type)
     if existing_id:
@@ -329,8 +608,7 @@ def create_job(
     job_id = str(uuid4())
     now = datetime.now(timezone.utc).isoformat()
     try:
-        conn = _get_connection()
-        with conn:
+        with _db.connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
                     """
@@ -362,16 +640,8 @@ def create_job(
             detail="Database unavailable.",
         )
 
-    # --- Launch background execution ---
-    # We use threading so the HTTP response returns immediately.
-    import threading
-
-    thread = threading.Thread(
-        target=_run_background_job,
-        args=(job_id, body.restaurantId, job_type, body.dateFrom, body.dateTo),
-        daemon=True,
-    )
-    thread.start()
+    # --- Hand over to the job queue ---
+    _job_queue.notify()
 
     return JobResponse(jobId=job_id, status="QUEUED", startedAt=now)
 
@@ -385,8 +655,7 @@ def get_job(job_id: str):
         WHERE id = %s
     """
     try:
-        conn = _get_connection()
-        with conn:
+        with _db.connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
                 cur.execute(query, (job_id,))
                 row = cur.fetchone()
@@ -412,13 +681,114 @@ def get_job(job_id: str):
     )
 
 
+@app.get("/jobs/{job_id}/logs")
+def get_job_logs(
+    job_id: str,
+    follow: bool = True,
+    x_analytics_key: Optional[str] = Header(None, alias="X-Analytics-Key"),
+):
+    """Output and stage progress of a job.
+
+    While the job runs in this process the output is streamed as Server-Sent
+    Events (one message per line, ``progress`` events for each dataset
+    written, ``end`` when it finishes). With ``follow=false``, or once the job
+    is over, the buffered lines and progress are returned as JSON.
+    """
+    # Raw job output (SQL, tracebacks, connection errors)
+    _validate_api_key(x_analytics_key)
+
+    job_log = _job_logs.get(job_id)
+    if follow and job_log is not None and not job_log.finished:
+        return StreamingResponse(
+            follow_events(job_log),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    snapshot = _job_logs.snapshot(job_id)
+    if snapshot is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No logs for job {job_id}.",
+        )
+    return snapshot
+
+
+@app.get("/service-times/{restaurant_id}", response_model=ServiceTimesResponse)
+def get_service_times(
+    restaurant_id: str,
+    dateFrom: str,
+    dateTo: str,
+    x_analytics_key: Optional[str] = Header(None, alias="X-Analytics-Key"),
+):
+    """Prep-time percentiles per station for ``dateFrom``..``dateTo`` (inclusive).
+
+    Merges the per-day histograms job3 keeps in SERVICE_TIME_SKETCH_PATH, so a
+    month of service times costs a few KB per station-day instead of a scan
+    of the process events.
+    """
+    _validate_api_key(x_analytics_key)
+    try:
+        date_from = date.fromisoformat(dateFrom)
+        date_to = date.fromisoformat(dateTo)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="dateFrom and dateTo must be YYYY-MM-DD dates.",
+        )
+
+    histograms: dict[Optional[str], dict[int, int]] = {}
+    if os.path.isdir(SERVICE_TIME_SKETCH_PATH):
+        import duckdb
+
+        con = duckdb.connect()
+        try:
+            rows = con.execute(
+                """
+                SELECT stationId, seconds, sum(n) AS n
+                FROM (
+                    SELECT stationId,
+                           unnest(map_keys(durationHistogram)) AS seconds,
+                           unnest(map_values(durationHistogram)) AS n
+                    FROM read_parquet(?, hive_partitioning = true)
+                    WHERE restaurantId = ? AND createdDate BETWEEN ? AND ?
+                )
+                GROUP BY stationId, seconds
+                """,
+                [os.path.join(SERVICE_TIME_SKETCH_PATH, "**", "*.parquet"),
+                 restaurant_id, date_from, date_to],
+            ).fetchall()
+        finally:
+            con.close()
+        for station_id, seconds, n in rows:
+            histograms.setdefault(station_id, {})[int(seconds)] = int(n)
+
+    stations = []
+    for station_id, histogram in histograms.items():
+        quantiles = sketch_quantiles(histogram, SKETCH_QUANTILES)
+        stations.append(StationServiceTimes(
+            stationId=station_id,
+            sampleCount=sum(histogram.values()),
+            p50PrepSeconds=quantiles[0.5],
+            p90PrepSeconds=quantiles[0.9],
+            p99PrepSeconds=quantiles[0.99],
+        ))
+
+    return ServiceTimesResponse(
+        restaurantId=restaurant_id,
+        dateFrom=date_from.isoformat(),
+        dateTo=date_to.isoformat(),
+        stations=stations,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Health check (useful for monitoring)
 # ---------------------------------------------------------------------------
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    return {"status": "ok", "dbPool": _db.stats(), "velocityCache": _velocity_cache.stats()}
 
 
 # ---------------------------------------------------------------------------
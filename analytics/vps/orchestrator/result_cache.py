@@ -0,0 +1,147 @@
+"""
+Result cache for on-demand HOURLY_VELOCITY jobs.
+
+Job 6 recomputes a restaurant's hourly velocity from the silver
+``orders_enriched`` of one business date and writes it to
+``GOLD_PATH/<date>/analytic_restaurant_hourly_velocity/restaurantId=<id>``.
+When that silver partition has not changed since the last successful run,
+rerunning the job produces the same rows, so the orchestrator answers the
+request with the earlier run instead of queuing a new one.
+
+The version of the input is a hash of the paths, sizes and modification
+times of the restaurant's silver files: a silver rebuild — by the
+orchestrator or by anything else writing SILVER_PATH — changes it, and the
+cached result no longer matches. SILVER and PIPELINE runs also drop the
+entries of the dates they rebuild. Entries are evicted least recently used
+beyond ``HOURLY_VELOCITY_CACHE_SIZE`` and expire after
+``HOURLY_VELOCITY_CACHE_TTL_SECONDS``.
+"""
+
+from __future__ import annotations
+
+import collections
+import hashlib
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+# noinspection PyUnresolvedReferences
+from config.settings import (  # type: ignore[import-untyped]
+    GOLD_PATH,
+    HOURLY_VELOCITY_CACHE_SIZE,
+    HOURLY_VELOCITY_CACHE_TTL_SECONDS,
+    SILVER_PATH,
+)
+
+
+def silver_version(restaurant_id: str, business_date: str) -> Optional[str]:
+    """
+    Fingerprint of a restaurant's silver ``orders_enriched`` for a date, or
+    None when there is no such data (nothing worth caching).
+    """
+    root = os.path.join(SILVER_PATH, business_date, "orders_enriched",
+                        f"restaurantId={restaurant_id}")
+    digest = hashlib.sha1()
+    found = False
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            found = True
+            digest.update(f"{os.path.relpath(path, root)}\0{st.st_size}\0{st.st_mtime_ns}\n"
+                          .encode())
+    return digest.hexdigest() if found else None
+
+
+def velocity_output_path(restaurant_id: str, business_date: str) -> str:
+    """Gold partition job 6 writes for a restaurant and date."""
+    return os.path.join(GOLD_PATH, business_date, "analytic_restaurant_hourly_velocity",
+                        f"restaurantId={restaurant_id}")
+
+
+class ResultCache:
+    """LRU + TTL map of (restaurantId, businessDate) to the run that computed it."""
+
+    def __init__(
+        self,
+        max_entries: int = HOURLY_VELOCITY_CACHE_SIZE,
+        ttl_seconds: float = HOURLY_VELOCITY_CACHE_TTL_SECONDS,
+    ):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: collections.OrderedDict[tuple[str, str], dict] = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0 and self._ttl_seconds > 0
+
+    def get(self, restaurant_id: str, business_date: str, version: Optional[str]) -> Optional[dict]:
+        """
+        The cached run (``jobId``, ``finishedAt``, ``outputPath``) for this
+        input version, or None. Entries whose version differs, that expired or
+        whose gold output is gone are dropped.
+        """
+        key = (restaurant_id, business_date)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or version is None or entry["version"] != version:
+                self._stats["misses"] += 1
+                return None
+            if (time.monotonic() - entry["storedAt"] > self._ttl_seconds
+                    or not os.path.isdir(entry["outputPath"])):
+                del self._entries[key]
+                self._stats["evictions"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return {k: entry[k] for k in ("jobId", "finishedAt", "outputPath")}
+
+    def put(self, restaurant_id: str, business_date: str, version: Optional[str],
+            job_id: str) -> None:
+        """Record a successful run computed from silver at ``version``."""
+        if not self.enabled or version is None:
+            return
+        key = (restaurant_id, business_date)
+        entry = {
+            "version": version,
+            "jobId": job_id,
+            "finishedAt": datetime.now(timezone.utc).isoformat(),
+            "outputPath": velocity_output_path(restaurant_id, business_date),
+            "storedAt": time.monotonic(),
+        }
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, business_date: Optional[str] = None,
+                   restaurant_id: Optional[str] = None) -> int:
+        """Drop the entries of a date and/or restaurant (all if neither); returns the count."""
+        with self._lock:
+            keys = [key for key in self._entries
+                    if (restaurant_id is None or key[0] == restaurant_id)
+                    and (business_date is None or key[1] == business_date)]
+            for key in keys:
+                del self._entries[key]
+            self._stats["invalidations"] += len(keys)
+        return len(keys)
+
+    def stats(self) -> dict:
+        """Cache metrics: size limits, entries and hit/miss counters."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["maxEntries"] = self._max_entries
+        stats["ttlSeconds"] = self._ttl_seconds
+        return stats
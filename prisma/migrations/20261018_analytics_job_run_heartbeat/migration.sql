@@ -0,0 +1,8 @@
+-- AlterTable: orchestrator job queue ownership. A worker stamps the rows it
+-- claims with its id and refreshes "heartbeatAt" while the job runs; only
+-- RUNNING rows whose heartbeat went stale are requeued by other instances.
+ALTER TABLE "AnalyticsJobRun" ADD COLUMN IF NOT EXISTS "workerId" TEXT;
+ALTER TABLE "AnalyticsJobRun" ADD COLUMN IF NOT EXISTS "heartbeatAt" TIMESTAMP(3);
+
+CREATE INDEX IF NOT EXISTS "AnalyticsJobRun_status_heartbeatAt_idx"
+    ON "AnalyticsJobRun"("status", "heartbeatAt");